@@ -0,0 +1,94 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+"""
+So sánh hai backend của TCPServer (StreamReader/StreamWriter và
+BufferedProtocol): thời gian mở N kết nối và số lệnh PING/giây khi mỗi client
+gửi liên tiếp (pipeline) nhiều lệnh trên localhost.
+
+    python -m benchmarks.bench_backends [số kết nối] [số lệnh mỗi kết nối]
+"""
+
+import sys
+import time
+import asyncio
+
+from sources.constants.cmd import Cmd
+from sources.server.tcpserver import TCPServer
+from sources.server.tcpsession import TCPSession
+from sources.server.tcpprotocol import TCPProtocol
+from sources.server.tcpcontroller import TCPController
+from sources.server.IO.packager import DataPackager
+from sources.server.IO.frame import HEADER
+
+
+PING = HEADER.pack(Cmd.PING, 0)
+BACKLOG = TCPServer.BACKLOG
+PING_RESPONSE = len(DataPackager().encode([Cmd.PING]))
+
+
+async def handle_client(reader, writer):
+    """Vòng xử lý tối giản của ClientHandler (không rate limit, không cơ sở dữ liệu)."""
+    session = TCPSession()
+    await session.connect(reader, writer)
+    controller = TCPController(None, session.transport)
+
+    while session.is_connected:
+        code, command, data = await session.transport.receive()
+        if await controller.handle_command(code, command, data) == 0:
+            break
+
+    await session.disconnect()
+    writer.close()
+
+
+async def start(backend: str) -> asyncio.AbstractServer:
+    if backend == "protocol":
+        loop = asyncio.get_running_loop()
+        return await loop.create_server(lambda: TCPProtocol(handle_client), "127.0.0.1", 0, backlog=BACKLOG)
+    return await asyncio.start_server(handle_client, "127.0.0.1", 0, backlog=BACKLOG)
+
+
+async def client(port: int, count: int) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(PING * count)
+    await reader.readexactly(PING_RESPONSE * count)
+    writer.close()
+
+
+async def run(backend: str, connections: int, count: int) -> None:
+    server = await start(backend)
+    port = server.sockets[0].getsockname()[1]
+
+    started = time.perf_counter()
+    opened = await asyncio.gather(*(asyncio.open_connection("127.0.0.1", port) for _ in range(connections)))
+    connect_time = time.perf_counter() - started
+    for _, writer in opened:
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, count) for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{backend:<10} {connections} kết nối: {connect_time * 1e3:8.1f} ms, "
+          f"{connections * count / elapsed:12.0f} lệnh/giây")
+
+    server.close()
+    await server.wait_closed()
+
+
+async def run_all(connections: int, count: int) -> None:
+    # Một vòng lặp sự kiện duy nhất: các lock của FileCache gắn với vòng lặp đầu tiên dùng chúng
+    for backend in ("streams", "protocol"):
+        await run(backend, connections, count)
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    asyncio.run(run_all(connections, count))
+
+
+if __name__ == "__main__":
+    main()
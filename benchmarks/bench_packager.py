@@ -0,0 +1,113 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+"""
+So sánh DataPackager với bản cài đặt cũ (nối bytes, cắt lát) trên các payload
+1 KB, 64 KB và 1 MB, và tiền tố map gốc ('m') với JSON ('j') cho dict nhỏ.
+
+    python -m benchmarks.bench_packager
+"""
+
+import json
+import struct
+import timeit
+
+from sources.server.IO.packager import DataPackager
+
+
+def legacy_encode(items: list, encoding: str = 'utf-8') -> bytes:
+    """Bản encode cũ: nối `bytes +=` cho từng trường."""
+    encoded_data = b''
+    for item in items:
+        if isinstance(item, str):
+            str_bytes = item.encode(encoding)
+            encoded_data += b's' + struct.pack('!i', len(str_bytes)) + str_bytes
+        elif isinstance(item, int):
+            encoded_data += b'i' + struct.pack('!i', item)
+        elif isinstance(item, float):
+            encoded_data += b'f' + struct.pack('!f', item)
+        else:
+            json_bytes = json.dumps(item).encode(encoding)
+            encoded_data += b'j' + struct.pack('!i', len(json_bytes)) + json_bytes
+    return struct.pack('!i', len(encoded_data)) + encoded_data
+
+
+def legacy_decode(data: bytes, encoding: str = 'utf-8') -> list:
+    """Bản decode cũ: cắt một `bytes` mới cho mỗi trường."""
+    length = struct.unpack('!i', data[:4])[0]
+    items = []
+    offset = 4
+    while offset < length + 4:
+        item_type = data[offset:offset + 1]
+        offset += 1
+        if item_type == b's':
+            str_length = struct.unpack('!i', data[offset:offset + 4])[0]
+            offset += 4
+            items.append(data[offset:offset + str_length].decode(encoding))
+            offset += str_length
+        elif item_type == b'i':
+            items.append(struct.unpack('!i', data[offset:offset + 4])[0])
+            offset += 4
+        elif item_type == b'f':
+            items.append(struct.unpack('!f', data[offset:offset + 4])[0])
+            offset += 4
+        else:
+            json_length = struct.unpack('!i', data[offset:offset + 4])[0]
+            offset += 4
+            items.append(json.loads(data[offset:offset + json_length].decode(encoding)))
+            offset += json_length
+    return items
+
+
+def make_items(size: int) -> list:
+    """Tạo danh sách phần tử (chuỗi 48 byte + số nguyên + số thực) ~ `size` byte."""
+    items = []
+    total = 0
+    while total < size:
+        items.extend(("x" * 48, total, 0.5))
+        total += 53 + 5 + 5
+    return items
+
+
+def run(label: str, func, number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"  {label:<16} {seconds * 1e6:12.1f} µs")
+    return seconds
+
+
+def main():
+    packager = DataPackager()  # Cùng định dạng với bản cũ (mặc định)
+
+    for name, size, number in (("1 KB", 1024, 2000), ("64 KB", 64 * 1024, 50), ("1 MB", 1024 * 1024, 3)):
+        items = make_items(size)
+        data = packager.encode(items)
+        assert data == legacy_encode(items), "Dữ liệu trên đường truyền phải giống nhau"
+
+        print(f"{name} ({len(items)} phần tử, {len(data)} bytes)")
+        old = run("encode (cũ)", lambda: legacy_encode(items), number)
+        new = run("encode (mới)", lambda: packager.encode(items), number)
+        print(f"  {'tăng tốc':<16} {old / new:12.1f}x")
+
+        old = run("decode (cũ)", lambda: legacy_decode(data), number)
+        new = run("decode (mới)", lambda: packager.decode(data), number)
+        print(f"  {'tăng tốc':<16} {old / new:12.1f}x")
+
+    native = DataPackager(native=True)  # Phiên đã chọn tham gia trong HANDSHAKE
+    response = [{
+        "status": "success", "code": 9001, "message": "Đăng nhập thành công.",
+        "timestamp": "2024-10-20T10:00:00.000000", "token": "x" * 120
+    }]
+    legacy_data, native_data = packager.encode(response), native.encode(response)
+
+    print(f"Dict nhỏ ({len(legacy_data)} bytes JSON, {len(native_data)} bytes map)")
+    old = run("encode (JSON)", lambda: packager.encode(response), 20000)
+    new = run("encode (map)", lambda: native.encode(response), 20000)
+    print(f"  {'tăng tốc':<16} {old / new:12.1f}x")
+
+    old = run("decode (JSON)", lambda: packager.decode(legacy_data), 20000)
+    new = run("decode (map)", lambda: native.decode(native_data), 20000)
+    print(f"  {'tăng tốc':<16} {old / new:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -204,6 +204,20 @@ class UIConfigs:
             label, value_label = self._create_label(self.info_frame2, text, value, icon, idx)
             self.labels.append((label, value_label))
 
+        self.info_frame3 = ctk.CTkFrame(self.root)
+        self.info_frame3.pack(side=tk.LEFT, fill=tk.Y, padx=8, pady=8)
+
+        # Lấy từ sources.server.metrics: lệnh/giây, p99 chậm nhất, lưu lượng, số yêu cầu bị chặn
+        metrics_labels = [
+            ("  Req/s   ", "0", '5.png'),
+            ("  p99     ", "N/A", '5.png'),
+            ("  In/Out  ", "0/0 KB", '8.png'),
+            ("  Limited ", "0", '8.png')
+        ]
+        for idx, (text, value, icon) in enumerate(metrics_labels):
+            label, value_label = self._create_label(self.info_frame3, text, value, icon, idx)
+            self.labels.append((label, value_label))
+
     @staticmethod
     def _create_label(frame, text, value, icon, row):
         label_font = ('JetBrainsMono-VariableFont', 14)
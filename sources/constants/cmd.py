@@ -13,12 +13,14 @@ class Cmd:
 
     UPDATE = 5          # Mã lệnh để cập nhật
     DEAL = 6            # Mã lệnh để giao dịch
+    HANDSHAKE = 7       # Mã lệnh thỏa thuận tính năng của phiên (nén, ...)
 
 
 class Codes:
     # Mã thành công
     LOGIN_SUCCESS = 9001   # Đăng nhập thành công
     LOGOUT_SUCCESS = 9002  # Đăng xuất thành công
+    LOGIN_QUEUED = 9003    # Đăng nhập đang chờ trong hàng đợi
 
     # Mã lỗi
     COMMAND_CODE_INVALID = 6001   # Lệnh không hợp lệ
@@ -29,4 +31,7 @@ class Codes:
     USER_ID_INVALID = 6007        # ID người dùng không hợp lệ
     TOKEN_REQUIRED = 6010         # Yêu cầu token
     TOKEN_INVALID = 6011          # Token không hợp lệ
-    PLAYER_INFO_NOT_FOUND = 6009  # Không tìm thấy thông tin người chơi
\ No newline at end of file
+    PLAYER_INFO_NOT_FOUND = 6009  # Không tìm thấy thông tin người chơi
+    SERVER_BUSY = 6012            # Hàng đợi đăng nhập đầy
+    RATE_LIMITED = 6013           # Gửi lệnh quá nhanh
+    DATA_INVALID = 4004           # Dữ liệu không đúng định dạng của lệnh
\ No newline at end of file
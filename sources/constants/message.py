@@ -11,6 +11,7 @@ class Messages:
         # Success messages
         9001: "Đăng nhập thành công.",
         9002: "Đăng xuất thành công.",
+        9003: "Đang chờ đăng nhập.",
         9501: "Dữ liệu đã gửi thành công.",
         9502: "Dữ liệu đã nhận thành công.",
         1000: "Pass",
@@ -22,11 +23,16 @@ class Messages:
         3001: "Lỗi timeout.",
         4001: "Lỗi khi giải mã dữ liệu.",
         4002: "Kiểu dữ liệu không được hỗ trợ.",
+        4003: "Frame không hợp lệ hoặc vượt quá kích thước cho phép.",
+        4004: "Dữ liệu không đúng định dạng của lệnh.",
         5001: "Lỗi không xác định.",
         5002: "Lỗi mạng: Tên mạng được chỉ định không còn khả dụng.",
         5003: "Lỗi trong khi gửi.",
         5004: "Lỗi không mong muốn trong khi gửi.",
         5005: "Không có dữ liệu nhận được.",
+        5006: "Hàng đợi gửi đầy, dữ liệu bị bỏ qua.",
+        5007: "Client nhận dữ liệu quá chậm, kết nối bị ngắt.",
+        5008: "Máy chủ đang khởi động lại, vui lòng kết nối lại sau.",
         6001: "Lệnh không hợp lệ.",
         6002: "Không có quyền truy cập.",
         6003: "Lỗi xử lý lệnh.",
@@ -38,7 +44,9 @@ class Messages:
         6008: "Cần có email và mật khẩu.",
         6009: "Người chơi không tìm thấy.",
         6010: "Token là bắt buộc.",
-        6011: "Token không hợp lệ."
+        6011: "Token không hợp lệ.",
+        6012: "Máy chủ đang quá tải, vui lòng thử lại sau.",
+        6013: "Bạn gửi lệnh quá nhanh, vui lòng thử lại sau."
     }
 
     @classmethod
@@ -1,5 +1,5 @@
 # Copyright (C) PhcNguyen Developers
 # Distributed under the terms of the Modified BSD License.
 
-from sources.handlers.account import AccountHandler
-from sources.handlers.player import PlayerHandler
\ No newline at end of file
+# Importing the handler modules registers their commands in CommandRegistry
+from sources.handlers import account, connection, player
@@ -4,67 +4,74 @@
 from datetime import datetime, timedelta
 from sources.constants.result import ResultBuilder
 from sources.manager.security import JwtManager
-from sources.constants.cmd import Codes
+from sources.constants.cmd import Cmd, Codes
 from sources.handlers.utils import is_valid_user_id
+from sources.server.commands import Context, command
 
 
-class AccountHandler:
-    def __init__(self, database):
-        self.database = database
+@command(Cmd.LOGIN, queued=True, cost=5)
+async def login(ctx: Context, data: dict) -> dict:
+    email = data.get("email", "").lower()
+    password = data.get("password", "")
 
-    async def login(self, data: dict) -> dict:
-        email = data.get("email", "").lower()
-        password = data.get("password", "")
+    if not email or not password:
+        return ResultBuilder.error(Codes.MISSING_CREDENTIALS)
 
-        if not email or not password:
-            return ResultBuilder.error(Codes.MISSING_CREDENTIALS)
+    status, account_info = await ctx.database.account.info(email)
 
-        status, account_info = await self.database.account.info(email)
+    if not account_info:
+        return ResultBuilder.error(message="Tài khoản không tồn tại.")
 
-        if not account_info:
-            return ResultBuilder.error(message="Tài khoản không tồn tại.")
+    if account_info["last_login"]:
+        last_login_time = account_info["last_login"]
+        current_time = datetime.now()
 
-        if account_info["last_login"]:
-            last_login_time = account_info["last_login"]
-            current_time = datetime.now()
+        # Define the time limit for logins (e.g., 20 seconds)
+        time_limit = timedelta(seconds=20)
 
-            # Define the time limit for logins (e.g., 20 seconds)
-            time_limit = timedelta(seconds=20)
+        if current_time - last_login_time < time_limit:
+            return ResultBuilder.error(Codes.LOGIN_TOO_FAST)
 
-            if current_time - last_login_time < time_limit:
-                return ResultBuilder.error(Codes.LOGIN_TOO_FAST)
+    await ctx.database.account.update_last_login(email)
 
-        await self.database.account.update_last_login(email)
+    status, message = await ctx.database.account.login(email, password)
 
-        status, message = await self.database.account.login(email, password)
+    if status:
+        if not account_info["active"]:
+            return ResultBuilder.error(Codes.ACCOUNT_ACTIVE)
 
-        if status:
-            if not account_info["active"]:
-                return ResultBuilder.error(Codes.ACCOUNT_ACTIVE)
+        token = await JwtManager.create_token(email)
+        ctx.bind_account(account_info["id"])
+        return ResultBuilder.success(Codes.LOGIN_SUCCESS, token=token, id=account_info["id"])
 
-            token = JwtManager.create_token(email)
-            return ResultBuilder.success(Codes.LOGIN_SUCCESS, token=token)
+    return ResultBuilder.error(message="Mật khẩu không đúng.")
 
-        return ResultBuilder.error(message="Mật khẩu không đúng.")
 
-    async def logout(self, data: dict) -> dict:
-        user_id = data.get("id")
-        if user_id is None or (user_id := is_valid_user_id(user_id)) is None:
-            return ResultBuilder.error(Codes.USER_ID_INVALID)
+@command(Cmd.LOGOUT, auth=True)
+async def logout(ctx: Context, data: dict) -> dict:
+    user_id = data.get("id")
+    if user_id is None or (user_id := is_valid_user_id(user_id)) is None:
+        return ResultBuilder.error(Codes.USER_ID_INVALID)
 
-        await self.database.account.logout(user_id)
-        return ResultBuilder.success(Codes.LOGOUT_SUCCESS)
+    if user_id != ctx.session.account_id:
+        return ResultBuilder.error(Codes.ACCESS_DENIED)  # Only the account logged in on this session
 
-    async def register(self, data: dict) -> dict:
-        email = data.get("email", "")
-        password = data.get("password", "")
+    await ctx.database.account.logout(user_id)
+    ctx.unbind_account()
+    return ResultBuilder.success(Codes.LOGOUT_SUCCESS)
 
-        if not email or not password:
-            return ResultBuilder.error(Codes.MISSING_CREDENTIALS)
 
-        status, message = await self.database.account.register(email, password)
-        if status:
-            return ResultBuilder.success(Codes.LOGIN_SUCCESS)
+@command(Cmd.REGISTER, cost=10)
+async def register(ctx: Context, data: dict) -> dict:
+    email = data.get("email", "")
+    password = data.get("password", "")
 
-        # Return the error message from the registration process
-        return ResultBuilder.error(message=message)
+    if not email or not password:
+        return ResultBuilder.error(Codes.MISSING_CREDENTIALS)
+
+    status, message = await ctx.database.account.register(email, password)
+    if status:
+        return ResultBuilder.success(Codes.LOGIN_SUCCESS)
+
+    # Return the error message from the registration process
+    return ResultBuilder.error(message=message)
@@ -0,0 +1,57 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import time
+
+from sources.constants.cmd import Cmd
+from sources.server.IO.schema import SchemaRegistry
+from sources.server.commands import Context, command
+from sources.handlers.utils import is_valid_input
+
+
+PING_RESPONSE = SchemaRegistry.get(Cmd.PING).encode({"command": Cmd.PING})  # Always the same bytes
+
+
+@command(Cmd.PING)
+async def ping(ctx: Context, data=None) -> bytes:
+    return PING_RESPONSE
+
+
+@command(Cmd.PONG, cost=0)
+async def pong(ctx: Context, data: dict) -> None:
+    """Answer to a server heartbeat: record the RTT, nothing is sent back."""
+    if ctx.session is not None:
+        ctx.session.rtt.pong(data["seq"], time.monotonic())
+
+
+@command(Cmd.UPDATE, auth=True, validate=is_valid_input)
+async def update(ctx: Context, data) -> None:
+    """Queue a player input; its result arrives in the world tick's delta frame."""
+    if ctx.world is not None:
+        ctx.world.submit(ctx.session.id, data)
+
+
+@command(Cmd.HANDSHAKE)
+async def handshake(ctx: Context, data: dict) -> bytes:
+    """Enable the session features the client opted in to."""
+    transport = ctx.transport
+    if data["compression"]:
+        transport.enable_compression()
+    if data["streaming"]:
+        transport.enable_streaming()
+    if data["multiplex"]:
+        transport.enable_multiplex()
+    if data["native"]:
+        transport.enable_native()
+    if data["heartbeat"] and ctx.controller.heartbeat is not None and ctx.session is not None:
+        ctx.controller.heartbeat.add(ctx.session)  # Unsolicited pings only for clients that expect them
+
+    return SchemaRegistry.get(Cmd.HANDSHAKE).encode({
+        "compression": transport.compression,
+        "streaming": transport.streaming,
+        "multiplex": transport.multiplex,
+        "native": transport.native,
+        "heartbeat": ctx.controller.heartbeat is not None and ctx.session in ctx.controller.heartbeat,
+        "threshold": transport.compression_threshold,
+        "max_inflight": ctx.controller.MAX_INFLIGHT
+    })
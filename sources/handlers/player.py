@@ -3,31 +3,28 @@
 
 from sources.constants.result import ResultBuilder
 from sources.manager.security import JwtManager
-from sources.constants.cmd import Codes
+from sources.constants.cmd import Cmd, Codes
 from sources.handlers.utils import is_valid_user_id
+from sources.server.commands import Context, command
 
 
+@command(Cmd.PLAYER_INFO)
+async def player_info(ctx: Context, data: dict):
+    token = data.get("token")
+    if not token:
+        return ResultBuilder.error(Codes.TOKEN_REQUIRED)
 
-class PlayerHandler:
-    def __init__(self, database):
-        self.database = database
+    try:
+        await JwtManager.verify_token(token)
+    except Exception as error:
+        return ResultBuilder.error(Codes.TOKEN_INVALID, error=str(error))
 
-    async def player_info(self, data: dict):
-        token = data.get("token")
-        if not token:
-            return ResultBuilder.error(Codes.TOKEN_REQUIRED)
+    user_id = data.get("id")
+    if user_id is None or (user_id := is_valid_user_id(user_id)) is None:
+        return ResultBuilder.error(Codes.USER_ID_INVALID)
 
-        try:
-            JwtManager.verify_token(token)
-        except Exception as error:
-            return ResultBuilder.error(Codes.TOKEN_INVALID, error=error)
+    info = await ctx.database.player.get(user_id)
+    if info is None:
+        return ResultBuilder.error(Codes.PLAYER_INFO_NOT_FOUND)
 
-        user_id = data.get("id")
-        if user_id is None or (user_id := is_valid_user_id(user_id)) is None:
-            return ResultBuilder.error(Codes.USER_ID_INVALID)
-
-        info = await self.database.player.get(user_id)
-        if info is None:
-            return ResultBuilder.error(Codes.PLAYER_INFO_NOT_FOUND)
-
-        return ResultBuilder.info(info=info)
\ No newline at end of file
+    return ResultBuilder.info(info=info)
\ No newline at end of file
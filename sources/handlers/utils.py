@@ -1,10 +1,16 @@
 # Copyright (C) PhcNguyen Developers
 # Distributed under the terms of the Modified BSD License.
 
+from sources.server.aoi import parse_position
 
 
 def is_valid_user_id(user_id):
     try:
         return int(user_id)
     except ValueError:
-        return None
\ No newline at end of file
+        return None
+
+
+def is_valid_input(data: dict) -> bool:
+    """UPDATE input (decoded by its schema): `position` must be 'map,x,y'."""
+    return parse_position(data["position"]) is not None
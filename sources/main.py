@@ -5,15 +5,40 @@ import sys
 
 from sources.manager.sql import MySQL, SQLite
 from sources.server.tcpserver import TCPServer
+from sources.utils.cpu import CpuExecutor
 
 
 
 if __name__ == "__main__":
     sql = MySQL() if "--mysql" in sys.argv else SQLite()
-    tcp_server = TCPServer(TCPServer.LOCAL, TCPServer.PORT, sql)
+    config = {"BACKEND": "protocol" if "--protocol" in sys.argv else "streams"}  # TCPServer settings
+
+    # '--cpu-workers N': processes of the CPU executor (bcrypt, JWT), per server process
+    cpu_processes = None
+    if "--cpu-workers" in sys.argv:
+        index = sys.argv.index("--cpu-workers") + 1
+        if index < len(sys.argv) and sys.argv[index].isdigit():
+            cpu_processes = CpuExecutor.PROCESSES = int(sys.argv[index])
+
+    # '--metrics-port N' (0: disabled): Prometheus endpoint on 127.0.0.1, one port per worker from N
+    if "--metrics-port" in sys.argv:
+        index = sys.argv.index("--metrics-port") + 1
+        if index < len(sys.argv) and sys.argv[index].isdigit():
+            config["METRICS_PORT"] = int(sys.argv[index]) or None
+    tcp_server = TCPServer(TCPServer.LOCAL, TCPServer.PORT, sql, config)
+
+    # '--workers N': multi-process mode (SO_REUSEPORT), headless
+    if "--workers" in sys.argv:
+        import asyncio
+        from sources.server.supervisor import Supervisor
+
+        index = sys.argv.index("--workers") + 1
+        workers = int(sys.argv[index]) if index < len(sys.argv) and sys.argv[index].isdigit() else None
+        supervisor = Supervisor(TCPServer.LOCAL, TCPServer.PORT, type(sql), workers, config, cpu_processes)
+        asyncio.run(supervisor.run())
 
     # Check for the '--nogui' argument
-    if "--nogui" in sys.argv:
+    elif "--nogui" in sys.argv:
         from sources.ui.terminal import Terminal
 
         app = Terminal(tcp_server)
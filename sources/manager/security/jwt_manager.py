@@ -7,6 +7,7 @@ import time
 import secrets
 import datetime
 from sources.configs import file_paths
+from sources.utils.cpu import cpu
 from sources.utils.realtime import TimeUtil
 
 
@@ -43,19 +44,19 @@ class JwtManager:
         cls._initialize_secret_key()
 
     @staticmethod
-    def create_token(email: str, hours=1) -> str:
-        """Tạo token JWT với email và thời gian hết hạn."""
+    async def create_token(email: str, hours=1) -> str:
+        """Tạo token JWT với email và thời gian hết hạn (ký trong CpuExecutor)."""
         payload = {
             "email": email,
             "exp": TimeUtil.now_vietnam() + datetime.timedelta(hours=hours)  # Token hết hạn sau 2 giờ
         }
-        return jwt.encode(payload, JwtManager.SECRET_KEY, algorithm="HS256")
+        return await cpu.jwt_encode(payload, JwtManager.SECRET_KEY, "HS256")
 
     @staticmethod
-    def verify_token(token: str) -> dict:
-        """Xác minh tính hợp lệ của token và trả về payload nếu hợp lệ."""
+    async def verify_token(token: str) -> dict:
+        """Xác minh tính hợp lệ của token và trả về payload nếu hợp lệ (trong CpuExecutor)."""
         try:
-            payload = jwt.decode(token, JwtManager.SECRET_KEY, algorithms=["HS256"])
+            payload = await cpu.jwt_decode(token, JwtManager.SECRET_KEY, "HS256")
             return payload  # Trả về payload nếu token hợp lệ
 
         except jwt.ExpiredSignatureError:
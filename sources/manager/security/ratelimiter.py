@@ -1,67 +1,82 @@
 # Copyright (C) PhcNguyen Developers
 # Distributed under the terms of the Modified BSD License.
 
-import asyncio
-import datetime
+import time
 
-from collections import defaultdict
+from collections import OrderedDict
+from typing import Dict
 
 
 
 class RateLimiter:
-    def __init__(self, limit: int, period: int, lockout_period: int = 300):
+    """
+    Giới hạn tốc độ theo GCRA (Generic Cell Rate Algorithm, tương đương token bucket).
+
+    Mỗi khóa (IP) chỉ lưu một số thực: thời điểm đến lý thuyết (TAT) trên đồng
+    hồ monotonic. Một yêu cầu có chi phí `cost` được chấp nhận nếu
+    `max(TAT, now) + cost / rate - now <= burst / rate`, khi đó TAT tăng thêm
+    `cost / rate`. Không có danh sách thời gian, không có lock (chỉ chạy trên
+    một event loop) và không có vòng dọn dẹp: các khóa được sắp theo lần dùng
+    gần nhất và khóa cũ nhất bị bỏ ngay khi TAT của nó đã qua (lúc đó nó
+    tương đương một khóa chưa từng gặp).
+    """
+
+    MAX_KEYS: int = 1_000_000  # Giới hạn bộ nhớ: bỏ khóa ít dùng nhất khi vượt quá
+
+    def __init__(self, rate: float, burst: float, lockout_period: float = 300):
         """
-        :param limit: Giới hạn số yêu cầu trong khoảng thời gian period.
-        :param period: Thời gian tính bằng giây để reset giới hạn yêu cầu.
-        :param lockout_period: Thời gian khóa IP khi bị vượt quá giới hạn (tính bằng giây, mặc định là 300 giây = 5 phút).
+        :param rate: Số đơn vị chi phí được hoàn lại mỗi giây.
+        :param burst: Số đơn vị tối đa được dùng cùng lúc (dung lượng của bucket).
+        :param lockout_period: Thời gian khóa khi vượt quá giới hạn (giây, 0: không khóa).
         """
-        self.limit = limit
-        self.period = period
-        self.running = False
-        self.blocked_ips = {}
-        self.lock = asyncio.Lock()
-        self.requests = defaultdict(list)
+        if rate <= 0 or burst <= 0 or lockout_period < 0:
+            raise ValueError("Giới hạn tốc độ không hợp lệ.")
+
+        self.rate = rate
+        self.burst = burst
+        self.interval = 1.0 / rate        # Thời gian hoàn lại một đơn vị chi phí
+        # Độ lệch tối đa của TAT so với hiện tại; cộng thêm một sai số nhỏ vì TAT là
+        # tổng số thực trên đồng hồ lớn (~1e5 s), nếu không burst đầy đủ có thể bị từ chối
+        self.tolerance = burst / rate + 1e-9
         self.lockout_period = lockout_period
+        self.tat: "OrderedDict[str, float]" = OrderedDict()  # Khóa -> TAT, cũ nhất ở đầu
+
+        self.allowed = 0
+        self.rejected = 0
+
+    def allow(self, key: str, cost: float = 1.0) -> bool:
+        """Tính phí `cost` cho `key`; False nếu vượt quá giới hạn (không tính phí)."""
+        now = time.monotonic()
+        tat = self.tat.get(key, now)
+        if tat < now:
+            tat = now
+
+        if (new_tat := tat + cost * self.interval) - now > self.tolerance:
+            if self.lockout_period:
+                # Khóa: đẩy TAT ra xa, bucket được hoàn lại bình thường sau đó
+                self.tat[key] = max(tat, now + self.lockout_period + self.tolerance)
+                self.tat.move_to_end(key)
+            self.rejected += 1
+            return False
+
+        self.tat[key] = new_tat
+        self.tat.move_to_end(key)
+        self.allowed += 1
+
+        # Bỏ khóa cũ nhất nếu đã hết hạn (tối đa 2 mỗi lần, O(1)) hoặc khi vượt MAX_KEYS
+        for _ in range(2):
+            if not self.tat:
+                break
+            oldest = next(iter(self.tat))
+            if self.tat[oldest] > now and len(self.tat) <= self.MAX_KEYS:
+                break
+            del self.tat[oldest]
+
+        return True
+
+    def reset(self, key: str) -> None:
+        """Xóa trạng thái của `key` (mở khóa)."""
+        self.tat.pop(key, None)
 
-    async def is_allowed(self, ip_address: str) -> bool:
-        """Kiểm tra xem yêu cầu từ IP có được cho phép hay không."""
-        if not isinstance(ip_address, str):
-            raise ValueError("IP address must be a string.")
-
-        current_time = datetime.datetime.now()
-
-        async with self.lock:  # Bảo vệ truy cập đồng thời
-            # Kiểm tra xem IP có bị khóa không
-            if ip_address in self.blocked_ips:
-                block_end_time = self.blocked_ips[ip_address]
-                if current_time < block_end_time:
-                    return False  # IP vẫn bị khóa
-                else:
-                    del self.blocked_ips[ip_address]  # Hết thời gian khóa, xóa khỏi danh sách
-
-            # Lọc các yêu cầu cũ
-            self.requests[ip_address] = [
-                request_time for request_time in self.requests[ip_address]
-                if (current_time - request_time).total_seconds() < self.period
-            ]
-
-            # Kiểm tra số yêu cầu hiện tại
-            if len(self.requests[ip_address]) < self.limit:
-                self.requests[ip_address].append(current_time)  # Thêm thời gian yêu cầu mới
-                return True
-            else:
-                # Khóa IP trong thời gian lockout_period
-                self.blocked_ips[ip_address] = current_time + datetime.timedelta(seconds=self.lockout_period)
-                return False
-
-    async def clean_inactive_ips(self):
-        """Loại bỏ các IP không gửi yêu cầu trong thời gian dài."""
-        while self.running:
-            current_time = datetime.datetime.now()
-            inactive_ips = [
-                ip for ip, times in self.requests.items()
-                if all((current_time - t).total_seconds() >= self.period for t in times)
-            ]
-            for ip in inactive_ips: del self.requests[ip]
-
-            await asyncio.sleep(300)
\ No newline at end of file
+    def stats(self) -> Dict:
+        return {"keys": len(self.tat), "allowed": self.allowed, "rejected": self.rejected}
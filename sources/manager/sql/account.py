@@ -1,10 +1,11 @@
 # Copyright (C) PhcNguyen Developers
 # Distributed under the terms of the Modified BSD License.
 
-import bcrypt
 import aiosqlite
 
 from sources.utils import types
+from sources.utils.cpu import cpu
+from sources.utils.tracing import tracer
 from sources.manager.sql.utils import (
     queries_line,
     is_valid_email,
@@ -19,14 +20,16 @@ class SQLAccount:
 
     async def _execute(self, query: str, params: tuple = ()) -> aiosqlite.Cursor:
         """Helper function to execute a query."""
-        async with self.database.lock:
-            async with self.database.conn.execute(query, params) as cursor:
-                return cursor
+        with tracer.span("db"):  # Includes waiting for the lock
+            async with self.database.lock:
+                async with self.database.conn.execute(query, params) as cursor:
+                    return cursor
 
     async def _commit(self):
         """Helper function to commit the transaction."""
-        async with self.database.lock:
-            await self.database.conn.commit()
+        with tracer.span("db"):
+            async with self.database.lock:
+                await self.database.conn.commit()
 
     async def _account_exists(self, email: str) -> bool:
         """Check if an account with the given email exists."""
@@ -72,7 +75,7 @@ class SQLAccount:
             if await self._account_exists(email):
                 return False, "Tài khoản đã tồn tại."
 
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+            hashed_password = await cpu.hash_password(password)  # bcrypt off the event loop
             await self._execute(await queries_line(21), (email, hashed_password))
             await self._commit()
             return True, "Tạo tài khoản thành công."
@@ -90,7 +93,7 @@ class SQLAccount:
             if account[3]:
                 return False, "Tài khoản đã bị khóa."
 
-            if bcrypt.checkpw(password.encode('utf-8'), account["password"]):
+            if await cpu.check_password(password, account["password"]):
                 if account[5]:
                     return False, "Tài khoản đang hoạt động."
 
@@ -113,10 +116,10 @@ class SQLAccount:
         if not success:
             return False, account  # Return the error message
 
-        if not bcrypt.checkpw(old_password.encode('utf-8'), account[2]):
+        if not await cpu.check_password(old_password, account[2]):
             return False, "Mật khẩu cũ không chính xác."
 
-        hashed_new_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+        hashed_new_password = await cpu.hash_password(new_password)
         await self._execute(await queries_line(41), (hashed_new_password, account[0]))
         await self._commit()
 
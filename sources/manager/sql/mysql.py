@@ -38,6 +38,12 @@ class MySQL:
             await Logger.info(f"MySQL đạ được kết nối tại {self.ip}")
             return True
 
+    async def flush(self) -> None:
+        """Commit any pending transaction (used before shutdown)."""
+        if self.conn:
+            async with self.lock:
+                await self.conn.commit()
+
     async def close(self) -> bool:
         """Close the MySQL connection."""
         if self.conn:
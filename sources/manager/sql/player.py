@@ -5,6 +5,7 @@ import aiosqlite
 
 from sources.utils import types
 from sources.utils.logger import Logger
+from sources.utils.tracing import tracer
 from sources.manager.sql.utils import queries_line
 
 
@@ -17,9 +18,10 @@ class SQLPlayer:
     async def dump_data(self, **kwargs) -> bool:
         """Insert a new player into the player table using keyword arguments."""
         try:
-            async with self.database.lock:
-                await self.database.conn.execute(await queries_line(22), (kwargs['name'],))
-                await self.database.conn.commit()
+            with tracer.span("db"):
+                async with self.database.lock:
+                    await self.database.conn.execute(await queries_line(22), (kwargs['name'],))
+                    await self.database.conn.commit()
             return True
         except aiosqlite.Error as error:
             await Logger.error(f"SQL: {error}", False)
@@ -53,9 +55,10 @@ class SQLPlayer:
         [21] Mô tả về người chơi
         """
         try:
-            async with self.database.lock:
-                result = await self.database.conn.execute(await queries_line(3), (user_id,))
-                data = await result.fetchone()
+            with tracer.span("db"):
+                async with self.database.lock:
+                    result = await self.database.conn.execute(await queries_line(3), (user_id,))
+                    data = await result.fetchone()
 
             if data: return data
 
@@ -71,15 +74,16 @@ class SQLPlayer:
             return False
 
         try:
-            async with self.database.lock:
-                fields = ', '.join(f"{key} = ?" for key in kwargs.keys())
-                values = list(kwargs.values()) + [user_id]
+            with tracer.span("db"):
+                async with self.database.lock:
+                    fields = ', '.join(f"{key} = ?" for key in kwargs.keys())
+                    values = list(kwargs.values()) + [user_id]
 
-                query: str = await queries_line(48)
-                query.replace('{fields}', ', '.join(fields))
+                    query: str = await queries_line(48)
+                    query.replace('{fields}', ', '.join(fields))
 
-                await self.database.conn.execute(query, values)
-                await self.database.conn.commit()
+                    await self.database.conn.execute(query, values)
+                    await self.database.conn.commit()
 
             return True
         except aiosqlite.Error as error:
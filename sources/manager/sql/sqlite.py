@@ -47,6 +47,12 @@ class SQLite:
             await Logger.info("SQL: Connection already established.")
             return True
 
+    async def flush(self) -> None:
+        """Commit any pending transaction (used before shutdown)."""
+        if self.conn:
+            async with self.lock:
+                await self.conn.commit()
+
     async def close(self) -> None:
         """Close the SQLite connection."""
         if self.conn:
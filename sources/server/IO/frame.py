@@ -0,0 +1,107 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import struct
+
+from typing import List, Tuple
+
+
+# Header của một frame: 1 byte lệnh (signed) + 4 byte độ dài payload (DataPackager)
+HEADER = struct.Struct('!bI')
+HEADER_SIZE = HEADER.size
+LENGTH = struct.Struct('!I')
+
+# 3 bit cao của trường độ dài dành cho cờ (client cũ không bao giờ đặt các bit này)
+FLAG_MASK = 0xE0000000
+LENGTH_MASK = 0x1FFFFFFF
+FLAG_COMPRESSED = 0x80000000  # Payload được nén bằng zlib
+FLAG_CHUNKED = 0x40000000     # Payload là một chunk của stream (xem IO/stream.py)
+FLAG_REQUEST_ID = 0x20000000  # Payload bắt đầu bằng 4 byte request id
+
+# Request id đứng ngay sau trường độ dài và được tính vào độ dài
+REQUEST_ID = struct.Struct('!I')
+
+MAX_FRAME_SIZE = 16 * 1024 * 1024  # 16MB
+
+
+class FrameError(Exception):
+    """Frame không hợp lệ, luồng dữ liệu không thể tiếp tục phân tích."""
+
+
+class FrameParser:
+    """
+    Bộ phân tích frame tăng dần cho luồng TCP.
+
+    Dữ liệu nhận được được nối vào một bộ đệm duy nhất; mỗi lần `feed` trả về
+    tất cả các frame hoàn chỉnh và giữ lại phần dư (frame chưa đủ) cho lần sau.
+    Phần dư chỉ bị dịch về đầu bộ đệm một lần cho mỗi lần `feed`.
+    """
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE) -> None:
+        if max_frame_size <= 0:
+            raise ValueError("Kích thước frame tối đa phải lớn hơn 0.")
+
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+        self.flags = 0  # Các cờ đã được thỏa thuận với client
+
+    def __len__(self) -> int:
+        """Số byte đang chờ trong bộ đệm (frame chưa hoàn chỉnh)."""
+        return len(self.buffer)
+
+    def clear(self) -> None:
+        """Xóa toàn bộ dữ liệu đang chờ."""
+        self.buffer.clear()
+
+    def feed(self, data: bytes) -> List[Tuple[int, int, bytes]]:
+        """
+        Thêm dữ liệu vào bộ đệm và trả về các frame hoàn chỉnh.
+
+        Mỗi frame là một tuple (command, flags, payload) trong đó payload là dữ
+        liệu DataPackager (bao gồm 4 byte độ dài, đã xóa cờ) có thể đưa thẳng
+        vào `decode`.
+        """
+        buffer = self.buffer
+        buffer.extend(data)
+
+        frames = []
+        offset = 0
+        available = len(buffer)
+        error = None
+
+        with memoryview(buffer) as view:
+            while available - offset >= HEADER_SIZE:
+                command, length = HEADER.unpack_from(view, offset)
+                flags = length & FLAG_MASK
+                length &= LENGTH_MASK
+
+                if flags & ~self.flags:
+                    error = f"Cờ frame chưa được thỏa thuận: {flags:#x}."
+                    break
+
+                if length > self.max_frame_size:
+                    error = f"Độ dài frame không hợp lệ: {length}."
+                    break
+
+                end = offset + HEADER_SIZE + length
+                if end > available:
+                    break  # Frame chưa đủ dữ liệu, chờ lần đọc sau
+
+                if flags:
+                    payload = bytearray(view[offset + 1:end])
+                    LENGTH.pack_into(payload, 0, length)  # Xóa cờ khỏi trường độ dài
+                    payload = bytes(payload)
+                else:
+                    payload = bytes(view[offset + 1:end])
+
+                frames.append((command, flags, payload))
+                offset = end
+
+        if error is not None:
+            buffer.clear()
+            raise FrameError(error)
+
+        if offset:
+            del buffer[:offset]  # Dịch phần dư về đầu bộ đệm (một lần)
+
+        return frames
@@ -1,70 +1,217 @@
 import struct
 import json
 
+from itertools import chain
+
+
+# Các cấu trúc được biên dịch sẵn (big-endian)
+_LENGTH = struct.Struct('!i')
+_INT64 = struct.Struct('!q')
+_FLOAT = struct.Struct('!f')
+_DOUBLE = struct.Struct('!d')
+
+# Tiền tố kiểu + giá trị, ghi bằng một lần pack
+_TAG_LENGTH = struct.Struct('!ci')  # 's', 'y', 'j' (độ dài), 'i', 'm', 'a' (số phần tử)
+_TAG_INT64 = struct.Struct('!cq')
+_TAG_FLOAT = struct.Struct('!cf')
+_TAG_DOUBLE = struct.Struct('!cd')
+_TAG_BOOL = struct.Struct('!c?')
+
+_INT32_MIN, _INT32_MAX = -2 ** 31, 2 ** 31 - 1
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+MAX_DEPTH = 32  # Độ sâu lồng nhau tối đa của map/array
+
+
 class DataPackager:
-    def __init__(self, encoding: str = 'utf-8'):
+    """
+    Mã hóa/giải mã danh sách phần tử theo định dạng: 4 byte tổng độ dài + các
+    phần tử có tiền tố kiểu.
+
+    Tiền tố:
+    - 's' chuỗi, 'i' int32, 'f' float32, 'j' JSON (định dạng cũ)
+    - 'q' int64, 'd' float64, 'b' bool, 'n' None, 'y' bytes
+    - 'm' map (số cặp + khóa/giá trị), 'a' array (số phần tử + các phần tử)
+
+    Mặc định (`native=False`) dict/list được mã hóa bằng 'j' và số thực bằng
+    'f' như trước, để client cũ vẫn giải mã được; các tiền tố mới chỉ được
+    dùng cho phiên đã chọn tham gia trong HANDSHAKE. Bộ giải mã luôn hiểu
+    mọi tiền tố.
+    """
+
+    def __init__(self, encoding: str = 'utf-8', native: bool = False):
         self.encoding = encoding
+        self.native = native
 
-    def encode(self, items: list) -> bytes:
-        """Mã hóa danh sách các phần tử thành bytes."""
-        encoded_data = b''
+    def _write(self, items, out: bytearray, depth: int = 0) -> bool:
+        """
+        Ghi từng phần tử (tiền tố + giá trị) vào cuối `out` bằng các struct biên
+        dịch sẵn; False nếu có kiểu không hỗ trợ. Các kiểu phổ biến được so
+        khớp bằng `type(...) is`, các kiểu còn lại đi qua `_write_other`.
+        """
+        if depth > MAX_DEPTH:
+            return False
+
+        native = self.native
+        encoding = self.encoding
 
         for item in items:
-            if isinstance(item, str):  # Chuỗi
-                encoded_data += b's'  # Tiền tố xác định là chuỗi
-                str_bytes = item.encode(self.encoding)
-                encoded_data += struct.pack('!i', len(str_bytes))  # Độ dài chuỗi
-                encoded_data += str_bytes  # Nội dung chuỗi
-            elif isinstance(item, int):  # Số nguyên
-                encoded_data += b'i'  # Tiền tố xác định là số nguyên
-                encoded_data += struct.pack('!i', item)  # Giá trị số nguyên
-            elif isinstance(item, float):  # Số thực
-                encoded_data += b'f'  # Tiền tố xác định là số thực
-                encoded_data += struct.pack('!f', item)  # Giá trị số thực
-            elif isinstance(item, dict) or isinstance(item, list):  # JSON
-                encoded_data += b'j'  # Tiền tố xác định là JSON
-                json_bytes = json.dumps(item).encode(self.encoding)
-                encoded_data += struct.pack('!i', len(json_bytes))  # Độ dài JSON
-                encoded_data += json_bytes  # Nội dung JSON
-            else:
-                raise b'\x80'
+            kind = type(item)
 
-        # Tiền tố tổng độ dài của dữ liệu
-        total_length = struct.pack('!i', len(encoded_data))
+            if kind is str:  # Chuỗi
+                str_bytes = item.encode(encoding)
+                out += _TAG_LENGTH.pack(b's', len(str_bytes))
+                out += str_bytes
+            elif kind is int:  # Số nguyên
+                if _INT32_MIN <= item <= _INT32_MAX:
+                    out += _TAG_LENGTH.pack(b'i', item)
+                elif native and _INT64_MIN <= item <= _INT64_MAX:
+                    out += _TAG_INT64.pack(b'q', item)
+                else:
+                    return False
+            elif kind is float:  # Số thực
+                out += _TAG_DOUBLE.pack(b'd', item) if native else _TAG_FLOAT.pack(b'f', item)
+            elif not self._write_other(item, out, depth):
+                return False
 
-        return total_length + encoded_data
+        return True
 
-    def decode(self, data: bytes):
-        """Giải mã bytes về kiểu dữ liệu gốc."""
-        if not data:
+    def _write_other(self, item, out: bytearray, depth: int) -> bool:
+        """Các kiểu ít gặp: bool, None, map, array, bytes, JSON và lớp con của str/int/float."""
+        if self.native:
+            if item is True or item is False:  # Boolean
+                out += _TAG_BOOL.pack(b'b', item)
+                return True
+            if item is None:  # None
+                out.append(0x6E)
+                return True
+            if isinstance(item, dict):  # Map
+                out += _TAG_LENGTH.pack(b'm', len(item))
+                return self._write(chain.from_iterable(item.items()), out, depth + 1)
+            if isinstance(item, (list, tuple)):  # Array
+                out += _TAG_LENGTH.pack(b'a', len(item))
+                return self._write(item, out, depth + 1)
+            if isinstance(item, (bytes, bytearray, memoryview)):  # Bytes
+                item = bytes(item)
+                out += _TAG_LENGTH.pack(b'y', len(item))
+                out += item
+                return True
+
+        # Lớp con (IntEnum, bool khi không dùng native, ...): mã hóa như kiểu gốc
+        for base in (str, int, float):
+            if isinstance(item, base):
+                return self._write((base(item),), out, depth)
+
+        if isinstance(item, (dict, list)):  # JSON
+            json_bytes = json.dumps(item).encode(self.encoding)
+            out += _TAG_LENGTH.pack(b'j', len(json_bytes))
+            out += json_bytes
+            return True
+
+        return False
+
+    def encode(self, items: list) -> bytes:
+        """Mã hóa danh sách các phần tử thành bytes."""
+        out = bytearray(_LENGTH.size)  # Chỗ cho tiền tố tổng độ dài, ghi sau cùng
+        try:
+            if not self._write(items, out):
+                return b'\x80'
+        except struct.error:
             return b'\x80'
 
-        length = struct.unpack('!i', data[:4])[0]
+        _LENGTH.pack_into(out, 0, len(out) - _LENGTH.size)
+        return bytes(out)
+
+    def _decode_items(self, view: memoryview, offset: int, count: int, depth: int = 0) -> (list, int):
+        """
+        Giải mã `count` phần tử bắt đầu tại `offset` (count < 0: đến hết `view`).
+        Trả về (danh sách phần tử, vị trí tiếp theo); ValueError nếu dữ liệu hỏng.
+        """
+        if depth > MAX_DEPTH:
+            raise ValueError("Dữ liệu lồng nhau quá sâu.")
+
+        end = len(view)
         items = []
-        offset = 4
+        append = items.append
+        encoding = self.encoding
+        unpack_length = _LENGTH.unpack_from
 
-        while offset < length + 4:
-            item_type = data[offset:offset + 1]
+        while offset < end if count < 0 else len(items) < count:
+            item_type = view[offset]
             offset += 1
 
-            if item_type == b's':  # Chuỗi
-                str_length = struct.unpack('!i', data[offset:offset + 4])[0]
+            if item_type == 0x73:  # 's' - Chuỗi
+                length = unpack_length(view, offset)[0]
                 offset += 4
-                items.append(data[offset:offset + str_length].decode(self.encoding))
-                offset += str_length
-            elif item_type == b'i':  # Số nguyên
-                items.append(struct.unpack('!i', data[offset:offset + 4])[0])
+                if length < 0 or offset + length > end:
+                    raise ValueError("Độ dài chuỗi không hợp lệ.")
+                append(str(view[offset:offset + length], encoding))
+                offset += length
+            elif item_type == 0x69:  # 'i' - Số nguyên
+                append(unpack_length(view, offset)[0])
                 offset += 4
-            elif item_type == b'f':  # Số thực
-                items.append(struct.unpack('!f', data[offset:offset + 4])[0])
+            elif item_type == 0x6D or item_type == 0x61:  # 'm' - Map, 'a' - Array
+                size = unpack_length(view, offset)[0]
                 offset += 4
-            elif item_type == b'j':  # JSON
-                json_length = struct.unpack('!i', data[offset:offset + 4])[0]
+                if item_type == 0x6D:
+                    size *= 2  # Khóa + giá trị
+
+                # Mỗi phần tử chiếm ít nhất 1 byte
+                if size < 0 or size > end - offset:
+                    raise ValueError("Số phần tử không hợp lệ.")
+
+                inner, offset = self._decode_items(view, offset, size, depth + 1)
+                if item_type == 0x6D:
+                    pairs = iter(inner)
+                    append(dict(zip(pairs, pairs)))
+                else:
+                    append(inner)
+            elif item_type == 0x62:  # 'b' - Boolean
+                append(view[offset] != 0)
+                offset += 1
+            elif item_type == 0x6E:  # 'n' - None
+                append(None)
+            elif item_type == 0x71:  # 'q' - Số nguyên 64-bit
+                append(_INT64.unpack_from(view, offset)[0])
+                offset += 8
+            elif item_type == 0x64:  # 'd' - Số thực 64-bit
+                append(_DOUBLE.unpack_from(view, offset)[0])
+                offset += 8
+            elif item_type == 0x66:  # 'f' - Số thực
+                append(_FLOAT.unpack_from(view, offset)[0])
+                offset += 4
+            elif item_type == 0x79 or item_type == 0x6A:  # 'y' - Bytes, 'j' - JSON
+                length = unpack_length(view, offset)[0]
                 offset += 4
-                json_data = data[offset:offset + json_length].decode(self.encoding)
-                items.append(json.loads(json_data))  # Chuyển đổi JSON về kiểu dữ liệu gốc
-                offset += json_length
+                if length < 0 or offset + length > end:
+                    raise ValueError("Độ dài phần tử không hợp lệ.")
+
+                if item_type == 0x79:
+                    append(bytes(view[offset:offset + length]))
+                else:  # Chuyển đổi JSON về kiểu dữ liệu gốc
+                    append(json.loads(str(view[offset:offset + length], encoding)))
+                offset += length
             else:
-                raise b'\x80'
+                raise ValueError(f"Tiền tố không hợp lệ: {item_type}.")
+
+        return items, offset
+
+    def decode(self, data: bytes):
+        """Giải mã bytes về kiểu dữ liệu gốc."""
+        if not data or len(data) < _LENGTH.size:
+            return b'\x80'
+
+        view = memoryview(data)
+        length = _LENGTH.unpack_from(view, 0)[0]
+        end = length + _LENGTH.size
+
+        if length < 0 or end > len(view):
+            return b'\x80'
+
+        try:
+            # Không đọc vượt quá phần dữ liệu đã khai báo
+            items, _ = self._decode_items(view[:end], _LENGTH.size, -1)
+        except (struct.error, IndexError, UnicodeDecodeError, TypeError, ValueError):
+            return b'\x80'
 
         return items
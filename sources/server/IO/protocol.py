@@ -0,0 +1,141 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import time
+import asyncio
+
+from collections import deque
+from typing import Deque, Optional
+from sources.server.IO.frame import FrameParser, FrameError
+from sources.server.metrics import metrics
+
+
+RECEIVE_BUFFER_SIZE = 16 * 1024  # Bộ đệm nhận dùng lại của mỗi kết nối
+MAX_PENDING_FRAMES = 64          # Ngừng đọc socket khi có quá nhiều frame chưa xử lý
+
+
+class ProtocolReader:
+    """
+    Phía nhận của backend BufferedProtocol, thay cho Reader + StreamReader.
+
+    Dữ liệu được đọc thẳng vào một bộ đệm cố định (`get_buffer`) và đưa ngay
+    vào FrameParser của Transport (một lần sao chép duy nhất); `receive_data`
+    chỉ chờ tới khi có frame hoàn chỉnh.
+    """
+
+    def __init__(self, buffer_size: int = RECEIVE_BUFFER_SIZE) -> None:
+        if buffer_size <= 0:
+            raise ValueError("Kích thước bộ đệm phải lớn hơn 0.")
+
+        self.last_activity = time.monotonic()  # Xem Reader.last_activity
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+
+        self.transport: Optional[asyncio.Transport] = None
+        self.parser = FrameParser()  # Transport dùng chung parser và hàng frame này
+        self.frames: Deque = deque()
+        self.waiter: Optional[asyncio.Future] = None
+        self.error: Optional[int] = None  # Mã lỗi/kết thúc trả về cho Transport
+        self.paused = False
+
+    def _wake(self) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def feed(self, nbytes: int) -> None:
+        """Phân tích `nbytes` byte vừa được đọc vào bộ đệm."""
+        self.last_activity = time.monotonic()
+        metrics.bytes_in += nbytes
+        try:
+            self.frames.extend(self.parser.feed(self.view[:nbytes]))
+        except FrameError:
+            self.error = 4003
+            self.transport.pause_reading()
+        else:
+            if len(self.frames) >= MAX_PENDING_FRAMES and not self.paused:
+                self.paused = True
+                self.transport.pause_reading()  # Handler chưa theo kịp: dừng đọc socket
+        self._wake()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.error = 1001 if exc is not None else 5005
+        self._wake()
+
+    async def receive_data(self) -> (bytes | int):
+        """Chờ frame mới; trả về b'' khi hàng frame có dữ liệu, hoặc mã lỗi."""
+        if self.paused:
+            self.paused = False
+            self.transport.resume_reading()
+
+        while not self.frames:
+            if self.error is not None:
+                return self.error
+
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+
+        return b''
+
+
+class ProtocolWriter:
+    """Phía gửi của backend BufferedProtocol, cùng giao diện với StreamWriter mà Writer dùng."""
+
+    def __init__(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.paused = False
+        self.drain_waiters: Deque[asyncio.Future] = deque()
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def write(self, data) -> None:
+        self.transport.write(data)
+
+    def writelines(self, data) -> None:
+        self.transport.writelines(data)
+
+    def can_write_eof(self) -> bool:
+        return self.transport.can_write_eof()
+
+    def is_closing(self) -> bool:
+        return self.transport.is_closing()
+
+    def get_extra_info(self, name: str, default=None):
+        return self.transport.get_extra_info(name, default)
+
+    def close(self) -> None:
+        self.transport.close()
+
+    async def wait_closed(self) -> None:
+        await self.closed
+
+    async def drain(self) -> None:
+        """Chờ transport gửi bớt dữ liệu (pause_writing/resume_writing)."""
+        if self.transport.is_closing():
+            raise ConnectionResetError("Kết nối đã đóng.")
+
+        if self.paused:
+            waiter = asyncio.get_running_loop().create_future()
+            self.drain_waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                self.drain_waiters.remove(waiter)
+
+    def pause_writing(self) -> None:
+        self.paused = True
+
+    def resume_writing(self) -> None:
+        self.paused = False
+        for waiter in self.drain_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.paused = False
+        for waiter in self.drain_waiters:
+            if not waiter.done():
+                waiter.set_exception(ConnectionResetError("Kết nối bị đóng."))
+        if not self.closed.done():
+            self.closed.set_result(None)
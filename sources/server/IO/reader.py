@@ -1,19 +1,19 @@
+import time
 import asyncio
 from sources.utils.logger import Logger
+from sources.server.metrics import metrics
 
 
 
 class Reader:
     """Quản lý việc nhận dữ liệu từ luồng bất đồng bộ."""
 
-    def __init__(
-        self, stream_reader: asyncio.StreamReader,
-        timeout: float = 120.0, buffer_size: int = 8192
-    ) -> None:
+    def __init__(self, stream_reader: asyncio.StreamReader, buffer_size: int = 8192) -> None:
         if buffer_size <= 0:
             raise ValueError("Kích thước bộ đệm phải lớn hơn 0.")
 
-        self.timeout = timeout
+        # Thời điểm nhận dữ liệu gần nhất; IdleReaper dùng để đóng phiên không hoạt động
+        self.last_activity = time.monotonic()
         self.reader = stream_reader
         self.buffer_size = buffer_size
         self.receive_buffer = bytearray(buffer_size)
@@ -29,11 +29,11 @@ class Reader:
     async def receive_data(self) -> (bytes | int):
         """Nhận dữ liệu từ luồng một cách bất đồng bộ."""
         try:
-            data = await asyncio.wait_for(
-                self.reader.read(self.buffer_size), timeout=self.timeout
-            )
+            data = await self.reader.read(self.buffer_size)
 
             if data:  # Kiểm tra nếu dữ liệu không trống
+                self.last_activity = time.monotonic()
+                metrics.bytes_in += len(data)
                 await Logger.info(f"Nhận được {len(data)} bytes dữ liệu.", False)
                 return data
 
@@ -41,10 +41,6 @@ class Reader:
             await Logger.info("Không có dữ liệu nhận được (dữ liệu trống).", False)
             return 5005
 
-        except asyncio.TimeoutError:
-            await Logger.error("Hết thời gian chờ nhận dữ liệu.", False)
-            return 3001
-
         except ConnectionResetError:
             await Logger.error("Kết nối bị thiết lập lại bởi client.", False)
             return 1001
@@ -0,0 +1,267 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import struct
+
+from typing import Dict, Optional, Tuple
+from sources.constants.cmd import Cmd
+from sources.server.IO.packager import DataPackager
+
+
+# Mã struct của các kiểu có kích thước cố định
+_FIXED = {'i': 'i', 'q': 'q', 'f': 'f', 'd': 'd', 'b': '?'}
+# Các kiểu có độ dài thay đổi (tiền tố + độ dài/số phần tử + nội dung)
+_VARIABLE = {'s', 'y', 'm', 'a'}
+
+_TYPES = {
+    'i': int, 'q': int, 'f': (int, float), 'd': (int, float), 'b': bool,
+    's': str, 'y': (bytes, bytearray), 'm': dict, 'a': (list, tuple)
+}
+
+_LENGTH = struct.Struct('!i')
+_TAG_LENGTH = struct.Struct('!ci')
+_FIXED_STRUCTS = {tag: struct.Struct('!c' + code) for tag, code in _FIXED.items()}
+
+
+class Field:
+    """Một trường của thông điệp: tên, tiền tố kiểu của DataPackager và giới hạn độ dài."""
+
+    def __init__(self, name: str, tag: str, max_length: Optional[int] = None) -> None:
+        if tag not in _FIXED and tag not in _VARIABLE:
+            raise ValueError(f"Kiểu trường không được hỗ trợ: {tag}.")
+
+        self.name = name
+        self.tag = tag
+        self.code = ord(tag)
+        self.max_length = max_length
+
+    def __repr__(self) -> str:
+        return f"Field({self.name!r}, {self.tag!r})"
+
+
+class _FixedRun:
+    """Một dãy trường cố định liên tiếp, được giải mã bằng một lần unpack_from."""
+
+    def __init__(self, fields: Tuple[Field, ...]) -> None:
+        self.names = tuple(field.name for field in fields)
+        self.tags = tuple(field.tag.encode() for field in fields)
+        self.struct = struct.Struct('!' + ''.join('c' + _FIXED[field.tag] for field in fields))
+
+
+class MessageSchema:
+    """
+    Bố cục yêu cầu/phản hồi của một lệnh, được biên dịch một lần thành bộ
+    mã hóa/giải mã dựa trên struct trên cùng định dạng dây của DataPackager.
+
+    - Bố cục toàn trường cố định: một lần `struct.unpack`/`struct.pack`.
+    - Bố cục có trường thay đổi: các dãy trường cố định liên tiếp vẫn được
+      gộp thành một lần `unpack_from`.
+    """
+
+    def __init__(
+        self, command: int,
+        request: Tuple[Field, ...] = (),
+        response: Tuple[Field, ...] = (),
+        encoding: str = 'utf-8'
+    ) -> None:
+        self.command = command
+        self.request = tuple(request)
+        self.response = tuple(response)
+        self.encoding = encoding
+        self.packager = DataPackager(encoding, native=True)  # Trường 'm'/'a' dùng tiền tố gốc
+
+        self._names = tuple(field.name for field in self.request)
+        self._tags = tuple(field.tag.encode() for field in self.request)
+
+        self._steps = self._compile(self.request)
+        self._exact_request = self._compile_exact(self.request)
+        self._exact_response = self._compile_exact(self.response)
+
+    @staticmethod
+    def _compile(fields: Tuple[Field, ...]) -> list:
+        """Gộp các trường cố định liên tiếp thành một _FixedRun."""
+        steps, run = [], []
+
+        for field in fields:
+            if field.tag in _FIXED:
+                run.append(field)
+                continue
+
+            if run:
+                steps.append(_FixedRun(tuple(run)))
+                run = []
+            steps.append(field)
+
+        if run:
+            steps.append(_FixedRun(tuple(run)))
+        return steps
+
+    @staticmethod
+    def _compile_exact(fields: Tuple[Field, ...]) -> Optional[struct.Struct]:
+        """Struct cho toàn bộ thông điệp (kể cả 4 byte độ dài) nếu mọi trường đều cố định."""
+        if any(field.tag not in _FIXED for field in fields):
+            return None
+        return struct.Struct('!i' + ''.join('c' + _FIXED[field.tag] for field in fields))
+
+    def decode(self, data: bytes) -> Optional[dict]:
+        """Giải mã và kiểm tra yêu cầu; trả về dict theo tên trường, None nếu sai định dạng."""
+        try:
+            if (exact := self._exact_request) is not None:
+                if len(data) != exact.size:
+                    return None
+
+                values = exact.unpack(data)
+                if values[0] != exact.size - 4 or values[1::2] != self._tags:
+                    return None
+                return dict(zip(self._names, values[2::2]))
+
+            return self._decode_steps(memoryview(data))
+
+        except (struct.error, IndexError, UnicodeDecodeError, ValueError):
+            return None
+
+    def _decode_steps(self, view: memoryview) -> Optional[dict]:
+        length = _LENGTH.unpack_from(view, 0)[0]
+        end = length + 4
+
+        if length < 0 or end != len(view):
+            return None
+
+        values = {}
+        offset = 4
+
+        for step in self._steps:
+            if isinstance(step, _FixedRun):
+                unpacked = step.struct.unpack_from(view, offset)
+                if unpacked[0::2] != step.tags:
+                    return None
+
+                values.update(zip(step.names, unpacked[1::2]))
+                offset += step.struct.size
+                continue
+
+            if view[offset] != step.code:
+                return None
+
+            if step.tag == 's' or step.tag == 'y':
+                size = _LENGTH.unpack_from(view, offset + 1)[0]
+                offset += 5
+
+                if size < 0 or offset + size > end:
+                    return None
+                if step.max_length is not None and size > step.max_length:
+                    return None
+
+                raw = view[offset:offset + size]
+                values[step.name] = str(raw, self.encoding) if step.tag == 's' else bytes(raw)
+                offset += size
+            else:  # Map/Array: dùng bộ giải mã chung cho riêng trường này
+                (value,), offset = self.packager._decode_items(view, offset, 1)
+                if step.max_length is not None and len(value) > step.max_length:
+                    return None
+                values[step.name] = value
+
+        # Không cho phép dữ liệu thừa sau trường cuối cùng
+        return values if offset == end else None
+
+    def encode(self, values: dict) -> bytes:
+        """Mã hóa phản hồi theo bố cục đã khai báo; b'\\x80' nếu thiếu trường hoặc sai kiểu."""
+        try:
+            ordered = [values[field.name] for field in self.response]
+        except KeyError:
+            return b'\x80'
+
+        for field, value in zip(self.response, ordered):
+            if not isinstance(value, _TYPES[field.tag]) or (field.tag != 'b' and type(value) is bool):
+                return b'\x80'
+
+        try:
+            if (exact := self._exact_response) is not None:
+                args = [exact.size - 4]
+                for field, value in zip(self.response, ordered):
+                    args.extend((field.tag.encode(), value))
+                return exact.pack(*args)
+
+            out = bytearray(_LENGTH.size)
+            for field, value in zip(self.response, ordered):
+                if field.tag in _FIXED:
+                    out += _FIXED_STRUCTS[field.tag].pack(field.tag.encode(), value)
+                elif field.tag == 's' or field.tag == 'y':
+                    raw = value.encode(self.encoding) if field.tag == 's' else bytes(value)
+                    out += _TAG_LENGTH.pack(field.tag.encode(), len(raw))
+                    out += raw
+                elif not self.packager._write((value,), out):
+                    return b'\x80'
+
+            _LENGTH.pack_into(out, 0, len(out) - _LENGTH.size)
+            return bytes(out)
+
+        except (struct.error, UnicodeEncodeError):
+            return b'\x80'
+
+
+class SchemaRegistry:
+    """Danh sách schema theo mã lệnh (Cmd), được khai báo một lần khi khởi động."""
+
+    schemas: Dict[int, MessageSchema] = {}
+
+    @classmethod
+    def register(
+        cls, command: int,
+        request: Tuple[Field, ...] = (),
+        response: Tuple[Field, ...] = ()
+    ) -> MessageSchema:
+        if command in cls.schemas:
+            raise ValueError(f"Schema cho lệnh {command} đã được khai báo.")
+
+        schema = MessageSchema(command, request, response)
+        cls.schemas[command] = schema
+        return schema
+
+    @classmethod
+    def get(cls, command: int) -> Optional[MessageSchema]:
+        return cls.schemas.get(command)
+
+
+# Khai báo bố cục của các lệnh
+SchemaRegistry.register(
+    Cmd.PING,
+    response=(Field("command", 'i'),)
+)
+SchemaRegistry.register(
+    Cmd.PONG,  # Heartbeat: the server sends (command, seq), the client echoes seq
+    request=(Field("seq", 'i'),),
+    response=(Field("command", 'i'), Field("seq", 'i'))
+)
+SchemaRegistry.register(
+    Cmd.LOGIN,
+    request=(Field("email", 's', 254), Field("password", 's', 128))
+)
+SchemaRegistry.register(
+    Cmd.LOGOUT,
+    request=(Field("id", 'i'),)
+)
+SchemaRegistry.register(
+    Cmd.REGISTER,
+    request=(Field("email", 's', 254), Field("password", 's', 128))
+)
+SchemaRegistry.register(
+    Cmd.HANDSHAKE,
+    request=(
+        Field("compression", 'b'), Field("streaming", 'b'), Field("multiplex", 'b'),
+        Field("native", 'b'),  # Client giải mã được các tiền tố gốc (q/d/b/n/y/m/a) của DataPackager
+        Field("heartbeat", 'b')  # Client nhận frame ping không được yêu cầu và trả lời bằng PONG
+    ),
+    response=(
+        Field("compression", 'b'), Field("streaming", 'b'), Field("multiplex", 'b'), Field("native", 'b'),
+        Field("heartbeat", 'b'), Field("threshold", 'i'), Field("max_inflight", 'i')
+    )
+)
+SchemaRegistry.register(
+    Cmd.UPDATE,  # Player input, applied on the next world tick; position is 'map,x,y'
+    request=(Field("position", 's', 64),)
+)
+SchemaRegistry.register(
+    Cmd.PLAYER_INFO,
+    request=(Field("id", 'i'), Field("token", 's', 2048))
+)
@@ -0,0 +1,138 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import struct
+import asyncio
+
+from typing import Optional, Union
+from sources.server.IO.frame import FLAG_CHUNKED, LENGTH
+
+
+CHUNK_SIZE = 8192            # 8KB dữ liệu cho mỗi chunk gửi đi
+MAX_CHUNK_SIZE = 64 * 1024   # Kích thước tối đa của một chunk nhận được
+STREAM_WINDOW = 16           # Số chunk tối đa chờ xử lý của một stream nhận
+MAX_STREAMS = 4              # Số stream nhận đồng thời tối đa của một phiên
+
+# Payload của frame chunk: 4 byte stream id + dữ liệu (chunk rỗng = kết thúc stream)
+STREAM_ID = struct.Struct('!I')
+
+
+class ChunkReader:
+    """
+    Async iterator nhận các chunk của một stream đến.
+
+    Hàng đợi có giới hạn (STREAM_WINDOW): khi đầy, Transport ngừng đọc socket
+    cho tới khi handler tiêu thụ bớt, nên bộ nhớ của mỗi stream luôn bị chặn.
+    """
+
+    def __init__(self, stream_id: int, command: int, window: int = STREAM_WINDOW) -> None:
+        self.stream_id = stream_id
+        self.command = command
+        self.closed = False
+        self.aborted = False
+        self.bytes_received = 0
+        self.queue: asyncio.Queue = asyncio.Queue(window)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        if self.closed and self.queue.empty():
+            raise StopAsyncIteration
+
+        chunk = await self.queue.get()
+        if chunk is None:  # Kết thúc (hoặc bị hủy)
+            self.closed = True
+            raise StopAsyncIteration
+        return chunk
+
+    async def feed(self, chunk: bytes) -> None:
+        """Thêm một chunk; chờ nếu hàng đợi đầy (backpressure)."""
+        if self.aborted:  # Không còn ai đọc stream: bỏ qua phần còn lại
+            return
+
+        self.bytes_received += len(chunk)
+        await self.queue.put(chunk)
+
+    async def finish(self) -> None:
+        """Đánh dấu stream đã nhận đủ dữ liệu."""
+        if not self.aborted:
+            await self.queue.put(None)
+
+    def abort(self) -> None:
+        """Hủy stream (mất kết nối, handler kết thúc sớm): bỏ các chunk đang chờ."""
+        self.aborted = True
+        self._force_end()
+
+    def _force_end(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def read(self) -> bytes:
+        """Đọc toàn bộ stream (chỉ dùng khi biết trước dữ liệu nhỏ)."""
+        return b''.join([chunk async for chunk in self])
+
+
+class ChunkWriter:
+    """
+    Gửi một payload lớn thành các frame chunk.
+
+    Các chunk đi qua `Writer.send`, nên `drain()` được chờ ít nhất mỗi
+    `flush_size` byte (mỗi chunk nếu không gộp ghi): bộ nhớ dùng cho một stream
+    luôn bị chặn và các frame khác của phiên vẫn được gửi xen giữa các chunk.
+    """
+
+    def __init__(self, writer, stream_id: int, chunk_size: int = CHUNK_SIZE) -> None:
+        if chunk_size <= 0:
+            raise ValueError("Kích thước chunk phải lớn hơn 0.")
+
+        self.writer = writer
+        self.stream_id = stream_id
+        self.chunk_size = chunk_size
+        self.closed = False
+        self.bytes_sent = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            await self.close()
+
+    async def _send_chunk(self, chunk: Union[bytes, memoryview]) -> None:
+        frame = bytearray(LENGTH.size + STREAM_ID.size + len(chunk))
+        LENGTH.pack_into(frame, 0, (STREAM_ID.size + len(chunk)) | FLAG_CHUNKED)
+        STREAM_ID.pack_into(frame, LENGTH.size, self.stream_id)
+        frame[LENGTH.size + STREAM_ID.size:] = chunk
+
+        if (code := await self.writer.send(frame)) != 9501:
+            raise ConnectionError(f"Gửi chunk thất bại: {code}")
+
+    async def write(self, data: Union[bytes, bytearray, memoryview]) -> int:
+        """Gửi dữ liệu, chia thành các chunk `chunk_size` byte."""
+        if self.closed:
+            raise RuntimeError("Stream đã đóng.")
+
+        view = memoryview(data)
+        for start in range(0, len(view), self.chunk_size):
+            chunk = view[start:start + self.chunk_size]
+            await self._send_chunk(chunk)
+            self.bytes_sent += len(chunk)
+
+        return len(view)
+
+    async def close(self) -> None:
+        """Gửi chunk rỗng để báo kết thúc stream."""
+        if not self.closed:
+            self.closed = True
+            await self._send_chunk(b'')
+
+
+def parse_chunk(data: bytes) -> Optional[tuple]:
+    """Tách payload frame chunk (đã gồm 4 byte độ dài) thành (stream_id, chunk)."""
+    if len(data) < LENGTH.size + STREAM_ID.size:
+        return None
+
+    stream_id = STREAM_ID.unpack_from(data, LENGTH.size)[0]
+    return stream_id, data[LENGTH.size + STREAM_ID.size:]
@@ -1,13 +1,28 @@
 # Copyright (C) PhcNguyen Developers
 # Distributed under the terms of the Modified BSD License.
 
+import zlib
+import time
 import asyncio
 
-from typing import Optional, Union, List
+from collections import deque
+from typing import Callable, Dict, Optional, Union, List
+from sources.utils.cpu import cpu
 from sources.utils.logger import Logger
+from sources.utils.tracing import tracer
 from sources.server.IO.write import Writer
 from sources.server.IO.reader import Reader
+from sources.server.IO.protocol import ProtocolReader
 from sources.server.IO.packager import DataPackager
+from sources.server.IO.schema import SchemaRegistry
+from sources.server.IO.frame import (
+    FrameParser, FrameError, LENGTH, REQUEST_ID,
+    FLAG_MASK, LENGTH_MASK, FLAG_COMPRESSED, FLAG_CHUNKED, FLAG_REQUEST_ID
+)
+from sources.server.IO.stream import (
+    ChunkReader, ChunkWriter, parse_chunk,
+    CHUNK_SIZE, MAX_CHUNK_SIZE, MAX_STREAMS
+)
 
 
 # command -128 -> 127
@@ -18,59 +33,223 @@ def create_command(command: int, data: bytes) -> bytes:
         data  # Không giới hạn số byte cho data
     )
 
-CHUNK_SIZE = 8192  # 8KB
 
-async def send_large_data(writer, data: bytes):
-    data_length = len(data)
-    total_chunks = (data_length + CHUNK_SIZE - 1) // CHUNK_SIZE
+def compress_frame(data: bytes, level: int, threshold: int) -> bytes:
+    """Nén payload của một frame (hàm cấp module để chạy được trong CpuExecutor)."""
+    if len(data) - LENGTH.size <= threshold:
+        return data
 
-    for i in range(total_chunks):
-        start = i * CHUNK_SIZE
-        end = start + CHUNK_SIZE
-        chunk = data[start:end]
+    body = zlib.compress(memoryview(data)[LENGTH.size:], level)
+    if len(body) >= len(data) - LENGTH.size:
+        return data
 
-        # Gửi độ dài của gói tin và gói tin tương ứng
-        chunk_length = len(chunk).to_bytes(4, 'big')
-        writer.write(chunk_length + chunk)
-        await writer.drain()
+    return LENGTH.pack(len(body) | FLAG_COMPRESSED) + body
 
-async def receive_large_data(reader):
-    data = bytearray()
-    while True:
-        # Đọc độ dài của từng gói tin
-        chunk_length = int.from_bytes(await reader.readexactly(4), 'big')
-        if chunk_length == 0:
-            break
 
-        # Đọc gói tin tương ứng
-        chunk = await reader.readexactly(chunk_length)
-        data.extend(chunk)
+class Transport:
+    """Xử lý dữ liệu, bao gồm mã hóa/giải mã, sử dụng Reader, Writer để gửi/nhận."""
 
-    return bytes(data)
+    COMPRESSION_LEVEL: int = 6          # Mức nén zlib (1: nhanh nhất - 9: nhỏ nhất)
+    COMPRESSION_THRESHOLD: int = 1024   # Chỉ nén payload lớn hơn ngưỡng này (bytes)
+    COMPRESSION_OFFLOAD: int = 256 * 1024  # Payload lớn hơn được nén trong CpuExecutor
 
+    COALESCE: bool = True               # Gộp các frame gửi trong cùng một vòng lặp sự kiện
+    FLUSH_SIZE: int = 64 * 1024         # Gửi ngay khi dữ liệu gộp vượt quá kích thước này
+    FLUSH_DELAY: float = 0.0            # Thời gian giữ tối đa (giây, 0: cuối vòng lặp)
 
+    HIGH_WATER: int = 256 * 1024        # Ngừng nhận frame gửi đi khi hàng đợi vượt ngưỡng này
+    LOW_WATER: int = 64 * 1024          # Nhận lại khi hàng đợi xuống dưới ngưỡng này
+    SLOW_CONSUMER_TIMEOUT: float = 10.0 # Thời gian tối đa một client được ở trên HIGH_WATER
+    SLOW_CONSUMER_POLICY: str = Writer.DISCONNECT  # Writer.DROP hoặc Writer.DISCONNECT
 
-class Transport:
-    """Xử lý dữ liệu, bao gồm mã hóa/giải mã, sử dụng Reader, Writer để gửi/nhận."""
-
-    def __init__(self, reader: asyncio.StreamReader = None, writer: asyncio.StreamWriter = None, encoding: str = 'utf-8') -> None:
+    def __init__(
+        self, reader: Union[asyncio.StreamReader, ProtocolReader] = None,
+        writer: asyncio.StreamWriter = None, encoding: str = 'utf-8'
+    ) -> None:
         self.encoding = encoding
-        self.writer = Writer(writer, 8192)
-        self.reader = Reader(reader, 120, 8192)
+        self.packager = DataPackager(encoding)
+        self.writer = Writer(
+            writer, 8192, self.COALESCE, self.FLUSH_SIZE, self.FLUSH_DELAY,
+            self.HIGH_WATER, self.LOW_WATER, self.SLOW_CONSUMER_TIMEOUT, self.SLOW_CONSUMER_POLICY
+        )
+
+        if isinstance(reader, ProtocolReader):
+            # Backend BufferedProtocol: frame được phân tích ngay khi dữ liệu tới
+            self.reader = reader
+            self.parser = reader.parser
+            self.frames = reader.frames
+        else:
+            self.reader = Reader(reader, 8192)
+            self.parser = FrameParser()
+            self.frames = deque()  # Các frame hoàn chỉnh chưa được xử lý
+
+        # Nén chỉ được bật khi client chọn tham gia trong lúc bắt tay (HANDSHAKE)
+        self.compression = False
+        self.compression_level = self.COMPRESSION_LEVEL
+        self.compression_threshold = self.COMPRESSION_THRESHOLD
+
+        # Stream (frame chunk) cũng chỉ được chấp nhận sau khi thỏa thuận
+        self.streaming = False
+        self.streams: Dict[int, ChunkReader] = {}  # Stream đến theo stream id
+        self.next_stream_id = 0
+
+        # Tiền tố gốc của DataPackager (map, array, int64, ...) chỉ dùng khi client chọn tham gia
+        self.native = False
+
+        # Request id (đa hợp phản hồi) cũng chỉ được chấp nhận sau khi thỏa thuận
+        self.multiplex = False
+        self.request_id: Optional[int] = None  # Request id của frame vừa được receive() trả về
+        self.decode_time = 0.0  # Thời gian giải mã frame vừa được receive() trả về (giây)
+
+        # Gọi với mã lệnh trước khi giải mã mỗi lệnh (giới hạn tốc độ); False: từ chối bằng 6013
+        self.admit: Optional[Callable[[int], bool]] = None
+        # Lệnh nào nhận stream (frame chunk); None: không lệnh nào
+        self.streamable: Optional[Callable[[int], bool]] = None
+
+    def enable_compression(self, level: Optional[int] = None, threshold: Optional[int] = None) -> None:
+        """Bật nén theo từng frame cho phiên này (cả chiều gửi và nhận)."""
+        if level is not None and not 0 <= level <= 9:
+            raise ValueError("Mức nén phải nằm trong khoảng 0-9.")
+
+        self.compression = True
+        self.compression_level = self.COMPRESSION_LEVEL if level is None else level
+        self.compression_threshold = self.COMPRESSION_THRESHOLD if threshold is None else threshold
+        self.parser.flags |= FLAG_COMPRESSED
+
+    @property
+    def last_activity(self) -> float:
+        """Thời điểm (time.monotonic) nhận dữ liệu gần nhất."""
+        return self.reader.last_activity
+
+    def enable_native(self) -> None:
+        """Mã hóa phản hồi bằng các tiền tố gốc thay cho 'j'/'f' (client đã khai báo hỗ trợ)."""
+        self.native = True
+        self.packager = DataPackager(self.encoding, native=True)
+
+    def enable_multiplex(self) -> None:
+        """Cho phép client gắn request id vào frame; phản hồi được gắn lại id đó."""
+        self.multiplex = True
+        self.parser.flags |= FLAG_REQUEST_ID
+
+    @staticmethod
+    def split_request_id(data: bytes) -> Optional[tuple]:
+        """Tách payload có cờ request id thành (request_id, payload DataPackager)."""
+        length = len(data) - LENGTH.size - REQUEST_ID.size
+        if length < 0:
+            return None
+
+        request_id = REQUEST_ID.unpack_from(data, LENGTH.size)[0]
+        return request_id, LENGTH.pack(length) + data[LENGTH.size + REQUEST_ID.size:]
+
+    @staticmethod
+    def tag_request_id(data: bytes, request_id: int) -> bytes:
+        """Gắn request id vào payload đã mã hóa (giữ nguyên các cờ khác)."""
+        header = LENGTH.unpack_from(data)[0]
+        length = (header & LENGTH_MASK) + REQUEST_ID.size
+        return (
+            LENGTH.pack(length | header & FLAG_MASK | FLAG_REQUEST_ID)
+            + REQUEST_ID.pack(request_id) + data[LENGTH.size:]
+        )
+
+    def enable_streaming(self) -> None:
+        """Cho phép client gửi frame chunk (stream) trong phiên này."""
+        self.streaming = True
+        self.parser.flags |= FLAG_CHUNKED
+
+    def open_stream(self, chunk_size: int = CHUNK_SIZE) -> ChunkWriter:
+        """Mở một stream gửi đi; dùng `async with transport.open_stream() as stream`."""
+        self.next_stream_id = (self.next_stream_id + 1) & 0xFFFFFFFF
+        return ChunkWriter(self.writer, self.next_stream_id, chunk_size)
+
+    def abort_streams(self) -> None:
+        """Hủy mọi stream đến đang mở (mất kết nối)."""
+        for stream in self.streams.values():
+            stream.abort()
+        self.streams.clear()
+
+    async def receive_chunk(self, command: int, data: bytes, flags: int) -> Optional[List]:
+        """
+        Chuyển một frame chunk tới stream tương ứng.
+
+        Trả về [9502, command, ChunkReader] khi một stream mới bắt đầu, mã lỗi
+        nếu frame không hợp lệ, hoặc None nếu chunk đã được chuyển đi.
+        """
+        if flags & FLAG_COMPRESSED or (parsed := parse_chunk(data)) is None:
+            return [4003, None, None]
+
+        stream_id, chunk = parsed
+        if len(chunk) > MAX_CHUNK_SIZE:
+            return [4003, None, None]
 
-    async def process_received_data(self, data: bytes) -> List[Union[int, str, str]]:
-        """Xử lý và giải mã dữ liệu nhận được."""
-        command = int.from_bytes(data[0:1], 'big', signed=True)  # Lệnh 1 byte
+        stream = self.streams.get(stream_id)
 
+        if not chunk:  # Chunk rỗng: kết thúc stream
+            if stream is not None:
+                del self.streams[stream_id]
+                await stream.finish()
+            return None
+
+        if stream is None:
+            if len(self.streams) >= MAX_STREAMS:
+                await Logger.error(f"Quá nhiều stream đồng thời: {len(self.streams)}.", False)
+                return [4003, None, None]
+
+            stream = self.streams[stream_id] = ChunkReader(stream_id, command)
+            if self.admit is not None and not self.admit(command):
+                stream.abort()  # Bỏ qua các chunk còn lại của stream bị từ chối
+                return [6013, command, None]
+
+            if self.streamable is None or not self.streamable(command):
+                await Logger.error(f"Lệnh {command} không nhận stream.", False)
+                stream.abort()
+                return [4004, command, None]
+
+            await stream.feed(chunk)
+            return [9502, command, stream]
+
+        await stream.feed(chunk)  # Chờ nếu handler chưa tiêu thụ kịp (backpressure)
+        return None
+
+    def compress(self, data: bytes) -> bytes:
+        """Nén payload nếu đã bật nén và payload lớn hơn ngưỡng; giữ nguyên nếu nén không có lợi."""
+        if not self.compression:
+            return data
+        return compress_frame(data, self.compression_level, self.compression_threshold)
+
+    def decompress(self, data: bytes) -> Optional[bytes]:
+        """Giải nén payload của frame có cờ nén; None nếu dữ liệu hỏng hoặc vượt quá kích thước cho phép."""
+        decompressor = zlib.decompressobj()
+        try:
+            body = decompressor.decompress(memoryview(data)[LENGTH.size:], self.parser.max_frame_size)
+        except zlib.error:
+            return None
+
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            return None
+
+        return LENGTH.pack(len(body)) + body
+
+    async def process_received_data(self, command: int, data: bytes, flags: int = 0) -> List[Union[int, str, str]]:
+        """Xử lý và giải mã một frame nhận được."""
         # Kiểm tra lệnh có nằm trong khoảng hợp lệ không
         if not -128 <= command <= 127:
             await Logger.error(f"Command không hợp lệ: {command}.", False)
             return [6001, None, None]
 
+        if flags & FLAG_COMPRESSED and (data := self.decompress(data)) is None:
+            await Logger.error("Không thể giải nén frame.", False)
+            return [4001, command, None]
+
+        # Lệnh có schema: giải mã và kiểm tra bằng codec đã biên dịch trước khi tới handler
+        if (schema := SchemaRegistry.get(command)) is not None:
+            if (decoded_data := schema.decode(data)) is None:
+                await Logger.error(f"Dữ liệu không đúng định dạng của lệnh {command}.", False)
+                return [4004, command, None]
+
         # Giải mã dữ liệu và kiểm tra xem có hợp lệ không
-        if (decoded_data := DataPackager(self.encoding).decode(data[1:])) == b'\x80':
+        elif (decoded_data := self.packager.decode(data)) == b'\x80':
             await Logger.error("Loại dữ liệu không được hỗ trợ.", False)
-            return [4001, None, None]
+            return [4001, command, None]
 
         await Logger.info(f"Dữ liệu đã xử lý: {decoded_data}", False)
         return [9502, command, decoded_data]
@@ -80,8 +259,11 @@ class Transport:
         if isinstance(data, bytes):
             return data
 
+        # Một list là danh sách phần tử; mọi giá trị khác (dict, str, ...) là một phần tử
+        items = data if isinstance(data, list) else [data]
+
         try:
-            if (data := DataPackager(self.encoding).encode(data)) == b'\x80':
+            if (data := self.packager.encode(items)) == b'\x80':
                 await Logger.error("Loại dữ liệu không được hỗ trợ.", False)
                 return b'\x80'
             return data
@@ -90,22 +272,32 @@ class Transport:
             await Logger.error(f"Chuyển đổi dữ liệu: {e}", False)
             return b'\x80'
 
-    async def send(self, data: Optional[Union[str, dict, list, int, float, bytes]]) -> int:
-        """Chuẩn bị và gửi lệnh dưới nhiều định dạng khác nhau."""
+    async def send(
+        self, data: Optional[Union[str, dict, list, int, float, bytes]],
+        request_id: Optional[int] = None
+    ) -> int:
+        """Chuẩn bị và gửi lệnh dưới nhiều định dạng khác nhau (gắn request id nếu có)."""
         if data is None:
             await Logger.warning("Không có dữ liệu để gửi.")
             return 2001
 
         try:
-            # Chuyển đổi dữ liệu sang bytes nếu không phải là bytes
-            if not isinstance(data, bytes):
-                if (data :=  await self.prepare_data(data)) == b'\x80':
-                    return 4002
+            with tracer.span("encode"):
+                # Chuyển đổi dữ liệu sang bytes nếu không phải là bytes
+                if not isinstance(data, bytes):
+                    if (data :=  await self.prepare_data(data)) == b'\x80':
+                        return 4002
 
-            # Gửi dữ liệu nếu là bytes
-            if isinstance(data, bytes):
-                self.writer.send_buffer.extend(data)
-                return await self.writer.send_data()
+                if self.compression and len(data) >= self.COMPRESSION_OFFLOAD:
+                    # Không chặn vòng lặp sự kiện khi nén payload lớn
+                    data = await cpu.run(compress_frame, data, self.compression_level, self.compression_threshold)
+                else:
+                    data = self.compress(data)
+                if request_id is not None:
+                    data = self.tag_request_id(data, request_id)
+
+            with tracer.span("write"):
+                return await self.writer.send(data)
 
         except Exception as error:
             await Logger.error(f"Lỗi chuẩn bị gửi: {error}", False)
@@ -113,7 +305,51 @@ class Transport:
         return 5002  # Trả về mã lỗi mặc định
 
     async def receive(self) -> List[Union[int, str, bytes]]:
-        """Nhận dữ liệu và xử lý nó."""
-        result: (bytes | int) = await self.reader.receive_data()
-        return await self.process_received_data(result) \
-        if isinstance(result, bytes) else [result, None, None]
\ No newline at end of file
+        """
+        Nhận frame tiếp theo và xử lý nó: [mã, lệnh, dữ liệu].
+
+        Mã lỗi của một frame đã đọc được lệnh (giới hạn tốc độ, giải mã hỏng)
+        đi kèm lệnh đó, để số liệu lỗi được ghi theo lệnh.
+        """
+        while True:
+            # Một lần đọc có thể chứa nhiều frame (hoặc một phần của frame)
+            while not self.frames:
+                result: (bytes | int) = await self.reader.receive_data()
+                if not isinstance(result, bytes):
+                    self.abort_streams()
+                    return [result, None, None]
+
+                if not result:
+                    continue  # ProtocolReader: frame đã nằm trong hàng đợi
+
+                try:
+                    self.frames.extend(self.parser.feed(result))
+                except FrameError as error:
+                    await Logger.error(f"Frame: {error}", False)
+                    self.abort_streams()
+                    return [4003, None, None]
+
+            command, flags, data = self.frames.popleft()
+            self.request_id = None
+
+            if flags & FLAG_REQUEST_ID:
+                if flags & FLAG_CHUNKED or (split := self.split_request_id(data)) is None:
+                    await Logger.error("Frame có request id không hợp lệ.", False)
+                    self.abort_streams()
+                    return [4003, None, None]
+                self.request_id, data = split
+
+            # Frame chunk được chuyển thẳng tới stream, các frame khác vẫn được xử lý xen kẽ
+            if flags & FLAG_CHUNKED:
+                if (result := await self.receive_chunk(command, data, flags)) is not None:
+                    return result
+                continue
+
+            # Tính phí trước khi giải mã: cả lệnh không tồn tại hay dữ liệu hỏng cũng bị giới hạn
+            if self.admit is not None and not self.admit(command):
+                return [6013, command, None]
+
+            started = time.perf_counter()
+            result = await self.process_received_data(command, data, flags)
+            self.decode_time = time.perf_counter() - started  # Span "decode" của lệnh này
+            return result
\ No newline at end of file
@@ -1,23 +1,239 @@
 import asyncio
+
+from typing import List, Optional
 from sources.utils.logger import Logger
+from sources.server.metrics import metrics
 
 
 
 class Writer:
     """Quản lý việc ghi dữ liệu vào luồng bất đồng bộ."""
 
-    def __init__(self, stream_writer: asyncio.StreamWriter, buffer_size=8192) -> None:
+    DROP = "drop"              # Bỏ frame mới khi client nhận chậm
+    DISCONNECT = "disconnect"  # Ngắt kết nối client nhận chậm
+
+    def __init__(
+        self, stream_writer: asyncio.StreamWriter, buffer_size=8192,
+        coalesce: bool = False, flush_size: int = 64 * 1024, flush_delay: float = 0.0,
+        high_water: int = 256 * 1024, low_water: int = 64 * 1024,
+        slow_timeout: float = 10.0, policy: str = DISCONNECT
+    ) -> None:
         if buffer_size <= 0:
             raise ValueError("Kích thước bộ đệm phải lớn hơn 0.")
+        if flush_size <= 0 or flush_delay < 0:
+            raise ValueError("Giới hạn gộp ghi không hợp lệ.")
+        if not 0 <= low_water <= high_water or high_water <= 0:
+            raise ValueError("Ngưỡng hàng đợi gửi không hợp lệ.")
+        if policy not in (self.DROP, self.DISCONNECT):
+            raise ValueError(f"Chính sách không hợp lệ: {policy}.")
         self.bytes_sent = 0
         self.writer = stream_writer
         self.buffer_size = buffer_size
-        self.send_buffer = bytearray(buffer_size)
+        self.send_buffer = bytearray()
+        self.send_lock = asyncio.Lock()  # Chỉ một send_data ghi bộ đệm tại một thời điểm
+
+        # Gộp ghi (cork): các frame trong cùng một vòng lặp sự kiện được gửi bằng một lần writelines.
+        # Hàng đợi giữ chính các đối tượng bytes (không sao chép), nên frame broadcast dùng chung
+        # giữa các phiên không bị chép vào bộ đệm riêng của từng phiên
+        self.coalesce = coalesce
+        self.queue: List[bytes] = []
+        self.queued = 0  # Số byte trong `queue`
+        self.flush_size = flush_size    # Gửi ngay khi bộ đệm vượt quá kích thước này
+        self.flush_delay = flush_delay  # Thời gian giữ tối đa (0: cuối vòng lặp hiện tại)
+        self.flush_handle: Optional[asyncio.Handle] = None
+        self.flush_error: Optional[int] = None
+        self.writes = 0  # Số lần gọi write thực tế
+
+        # Hàng đợi gửi có giới hạn: ngừng nhận frame ở high_water, nhận lại khi xuống low_water
+        self.high_water = high_water
+        self.low_water = low_water
+        self.slow_timeout = slow_timeout  # Thời gian tối đa được ở trên high_water
+        self.policy = policy
+        self.paused = False
+        self.evicted = False
+        self.dropped = 0  # Số frame đã bỏ (chính sách DROP)
+
+        # Để transport của asyncio tạm dừng/tiếp tục cùng ngưỡng (drain chờ tới low_water)
+        if (transport := getattr(stream_writer, 'transport', None)) is not None:
+            transport.set_write_buffer_limits(high_water, low_water)
 
     def append(self, data: bytes) -> None:
         """Thêm dữ liệu vào bộ đệm gửi."""
         self.send_buffer.extend(data)
 
+    async def send(self, data: bytes) -> int:
+        """
+        Đưa một frame vào hàng gửi.
+
+        Không gộp ghi: gửi ngay như `send_data`. Gộp ghi: frame được giữ lại và
+        gửi cùng các frame khác vào cuối vòng lặp hiện tại (hoặc sau
+        `flush_delay`), hoặc ngay lập tức nếu bộ đệm vượt quá `flush_size`.
+
+        Khi hàng đợi vượt `high_water`: DROP trả về 5006 ngay, DISCONNECT chờ
+        tối đa `slow_timeout` để xuống `low_water` rồi ngắt kết nối (5007).
+        """
+        if self.evicted:
+            return 5007
+
+        if not self.is_writable():
+            if self.policy == self.DROP:
+                self.dropped += 1
+                return 5006
+
+            if not await self.wait_writable(self.slow_timeout):
+                self.evict()
+                return 5007
+
+        if not self.coalesce:
+            self.send_buffer.extend(data)
+            return await self.send_data()
+
+        if self.flush_error is not None:
+            return self.flush_error
+
+        self.enqueue(data)
+        if self.queued >= self.flush_size:
+            self.flush()
+            if self.flush_error is not None:
+                return self.flush_error
+
+            try:
+                await self.writer.drain()  # Chỉ chờ khi socket không kịp gửi
+            except OSError as error:
+                await Logger.error(f"OSError: {str(error)}, Mã lỗi: {error.errno}", False)
+                return 5002 if error.errno == 64 else 5003
+            return 9501
+
+        if self.flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self.flush_handle = (
+                loop.call_later(self.flush_delay, self.flush) if self.flush_delay
+                else loop.call_soon(self.flush)
+            )
+        return 9501
+
+    def offer(self, data: bytes) -> int:
+        """
+        Đưa một frame vào hàng gửi mà không chờ (dùng cho broadcast).
+
+        `data` được ghi hoặc xếp hàng nguyên vẹn, không sao chép, nên nhiều
+        phiên có thể dùng chung một đối tượng bytes. Khi hàng đợi vượt
+        `high_water` frame bị bỏ qua (5006) bất kể chính sách.
+        """
+        if self.evicted:
+            return 5007
+
+        if not self.is_writable():
+            self.dropped += 1
+            return 5006
+
+        if self.writer.is_closing():
+            return 5003
+
+        if self.coalesce:
+            if self.flush_error is not None:
+                return self.flush_error
+
+            self.enqueue(data)
+            if self.queued >= self.flush_size:
+                self.flush()
+                return 9501 if self.flush_error is None else self.flush_error
+
+            if self.flush_handle is None:
+                loop = asyncio.get_running_loop()
+                self.flush_handle = (
+                    loop.call_later(self.flush_delay, self.flush) if self.flush_delay
+                    else loop.call_soon(self.flush)
+                )
+            return 9501
+
+        if self.send_buffer:
+            # Một send_data đang gửi bộ đệm: xếp sau phần đó để giữ đúng thứ tự frame
+            self.send_buffer.extend(data)
+            return 9501
+
+        try:
+            self.writer.write(data)
+        except OSError as error:
+            return 5002 if error.errno == 64 else 5003
+        except Exception:
+            return 5004
+
+        self.writes += 1
+        self.bytes_sent += len(data)
+        metrics.bytes_out += len(data)
+        return 9501
+
+    def enqueue(self, data: bytes) -> None:
+        """Giữ một frame cho lần flush tiếp theo (không sao chép)."""
+        self.queue.append(data)
+        self.queued += len(data)
+
+    def pending(self) -> int:
+        """Số byte chưa gửi: bộ đệm gửi + hàng đợi gộp ghi + bộ đệm của transport."""
+        size = len(self.send_buffer) + self.queued
+        if (transport := getattr(self.writer, 'transport', None)) is not None:
+            size += transport.get_write_buffer_size()
+        return size
+
+    def is_writable(self) -> bool:
+        """False từ khi hàng đợi vượt `high_water` cho tới khi xuống `low_water`."""
+        pending = self.pending()
+        if self.paused:
+            self.paused = pending > self.low_water
+        else:
+            self.paused = pending >= self.high_water
+        return not self.paused and not self.evicted
+
+    async def wait_writable(self, timeout: Optional[float] = None) -> bool:
+        """Chờ hàng đợi xuống `low_water`; False nếu hết thời gian hoặc lỗi."""
+        self.flush()
+        try:
+            await asyncio.wait_for(self.writer.drain(), timeout)
+        except (asyncio.TimeoutError, OSError):
+            return False
+        return self.is_writable()
+
+    def evict(self) -> None:
+        """Ngắt kết nối client nhận chậm: bỏ dữ liệu đang chờ và hủy transport."""
+        if self.evicted:
+            return
+
+        self.evicted = True
+        self.send_buffer.clear()
+        self.queue.clear()
+        self.queued = 0
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        if (transport := getattr(self.writer, 'transport', None)) is not None:
+            transport.abort()  # Vòng lặp nhận sẽ kết thúc với lỗi kết nối
+
+    def flush(self) -> None:
+        """Gửi toàn bộ các frame đang giữ bằng một lần writelines (không chờ drain)."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        if not self.queue or self.flush_error is not None:
+            return
+
+        queue, size = self.queue, self.queued
+        self.queue, self.queued = [], 0
+        try:
+            self.writer.writelines(queue)
+        except OSError as error:
+            self.flush_error = 5002 if error.errno == 64 else 5003
+            return
+        except Exception:
+            self.flush_error = 5004
+            return
+
+        self.writes += 1
+        self.bytes_sent += size
+        metrics.bytes_out += size
+
     def get_bytes_sent(self) -> int:
         """Trả về tổng số byte đã gửi."""
         return self.bytes_sent
@@ -27,7 +243,14 @@ class Writer:
         return len(self.send_buffer) >= self.buffer_size
 
     async def send_data(self) -> int:
-        """Gửi dữ liệu từ bộ đệm một cách bất đồng bộ."""
+        """
+        Gửi dữ liệu từ bộ đệm một cách bất đồng bộ.
+
+        Có thể được gọi đồng thời (các lệnh có request id chạy song song): các
+        lần gọi nối tiếp nhau qua `send_lock`, và mỗi phần được cắt khỏi bộ đệm
+        trước khi chờ `drain`, nên không byte nào bị gửi hai lần. Dữ liệu của
+        lần gọi đang chờ lock có thể đã được lần gọi trước gửi giúp.
+        """
 
         # Kiểm tra tính hợp lệ của writer
         if not self.writer or not self.writer.can_write_eof():
@@ -38,32 +261,37 @@ class Writer:
             await Logger.info("Bộ đệm trống, không có dữ liệu để gửi.", False)
             return 1002
 
-        while self.send_buffer:
-            try:
-                # Xác định số bytes cần gửi
-                bytes_to_send = min(len(self.send_buffer), self.buffer_size)
+        async with self.send_lock:
+            while self.send_buffer:
+                try:
+                    # Cắt phần cần gửi khỏi bộ đệm trước khi chờ drain
+                    bytes_to_send = min(len(self.send_buffer), self.buffer_size)
+                    chunk = bytes(self.send_buffer[:bytes_to_send])
+                    del self.send_buffer[:bytes_to_send]
 
-                # Ghi dữ liệu vào writer
-                self.writer.write(self.send_buffer[:bytes_to_send])
-                await self.writer.drain()
+                    # Ghi dữ liệu vào writer
+                    self.writer.write(chunk)
+                    self.writes += 1
+                    self.bytes_sent += bytes_to_send
+                    metrics.bytes_out += bytes_to_send
+                    await self.writer.drain()
 
-                # Cập nhật số bytes đã gửi
-                self.bytes_sent += bytes_to_send
-                del self.send_buffer[:bytes_to_send]  # Xóa phần dữ liệu đã gửi
+                    # Log thông tin đã gửi
+                    await Logger.info(
+                        f"Đã gửi {bytes_to_send} bytes. Tổng cộng: {self.bytes_sent} bytes.",
+                        False
+                    )
 
-                # Log thông tin đã gửi
-                await Logger.info(
-                    f"Đã gửi {bytes_to_send} bytes. Tổng cộng: {self.bytes_sent} bytes.",
-                    False
-                )
-                return 9501
+                except OSError as error:
+                    # Log lỗi OSError với mã lỗi
+                    self.send_buffer.clear()  # Kết nối hỏng: không ai gửi phần còn lại nữa
+                    await Logger.error(f"OSError: {str(error)}, Mã lỗi: {error.errno}", False)
+                    return 5002 if error.errno == 64 else 5003
 
-            except OSError as error:
-                # Log lỗi OSError với mã lỗi
-                await Logger.error(f"OSError: {str(error)}, Mã lỗi: {error.errno}", False)
-                return 5002 if error.errno == 64 else 5003
+                except Exception as error:
+                    # Log lỗi không xác định
+                    self.send_buffer.clear()
+                    await Logger.error(f"Lỗi không xác định: {str(error)}", False)
+                    return 5004
 
-            except Exception as error:
-                # Log lỗi không xác định
-                await Logger.error(f"Lỗi không xác định: {str(error)}", False)
-                return 5004
\ No newline at end of file
+        return 9501
\ No newline at end of file
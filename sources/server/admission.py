@@ -0,0 +1,65 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set
+
+
+class Admission:
+    """
+    Accept-time admission control, checked before any per-session object exists.
+
+    A connection is admitted when the server is below `max_connections`, its
+    IP has fewer than `max_per_ip` open connections and the IP is not blocked.
+    Every admitted connection must be released exactly once when it closes.
+    """
+
+    FULL = "full"        # Global connection cap reached
+    PER_IP = "per_ip"    # Too many concurrent connections from this IP
+    BLOCKED = "blocked"  # IP is on the block list
+
+    def __init__(self, max_connections: int, max_per_ip: int, blocked: Iterable[str] = ()) -> None:
+        if max_connections <= 0 or max_per_ip <= 0:
+            raise ValueError("Connection limits must be greater than 0.")
+
+        self.max_connections = max_connections
+        self.max_per_ip = max_per_ip
+        self.blocked: Set[str] = set(blocked)
+
+        self.active = 0
+        self.per_ip: Dict[str, int] = {}
+        self.rejected: Counter = Counter()  # Rejections by reason
+
+    def check(self, ip: str) -> Optional[str]:
+        """Return the rejection reason for `ip`, or None if it may connect."""
+        if ip in self.blocked:
+            return self.BLOCKED
+        if self.active >= self.max_connections:
+            return self.FULL
+        if self.per_ip.get(ip, 0) >= self.max_per_ip:
+            return self.PER_IP
+        return None
+
+    def admit(self, ip: str) -> Optional[str]:
+        """Count the connection if admitted; otherwise return the rejection reason."""
+        if (reason := self.check(ip)) is not None:
+            self.rejected[reason] += 1
+            return reason
+
+        self.active += 1
+        self.per_ip[ip] = self.per_ip.get(ip, 0) + 1
+        return None
+
+    def release(self, ip: str) -> None:
+        """Forget an admitted connection once it is closed."""
+        self.active -= 1
+        if (count := self.per_ip.get(ip, 0) - 1) > 0:
+            self.per_ip[ip] = count
+        else:
+            self.per_ip.pop(ip, None)
+
+    def block(self, ip: str) -> None:
+        self.blocked.add(ip)
+
+    def unblock(self, ip: str) -> None:
+        self.blocked.discard(ip)
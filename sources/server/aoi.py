@@ -0,0 +1,100 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import math
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+Cell = Tuple[int, int, int]  # (map id, cell x, cell y)
+
+
+def parse_position(position: str) -> Optional[Tuple[int, float, float]]:
+    """Parse the `player.position` column ('map,x,y'); None if malformed."""
+    try:
+        map_id, x, y = position.split(',')
+        return int(map_id), float(x), float(y)
+    except (AttributeError, ValueError):
+        return None
+
+
+class AOIGrid:
+    """
+    Area-of-interest index: session ids bucketed by map and square grid cell.
+
+    `move` is O(1) and only touches the buckets when the session changes
+    cell. `query` scans the cells overlapping the radius, so its cost
+    depends on how many players are nearby, not on how many are on the map.
+    """
+
+    def __init__(self, cell_size: float = 64.0) -> None:
+        if cell_size <= 0:
+            raise ValueError("cell_size must be greater than 0.")
+
+        self.cell_size = cell_size
+        self.cells: Dict[Cell, Set[uuid.UUID]] = {}
+        self.positions: Dict[uuid.UUID, Tuple[int, float, float]] = {}
+        self.cell_of: Dict[uuid.UUID, Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, session_id: uuid.UUID) -> bool:
+        return session_id in self.positions
+
+    def cell(self, map_id: int, x: float, y: float) -> Cell:
+        return map_id, math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def move(self, session_id: uuid.UUID, map_id: int, x: float, y: float) -> bool:
+        """Insert or move a session; True if it changed cell (or map)."""
+        self.positions[session_id] = (map_id, x, y)
+
+        cell = self.cell(map_id, x, y)
+        old = self.cell_of.get(session_id)
+        if old == cell:
+            return False
+
+        if old is not None:
+            self._discard(old, session_id)
+        self.cells.setdefault(cell, set()).add(session_id)
+        self.cell_of[session_id] = cell
+        return True
+
+    def remove(self, session_id: uuid.UUID) -> None:
+        """Forget a session (idempotent)."""
+        self.positions.pop(session_id, None)
+        if (cell := self.cell_of.pop(session_id, None)) is not None:
+            self._discard(cell, session_id)
+
+    def position(self, session_id: uuid.UUID) -> Optional[Tuple[int, float, float]]:
+        return self.positions.get(session_id)
+
+    def query(
+        self, map_id: int, x: float, y: float, radius: float,
+        exclude: Optional[uuid.UUID] = None
+    ) -> List[uuid.UUID]:
+        """Session ids on `map_id` within `radius` of (x, y)."""
+        _, min_cx, min_cy = self.cell(map_id, x - radius, y - radius)
+        _, max_cx, max_cy = self.cell(map_id, x + radius, y + radius)
+        limit = radius * radius
+        found = []
+
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                for session_id in self.cells.get((map_id, cx, cy), ()):
+                    _, px, py = self.positions[session_id]
+                    if (px - x) ** 2 + (py - y) ** 2 <= limit and session_id != exclude:
+                        found.append(session_id)
+        return found
+
+    def nearby(self, session_id: uuid.UUID, radius: float) -> List[uuid.UUID]:
+        """Other sessions within `radius` of a session; empty if it has no position."""
+        if (position := self.positions.get(session_id)) is None:
+            return []
+        return self.query(*position, radius, exclude=session_id)
+
+    def _discard(self, cell: Cell, session_id: uuid.UUID) -> None:
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.discard(session_id)
+            if not bucket:
+                del self.cells[cell]
@@ -0,0 +1,232 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import time
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sources.constants.cmd import Codes
+from sources.constants.result import ResultBuilder
+from sources.server.metrics import metrics
+from sources.utils.tracing import tracer
+
+
+class Context:
+    """One command call: what handlers and middleware get besides the decoded data."""
+
+    __slots__ = ("controller", "command", "request_id")
+
+    def __init__(self, controller, command: int, request_id: Optional[int] = None) -> None:
+        self.controller = controller  # TCPController of the session
+        self.command = command
+        self.request_id = request_id
+
+    @property
+    def database(self):
+        return self.controller.database
+
+    @property
+    def session(self):
+        return self.controller.session
+
+    @property
+    def transport(self):
+        return self.controller.transport
+
+    @property
+    def world(self):
+        return self.controller.world
+
+    def bind_account(self, account_id) -> None:
+        """Index the session under the account it logged in to."""
+        if self.controller.registry is not None and self.session is not None:
+            self.controller.registry.bind_account(self.session, account_id)
+
+    def unbind_account(self) -> None:
+        if self.controller.registry is not None and self.session is not None:
+            self.controller.registry.unbind_account(self.session)
+
+
+Call = Callable[[Context, Any], Awaitable[Any]]
+
+
+class Command:
+    """A registered command: its handler, the options middleware look at, and the compiled call path."""
+
+    __slots__ = ("code", "handler", "auth", "cost", "validate", "queued", "stream", "call")
+
+    def __init__(
+        self, code: int, handler: Call, auth: bool = False, cost: float = 1.0,
+        validate: Optional[Callable[[Any], bool]] = None, queued: bool = False, stream: bool = False
+    ) -> None:
+        self.code = code
+        self.handler = handler
+        self.auth = auth          # Requires a logged-in session
+        self.cost = cost          # Rate limit cost (0: not rate limited)
+        self.validate = validate  # Extra check of the decoded data (schemas are checked by Transport)
+        self.queued = queued      # Runs through the login queue
+        self.stream = stream      # Accepts chunked frames: the handler gets a ChunkReader instead of data
+        self.call: Call = handler
+
+
+# A middleware gets a command and the call path built so far (the handler and the
+# middleware after it) and returns the wrapped path, or the same path when it does
+# not apply to that command, so unused middleware costs nothing at dispatch.
+Middleware = Callable[[Command, Call], Call]
+
+
+class CommandRegistry:
+    """
+    Process-wide command table, filled at import time by the `command`
+    decorator. Each command's middleware chain is compiled once, into a
+    single call path, when the command or a middleware is registered.
+    """
+
+    commands: Dict[int, Command] = {}
+    middleware: List[Tuple[str, Middleware]] = []  # Outermost first
+
+    @classmethod
+    def register(cls, code: int, handler: Call, **options) -> Command:
+        if code in cls.commands:
+            raise ValueError(f"Command {code} is already registered.")
+
+        spec = Command(code, handler, **options)
+        cls.compile(spec)
+        cls.commands[code] = spec
+        return spec
+
+    @classmethod
+    def use(cls, name: str, middleware: Middleware) -> Middleware:
+        """Append a middleware (innermost so far) and recompile every command."""
+        cls.middleware.append((name, middleware))
+        for spec in cls.commands.values():
+            cls.compile(spec)
+        return middleware
+
+    @classmethod
+    def compile(cls, spec: Command) -> None:
+        call = spec.handler
+        for _, middleware in reversed(cls.middleware):
+            call = middleware(spec, call)
+        spec.call = call
+
+    @classmethod
+    def configure(cls, code: int, **options) -> Command:
+        """Change options of a registered command (e.g. its rate limit cost) and recompile it."""
+        spec = cls.commands[code]
+        for name, value in options.items():
+            setattr(spec, name, value)
+        cls.compile(spec)
+        return spec
+
+    @classmethod
+    def get(cls, code: int) -> Optional[Command]:
+        return cls.commands.get(code)
+
+
+def command(code: int, **options) -> Callable[[Call], Call]:
+    """Register the decorated coroutine `handler(ctx, data)` as the handler of `code`."""
+    def decorator(handler: Call) -> Call:
+        CommandRegistry.register(code, handler, **options)
+        return handler
+    return decorator
+
+
+def middleware(name: str) -> Callable[[Middleware], Middleware]:
+    """Register the decorated function as the next (inner) middleware."""
+    def decorator(function: Middleware) -> Middleware:
+        return CommandRegistry.use(name, function)
+    return decorator
+
+
+# The chain, outermost first: metrics, auth, validation, login_queue. The rate
+# limit comes before all of it: TCPController.admit charges every frame (by the
+# command's `cost`) before it is looked up or decoded. Metrics time everything
+# dispatched (auth refusals included); frames refused before dispatch (rate
+# limit, undecodable data, unknown command) are counted by TCPController.
+@middleware("metrics")
+def measure(spec: Command, call: Call) -> Call:
+    code = spec.code
+
+    async def measured(ctx: Context, data) -> Any:
+        started = time.perf_counter()
+        response = error = None
+        try:
+            response = await call(ctx, data)
+        except Exception:
+            error = 6003  # What run_handler answers for a failed handler
+            raise
+        finally:
+            if error is None and isinstance(response, dict) and response.get("status") == "error":
+                error = response.get("code")
+            metrics.observe(code, time.perf_counter() - started, error)
+        return response
+
+    return measured
+
+
+@middleware("auth")
+def auth(spec: Command, call: Call) -> Call:
+    if not spec.auth:
+        return call
+
+    async def authenticated(ctx: Context, data) -> Any:
+        if ctx.session is None or ctx.session.account_id is None:
+            return ResultBuilder.error(Codes.ACCESS_DENIED)
+        return await call(ctx, data)
+
+    return authenticated
+
+
+@middleware("validation")
+def validation(spec: Command, call: Call) -> Call:
+    if spec.validate is None:
+        return call
+
+    validate = spec.validate
+
+    async def validated(ctx: Context, data) -> Any:
+        if not validate(data):
+            return ResultBuilder.error(Codes.DATA_INVALID)
+        return await call(ctx, data)
+
+    return validated
+
+
+@middleware("login_queue")
+def login_queue(spec: Command, call: Call) -> Call:
+    if not spec.queued:
+        return call
+
+    async def queued(ctx: Context, data) -> Any:
+        logins = ctx.controller.logins
+        if logins is None:
+            return await call(ctx, data)
+
+        ip = ctx.controller.peer_ip
+        position = logins.queued + 1
+
+        if (turn := logins.enqueue(ip)) is None:
+            metrics.reject("login_queue")
+            return ResultBuilder.error(Codes.SERVER_BUSY, retry_after=round(logins.expected_wait(), 3))
+
+        if not turn.done() and ctx.request_id is not None:
+            # Interim answer, only for tagged requests: an untagged client expects
+            # exactly one reply per request. The real response follows once the turn comes
+            try:
+                await ctx.transport.send(ResultBuilder.success(
+                    Codes.LOGIN_QUEUED, position=position, wait=round(logins.expected_wait(position), 3)
+                ), ctx.request_id)
+            except BaseException:
+                logins.withdraw(turn)  # Cancelled or failed before waiting: do not leak the place
+                raise
+
+        with tracer.span("queue"):
+            await logins.wait(turn)
+        started = time.monotonic()
+        try:
+            return await call(ctx, data)
+        finally:
+            logins.release(time.monotonic() - started)
+
+    return queued
@@ -0,0 +1,126 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from sources.utils.cpu import cpu
+from sources.server.IO.packager import DataPackager
+from sources.server.IO.transport import compress_frame
+from sources.server.aoi import AOIGrid
+from sources.server.registry import SessionRegistry
+from sources.server.tcpsession import TCPSession
+
+
+class Delivery(NamedTuple):
+    """Outcome of one fan-out."""
+    sent: int     # Frames queued on the session's writer
+    skipped: int  # Sessions over their backpressure limit (or evicted)
+    failed: int   # Sessions already closing or whose write failed
+    deferred: int = 0  # Sessions whose compressed copy is being built off the loop (queued later)
+
+
+class Fanout:
+    """
+    Encode-once delivery of one frame to many sessions.
+
+    The payload is serialized once per wire format (legacy, or native for
+    sessions that opted in during HANDSHAKE); every target writer gets the
+    same immutable bytes object through `Writer.offer`, which never waits.
+    Sessions that negotiated compression share one compressed copy per
+    (format, level, threshold); a copy of a frame over COMPRESSION_OFFLOAD
+    is compressed in the CpuExecutor, like Transport.send does, and queued on
+    those sessions when ready (later frames may overtake it). Sessions above
+    HIGH_WATER are skipped, not awaited, so a slow consumer cannot stall an
+    announcement to everyone else.
+    """
+
+    def __init__(self, registry: SessionRegistry, encoding: str = 'utf-8') -> None:
+        self.registry = registry
+        self.packagers = (DataPackager(encoding), DataPackager(encoding, native=True))  # By Transport.native
+
+        self.frames = 0     # Fan-outs performed
+        self.delivered = 0  # Frames queued in total
+        self.skipped = 0    # Frames skipped for backpressure in total
+        self.tasks: Set[asyncio.Task] = set()  # Compressions running in the CpuExecutor
+
+    def encode(self, data: Union[str, dict, list, int, float, bytes], native: bool = False) -> bytes:
+        """Serialize `data` the way Transport.send does; bytes are used as they are."""
+        if isinstance(data, bytes):
+            return data
+
+        frame = self.packagers[native].encode(data if isinstance(data, list) else [data])
+        if frame == b'\x80':
+            raise ValueError("Unsupported data type for broadcast.")
+        return frame
+
+    def broadcast(
+        self, frame: Union[str, dict, list, int, float, bytes],
+        sessions: Optional[Iterable[TCPSession]] = None
+    ) -> Delivery:
+        """Queue `frame` on every session in `sessions` (all sessions by default)."""
+        payload = frame
+        frames: Dict[bool, bytes] = {False: self.encode(payload)}  # Native copy encoded on first use
+        compressed: Dict[Tuple[bool, int, int], bytes] = {}
+        offloaded: Dict[Tuple[bool, int, int], List[TCPSession]] = {}
+        sent = skipped = failed = 0
+
+        for session in self.registry if sessions is None else sessions:
+            transport = session.transport
+            if not session.is_connected or transport is None:
+                failed += 1
+                continue
+
+            native = transport.native
+            if (frame := frames.get(native)) is None:
+                frame = frames[native] = self.encode(payload, native)
+
+            data = frame
+            if transport.compression:
+                key = (native, transport.compression_level, transport.compression_threshold)
+                if len(frame) >= transport.COMPRESSION_OFFLOAD:
+                    offloaded.setdefault(key, []).append(session)  # Do not block the loop compressing
+                    continue
+                if (data := compressed.get(key)) is None:
+                    data = compressed[key] = transport.compress(frame)
+
+            code = transport.writer.offer(data)
+            if code == 9501:
+                sent += 1
+            elif code in (5006, 5007):
+                skipped += 1
+            else:
+                failed += 1
+
+        deferred = 0
+        for (native, level, threshold), targets in offloaded.items():
+            task = asyncio.create_task(self._offer_compressed(frames[native], level, threshold, targets))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            deferred += len(targets)
+
+        self.frames += 1
+        self.delivered += sent
+        self.skipped += skipped
+        return Delivery(sent, skipped, failed, deferred)
+
+    async def _offer_compressed(self, frame: bytes, level: int, threshold: int, targets: List[TCPSession]) -> None:
+        data = await cpu.run(compress_frame, frame, level, threshold)
+        for session in targets:
+            if session.is_connected and session.transport is not None:
+                code = session.transport.writer.offer(data)
+                self.delivered += code == 9501
+                self.skipped += code in (5006, 5007)
+
+    def multicast(self, group: str, frame: Union[str, dict, list, int, float, bytes]) -> Delivery:
+        """Queue `frame` on every session that joined `group`."""
+        return self.broadcast(frame, self.registry.members(group))
+
+    def nearby(
+        self, aoi: AOIGrid, session: TCPSession, radius: float,
+        frame: Union[str, dict, list, int, float, bytes]
+    ) -> Delivery:
+        """Queue `frame` on the other sessions within `radius` of `session` (see AOIGrid)."""
+        targets = (self.registry.get(session_id) for session_id in aoi.nearby(session.id, radius))
+        return self.broadcast(frame, [target for target in targets if target is not None])
@@ -0,0 +1,113 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import time
+import asyncio
+
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sources.utils.logger import Logger
+from sources.constants.cmd import Cmd
+from sources.server.IO.schema import SchemaRegistry
+from sources.server.rtt import percentile
+from sources.server.fanout import Fanout
+from sources.server.tcpsession import TCPSession
+from sources.server.timerwheel import TimerWheel
+
+
+class Heartbeat:
+    """
+    Server-driven keepalive.
+
+    Sessions that opted in during HANDSHAKE are pinged once per `interval`
+    seconds (a request/response client would read an unsolicited ping as the
+    reply to its pending request). Sessions are spread over a TimerWheel, so
+    each tick pings one batch sharing a sequence number; the ping frame is
+    encoded once and fanned out to the batch. The client answers with
+    `Cmd.PONG` echoing the sequence; `TCPSession.rtt` keeps the RTT.
+
+    A session that answered before and then misses `max_missed` pings in a
+    row is treated as dead and closed (about interval * max_missed seconds,
+    well below IDLE_TIMEOUT). Clients that never answered are left to the
+    IdleReaper.
+    """
+
+    def __init__(
+        self, interval: float, max_missed: int, on_dead: Callable[[TCPSession], Awaitable],
+        fanout: Fanout, tick: float = 0.25, slots: int = 256
+    ) -> None:
+        if interval <= 0 or max_missed <= 0:
+            raise ValueError("interval and max_missed must be greater than 0.")
+
+        self.interval = interval
+        self.max_missed = max_missed
+        self.on_dead = on_dead
+        self.fanout = fanout
+        self.wheel = TimerWheel(tick, slots)
+        self.running = False
+
+        self.seq = 0
+        self.sent = 0  # Pings sent
+        self.dead = 0  # Sessions closed for missed heartbeats
+        self.tasks: Set[asyncio.Task] = set()  # Dead sessions being closed
+
+    def __contains__(self, session: TCPSession) -> bool:
+        return session in self.wheel
+
+    def add(self, session: TCPSession) -> None:
+        # First ping after a spread-out delay, so sessions accepted together do not share a batch
+        offset = (session.id.int % 1024) / 1024 * self.interval
+        self.wheel.schedule(session, self.interval + offset)
+
+    def remove(self, session: TCPSession) -> None:
+        self.wheel.cancel(session)
+
+    def collect(self, now: float) -> Tuple[List[TCPSession], List[TCPSession]]:
+        """Advance one tick; return (sessions to ping, dead sessions)."""
+        ping, dead = [], []
+
+        for session in self.wheel.advance():
+            rtt = session.rtt
+            if rtt.answered and rtt.pending is not None and rtt.missed + 1 >= self.max_missed:
+                dead.append(session)
+                continue
+
+            rtt.ping(self.seq, now)
+            ping.append(session)
+            self.wheel.schedule(session, self.interval)
+
+        return ping, dead
+
+    def frame(self) -> bytes:
+        return SchemaRegistry.get(Cmd.PONG).encode({"command": Cmd.PONG, "seq": self.seq})
+
+    async def run(self) -> None:
+        """Tick every `tick` seconds until `running` is cleared."""
+        self.running = True
+        while self.running:
+            await asyncio.sleep(self.wheel.tick)
+
+            self.seq = (self.seq + 1) & 0x7FFFFFFF
+            ping, dead = self.collect(time.monotonic())
+
+            if ping:
+                # Never waits: sessions over their send limit just miss this ping
+                self.sent += self.fanout.broadcast(self.frame(), ping).sent
+
+            if dead:
+                self.dead += len(dead)
+                await Logger.info(f"Closing {len(dead)} sessions with missed heartbeats.", False)
+                task = asyncio.create_task(self._close(dead))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    async def _close(self, sessions: List[TCPSession]) -> None:
+        await asyncio.gather(*(self.on_dead(session) for session in sessions), return_exceptions=True)
+
+    def sessions(self) -> Iterable[TCPSession]:
+        return list(self.wheel.positions)
+
+    def percentiles(self, ps: Iterable[float] = (50, 90, 99)) -> Dict[float, Optional[float]]:
+        """Percentiles of the smoothed RTT (seconds) over sessions that answered."""
+        values = sorted(session.rtt.srtt for session in self.sessions() if session.rtt.answered)
+        return {p: percentile(values, p) for p in ps}
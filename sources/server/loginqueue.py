@@ -0,0 +1,111 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import math
+import asyncio
+
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+
+class LoginQueue:
+    """
+    Admission control for LOGIN: at most `max_active` logins run at once,
+    up to `max_queued` more wait, the rest are shed.
+
+    With `fair=True` waiters are served round-robin by IP, so one address
+    reconnecting many clients cannot push everyone else back; otherwise
+    strictly FIFO. The expected wait is estimated from an EWMA of recent
+    login durations.
+    """
+
+    ALPHA: float = 0.2  # EWMA gain of the login duration
+
+    def __init__(self, max_active: int = 8, max_queued: int = 1024, fair: bool = True) -> None:
+        if max_active <= 0 or max_queued < 0:
+            raise ValueError("max_active must be greater than 0 and max_queued not negative.")
+
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.fair = fair
+
+        self.active = 0
+        self.queued = 0
+        self.queues: Dict[str, Deque[asyncio.Future]] = OrderedDict()  # IP ("" when FIFO) -> waiters
+        self.service = 0.2  # Seconds per login (EWMA)
+
+        self.admitted = 0
+        self.shed = 0
+
+    def enqueue(self, ip: str) -> Optional[asyncio.Future]:
+        """Take a place for a login; None if the queue is full (shed)."""
+        future = asyncio.get_running_loop().create_future()
+
+        if self.active < self.max_active and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            future.set_result(None)
+            return future
+
+        if self.queued >= self.max_queued:
+            self.shed += 1
+            return None
+
+        self.queues.setdefault(ip if self.fair else "", deque()).append(future)
+        self.queued += 1
+        return future
+
+    def expected_wait(self, position: Optional[int] = None) -> float:
+        """Estimated seconds before the `position`-th waiter (default: a new one) starts."""
+        position = self.queued if position is None else position
+        return math.ceil(position / self.max_active) * self.service
+
+    async def wait(self, future: asyncio.Future) -> None:
+        """Wait for the turn taken by `enqueue`; on cancellation the place is given back."""
+        try:
+            await future
+        except asyncio.CancelledError:
+            self.withdraw(future)
+            raise
+
+    def withdraw(self, future: asyncio.Future) -> None:
+        """Give back a place taken by `enqueue` that will not be used (waiting or granted)."""
+        if future.done() and not future.cancelled():
+            self.release()  # Turn already granted
+            return
+
+        future.cancel()
+        self.queued -= 1  # Still in its deque; skipped by _wake
+
+    def release(self, duration: Optional[float] = None) -> None:
+        """End a login (of `duration` seconds) and start the next waiter."""
+        self.active -= 1
+        if duration is not None:
+            self.service += self.ALPHA * (duration - self.service)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self.active < self.max_active and self.queues:
+            ip, waiters = next(iter(self.queues.items()))
+            future = waiters.popleft()
+            if waiters:
+                self.queues.move_to_end(ip)  # Round-robin between IPs
+            else:
+                del self.queues[ip]
+
+            if future.cancelled():
+                continue
+
+            self.queued -= 1
+            self.active += 1
+            self.admitted += 1
+            future.set_result(None)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "expected_wait": self.expected_wait(),
+        }
@@ -0,0 +1,215 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from sources.utils.profiler import profiler
+from sources.utils.tracing import tracer
+
+
+def _bounds() -> List[float]:
+    """HDR-style bucket bounds in seconds: 4 linear sub-buckets per power of two, 8 us to ~134 s."""
+    return [(2 ** exponent) * (1 + step / 4) / 1e6 for exponent in range(3, 27) for step in range(4)]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram: O(log buckets) to record, relative error under 25%."""
+
+    BOUNDS: List[float] = _bounds()
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # Last bucket: above the highest bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile (seconds); None if empty."""
+        if not self.count:
+            return None
+
+        rank = p / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.BOUNDS[index] if index < len(self.BOUNDS) else float("inf")
+        return float("inf")
+
+    def milliseconds(self, p: float) -> Optional[float]:
+        """`percentile` in milliseconds; above the highest bound it is clamped to it, so it stays finite."""
+        if (seconds := self.percentile(p)) is None:
+            return None
+        return min(seconds, self.BOUNDS[-1]) * 1000
+
+
+class Metrics:
+    """
+    Process-wide counters: per-command requests, error codes and latency,
+    bytes in/out, rate-limit rejections and gauges read on export. The hot
+    path only does integer/float increments and one bisect.
+    """
+
+    def __init__(self) -> None:
+        self.latency: Dict[int, Histogram] = {}
+        self.requests: Counter = Counter()   # command -> calls
+        self.errors: Counter = Counter()     # (command, code) -> error responses
+        self.rejected: Counter = Counter()   # reason -> rate-limited / refused requests
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def observe(self, command: int, seconds: float, error: Optional[int] = None) -> None:
+        """Record one command call, its duration and its error code, if any."""
+        if (histogram := self.latency.get(command)) is None:
+            histogram = self.latency[command] = Histogram()
+        histogram.observe(seconds)
+        self.requests[command] += 1
+        if error is not None:
+            self.errors[command, error] += 1
+
+    def refuse(self, command: int, code: int) -> None:
+        """Record a call refused before it was dispatched (no latency sample)."""
+        self.requests[command] += 1
+        self.errors[command, code] += 1
+
+    def reject(self, reason: str) -> None:
+        self.rejected[reason] += 1
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Register a value read at export time (e.g. active sessions)."""
+        self.gauges[name] = read
+
+    def percentile(self, command: int, p: float) -> Optional[float]:
+        histogram = self.latency.get(command)
+        return histogram.percentile(p) if histogram is not None else None
+
+    def snapshot(self) -> Dict:
+        """Summary for the admin UI and the supervisor: p50/p99 per command in milliseconds."""
+        return {
+            "requests": sum(self.requests.values()),
+            "errors": sum(self.errors.values()),
+            "rejected": sum(self.rejected.values()),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "latency_ms": {
+                command: (histogram.milliseconds(50), histogram.milliseconds(99))
+                for command, histogram in self.latency.items() if histogram.count
+            },
+            **{name: read() for name, read in self.gauges.items()},
+        }
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = [
+            "# TYPE server_requests_total counter",
+            *(f'server_requests_total{{cmd="{command}"}} {count}' for command, count in self.requests.items()),
+            "# TYPE server_errors_total counter",
+            *(f'server_errors_total{{cmd="{command}",code="{code}"}} {count}'
+              for (command, code), count in self.errors.items()),
+            "# TYPE server_rejected_total counter",
+            *(f'server_rejected_total{{reason="{reason}"}} {count}' for reason, count in self.rejected.items()),
+            "# TYPE server_bytes_in_total counter",
+            f"server_bytes_in_total {self.bytes_in}",
+            "# TYPE server_bytes_out_total counter",
+            f"server_bytes_out_total {self.bytes_out}",
+        ]
+
+        for name, read in self.gauges.items():
+            lines += [f"# TYPE server_{name} gauge", f"server_{name} {read()}"]
+
+        lines.append("# TYPE server_command_seconds histogram")
+        for command, histogram in self.latency.items():
+            cumulative = 0
+            for bound, count in zip(Histogram.BOUNDS, histogram.counts):
+                cumulative += count
+                lines.append(f'server_command_seconds_bucket{{cmd="{command}",le="{bound:.6g}"}} {cumulative}')
+            lines += [
+                f'server_command_seconds_bucket{{cmd="{command}",le="+Inf"}} {histogram.count}',
+                f'server_command_seconds_sum{{cmd="{command}"}} {histogram.sum:.6f}',
+                f'server_command_seconds_count{{cmd="{command}"}} {histogram.count}',
+            ]
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()  # Shared by the whole process
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint for operators:
+
+    - GET /metrics: `metrics.render()` (Prometheus text format)
+    - GET /traces[?threshold=ms&enabled=0|1]: slow command traces, optionally changing the tracer settings
+    - GET /profile/start[?interval=s], /profile/stop: run the sampling profiler, stop returns collapsed stacks
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100) -> None:
+        self.address: Tuple[str, int] = (host, port)
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self.handle, *self.address, reuse_address=True)
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+    @staticmethod
+    def route(path: str, query: Dict[str, List[str]]) -> Optional[str]:
+        """Body of the answer to `path`, or None if there is no such page."""
+        if path in ("/", "/metrics"):
+            return metrics.render()
+
+        if path == "/traces":
+            if "threshold" in query:
+                tracer.threshold = float(query["threshold"][0]) / 1000
+            if "enabled" in query:
+                tracer.enabled = query["enabled"][0] not in ("0", "false")
+            return f"# threshold {tracer.threshold * 1000:g} ms, enabled {tracer.enabled}\n" + tracer.report()
+
+        if path == "/profile/start":
+            interval = float(query["interval"][0]) if "interval" in query else None
+            return "started\n" if profiler.start(interval) else "already running\n"
+
+        if path == "/profile/stop":
+            return profiler.stop()
+
+        return None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            target = request.split(b" ", 2)[1].decode("latin-1") if request.count(b" ") >= 2 else ""
+            url = urlsplit(target)
+
+            try:
+                body = self.route(url.path, parse_qs(url.query))
+                status = "200 OK" if body is not None else "404 Not Found"
+                body = body if body is not None else "not found\n"
+            except ValueError as error:
+                status, body = "400 Bad Request", f"{error}\n"
+
+            payload = body.encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError):
+            pass
+        finally:
+            writer.close()
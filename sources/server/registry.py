@@ -0,0 +1,119 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import uuid
+from typing import Dict, Iterator, Optional, Set, Union
+
+from sources.server.tcpsession import TCPSession
+
+
+AccountId = Union[int, str]
+
+
+class SessionRegistry:
+    """
+    Live sessions keyed by `TCPSession.id`, with secondary indexes by peer IP,
+    by logged-in account id and by multicast group. Every operation is O(1) (O(k) for the k
+    sessions returned by a lookup).
+    """
+
+    def __init__(self, max_connections: int) -> None:
+        if max_connections <= 0:
+            raise ValueError("max_connections must be greater than 0.")
+
+        self.max_connections = max_connections
+        self.sessions: Dict[uuid.UUID, TCPSession] = {}
+        self.by_ip: Dict[str, Set[uuid.UUID]] = {}
+        self.by_account: Dict[AccountId, Set[uuid.UUID]] = {}
+        self.by_group: Dict[str, Set[uuid.UUID]] = {}
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, session: TCPSession) -> bool:
+        return session.id in self.sessions
+
+    def __iter__(self) -> Iterator[TCPSession]:
+        return iter(list(self.sessions.values()))  # Snapshot: safe while sessions close
+
+    def is_full(self) -> bool:
+        return len(self.sessions) >= self.max_connections
+
+    def add(self, session: TCPSession) -> bool:
+        """Register a connected session; False if MAX_CONNECTIONS is reached."""
+        if session.id in self.sessions:
+            return True
+        if self.is_full():
+            return False
+
+        self.sessions[session.id] = session
+        self.by_ip.setdefault(self.ip_of(session), set()).add(session.id)
+        return True
+
+    def remove(self, session: TCPSession) -> bool:
+        """Unregister a session (idempotent); False if it was not registered."""
+        if self.sessions.pop(session.id, None) is None:
+            return False
+
+        self._discard(self.by_ip, self.ip_of(session), session.id)
+        if session.account_id is not None:
+            self._discard(self.by_account, session.account_id, session.id)
+        for group in session.groups:
+            self._discard(self.by_group, group, session.id)
+        return True
+
+    def get(self, session_id: uuid.UUID) -> Optional[TCPSession]:
+        return self.sessions.get(session_id)
+
+    def bind_account(self, session: TCPSession, account_id: AccountId) -> None:
+        """Index a session under the account it logged in to."""
+        if session.id not in self.sessions or session.account_id == account_id:
+            return
+
+        self.unbind_account(session)
+        session.account_id = account_id
+        self.by_account.setdefault(account_id, set()).add(session.id)
+
+    def unbind_account(self, session: TCPSession) -> None:
+        if session.account_id is not None:
+            self._discard(self.by_account, session.account_id, session.id)
+            session.account_id = None
+
+    def join(self, session: TCPSession, group: str) -> None:
+        """Add a session to a multicast group (see Fanout.multicast)."""
+        if session.id in self.sessions:
+            session.groups.add(group)
+            self.by_group.setdefault(group, set()).add(session.id)
+
+    def leave(self, session: TCPSession, group: str) -> None:
+        if group in session.groups:
+            session.groups.discard(group)
+            self._discard(self.by_group, group, session.id)
+
+    def members(self, group: str) -> Set[TCPSession]:
+        return {self.sessions[session_id] for session_id in self.by_group.get(group, ())}
+
+    def for_ip(self, ip: str) -> Set[TCPSession]:
+        return {self.sessions[session_id] for session_id in self.by_ip.get(ip, ())}
+
+    def for_account(self, account_id: AccountId) -> Set[TCPSession]:
+        return {self.sessions[session_id] for session_id in self.by_account.get(account_id, ())}
+
+    def count_ip(self, ip: str) -> int:
+        return len(self.by_ip.get(ip, ()))
+
+    def is_online(self, account_id: AccountId) -> bool:
+        return account_id in self.by_account
+
+    @staticmethod
+    def ip_of(session: TCPSession) -> str:
+        return session.client_address[0] if session.client_address else ""
+
+    @staticmethod
+    def _discard(index: Dict, key, session_id: uuid.UUID) -> None:
+        """Remove an id from a secondary index, dropping empty buckets."""
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.discard(session_id)
+            if not bucket:
+                del index[key]
@@ -0,0 +1,74 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import math
+from collections import deque
+from typing import Deque, Iterable, List, Optional
+
+
+def percentile(values: Iterable[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (p in 0..100); None for no values."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class RttStats:
+    """
+    Round-trip time of one session, measured with server heartbeats.
+
+    `srtt` is an EWMA of the samples and `jitter` the EWMA of their deviation
+    from it (RFC 6298 smoothing, ALPHA = 1/8, BETA = 1/4). The last SAMPLES
+    raw samples are kept for percentiles. Times are in seconds.
+    """
+
+    ALPHA: float = 0.125
+    BETA: float = 0.25
+    SAMPLES: int = 32
+
+    def __init__(self) -> None:
+        self.srtt: Optional[float] = None
+        self.jitter = 0.0
+        self.samples: Deque[float] = deque(maxlen=self.SAMPLES)
+
+        self.pending: Optional[int] = None  # Sequence of the unanswered ping
+        self.sent_at = 0.0
+        self.missed = 0  # Consecutive pings without a PONG
+
+    @property
+    def answered(self) -> bool:
+        """True once the peer answered a heartbeat (it speaks PONG)."""
+        return self.srtt is not None
+
+    def ping(self, seq: int, now: float) -> None:
+        """Record a ping; an unanswered previous one counts as missed."""
+        if self.pending is not None:
+            self.missed += 1
+        self.pending = seq
+        self.sent_at = now
+
+    def pong(self, seq: int, now: float) -> Optional[float]:
+        """Record the answer to ping `seq`; return the RTT sample, or None for a stale PONG."""
+        if seq != self.pending:
+            return None
+
+        rtt = now - self.sent_at
+        self.pending = None
+        self.missed = 0
+        self.samples.append(rtt)
+
+        if self.srtt is None:
+            self.srtt, self.jitter = rtt, rtt / 2
+        else:
+            self.jitter += self.BETA * (abs(self.srtt - rtt) - self.jitter)
+            self.srtt += self.ALPHA * (rtt - self.srtt)
+        return rtt
+
+    def percentile(self, p: float) -> Optional[float]:
+        return percentile(self.samples, p)
+
+    def percentiles(self, ps: Iterable[float] = (50, 90, 99)) -> List[Optional[float]]:
+        ordered = sorted(self.samples)
+        return [percentile(ordered, p) for p in ps]
@@ -0,0 +1,291 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import os
+import time
+import signal
+import asyncio
+import multiprocessing
+
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional
+
+from sources.utils import types
+from sources.utils.cpu import cpu
+from sources.utils.logger import Logger
+from sources.server.metrics import metrics
+from sources.server.tcpserver import TCPServer
+
+
+async def _worker_main(
+    slot: int, host: str, port: int,
+    database_factory: Callable[[], types.SQLite | types.MySQL],
+    conn: Connection, interval: float, config: Dict[str, Any]
+) -> None:
+    """Run one TCPServer bound with SO_REUSEPORT and report to the supervisor."""
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+
+    loop.add_signal_handler(signal.SIGTERM, stopping.set)
+    loop.add_signal_handler(signal.SIGINT, lambda: None)  # The supervisor owns Ctrl+C
+    loop.add_signal_handler(signal.SIGHUP, lambda: None)
+
+    config = dict(config, REUSE_PORT=True)
+    if (metrics_port := config.get("METRICS_PORT", TCPServer.METRICS_PORT)) is not None:
+        config["METRICS_PORT"] = metrics_port + slot  # One metrics endpoint per worker
+    server = TCPServer(host, port, database_factory(), config)
+    serving = asyncio.create_task(server.start())
+    started = time.monotonic()
+
+    try:
+        await asyncio.wait_for(server.ready.wait(), Supervisor.READY_TIMEOUT)
+    except asyncio.TimeoutError:
+        await Logger.error(f"Worker {slot}: server did not start.")
+        serving.cancel()
+        return
+
+    conn.send({"type": "ready", "pid": os.getpid()})
+
+    while not stopping.is_set() and not serving.done():
+        conn.send({
+            "type": "stats",
+            "pid": os.getpid(),
+            "connections": server.current_connections,
+            "rtt": server.client_handler.heartbeat.percentiles(),
+            "world": server.client_handler.world.stats(),
+            "cpu": cpu.stats(),
+            "logins": server.client_handler.logins.stats(),
+            "metrics": metrics.snapshot(),
+            "limits": server.command_limiter.stats(),
+            "uptime": time.monotonic() - started
+        })
+
+        try:
+            await asyncio.wait_for(stopping.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+    await server.stop()
+    serving.cancel()
+
+
+def run_worker(
+    slot: int, host: str, port: int,
+    database_factory: Callable[[], types.SQLite | types.MySQL],
+    conn: Connection, interval: float, config: Dict[str, Any], cpu_processes: Optional[int]
+) -> None:
+    """Entry point of a worker process (started with spawn: nothing is inherited but the arguments)."""
+    if cpu_processes is not None:
+        cpu.processes = cpu_processes
+    try:
+        asyncio.run(_worker_main(slot, host, port, database_factory, conn, interval, config))
+    finally:
+        conn.close()
+
+
+class Worker:
+    """Supervisor-side handle of one worker process."""
+
+    def __init__(self, slot: int, process: multiprocessing.Process, conn: Connection) -> None:
+        self.slot = slot
+        self.process = process
+        self.conn = conn
+        self.stats: Dict = {}
+        self.started = time.monotonic()
+        self.retired = False  # Stopped on purpose (reload/shutdown): do not restart
+
+        loop = asyncio.get_running_loop()
+        self.ready = loop.create_future()
+        self.exited = loop.create_future()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+
+class Supervisor:
+    """
+    Multi-process mode: start WORKERS processes, each running its own TCPServer on
+    the same port (SO_REUSEPORT), so the kernel spreads accepted connections
+    over all cores.
+
+    Workers are started with the spawn method: the supervisor already runs an
+    event loop (and possibly threads), which a forked child would inherit in
+    an undefined state. Settings reach the worker only through `config`
+    (TCPServer overrides) and `cpu_processes`, never through class attributes.
+
+    - A worker that exits unexpectedly is restarted (with backoff if it keeps crashing).
+    - SIGHUP performs a rolling reload: each worker is replaced by a new one,
+      which must be accepting before the old one is stopped.
+    - Workers push stats every STATS_INTERVAL seconds; `stats()` aggregates them.
+    """
+
+    WORKERS: int = os.cpu_count() or 1
+    STATS_INTERVAL: float = 5.0
+    READY_TIMEOUT: float = 30.0    # Time for a new worker to start listening
+    STOP_TIMEOUT: float = 30.0     # Time for a worker to stop before it is killed
+    RESTART_DELAY: float = 1.0     # Initial restart backoff, doubled up to MAX_RESTART_DELAY
+    MAX_RESTART_DELAY: float = 30.0
+
+    def __init__(
+        self, host: str, port: int,
+        database_factory: Callable[[], types.SQLite | types.MySQL],
+        workers: Optional[int] = None, config: Optional[Dict[str, Any]] = None,
+        cpu_processes: Optional[int] = None
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.database_factory = database_factory  # Must be picklable (e.g. the SQLite/MySQL class)
+        self.config = dict(config or {})  # TCPServer settings of every worker
+        self.cpu_processes = cpu_processes
+        self.count = workers or self.WORKERS
+        if self.count <= 0:
+            raise ValueError("Number of workers must be greater than 0.")
+
+        self.context = multiprocessing.get_context("spawn")
+        self.workers: Dict[int, Worker] = {}  # Current worker of each slot
+        self.restart_delays: List[float] = [self.RESTART_DELAY] * self.count
+        self.stopping = asyncio.Event()
+        self.reloading = False
+
+    def spawn(self, slot: int) -> Worker:
+        """Start a worker for `slot` and watch its pipe and process sentinel."""
+        parent_conn, child_conn = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=run_worker, name=f"tcp-worker-{slot}", daemon=False,
+            args=(
+                slot, self.host, self.port, self.database_factory, child_conn, self.STATS_INTERVAL,
+                self.config, self.cpu_processes
+            )
+        )
+        process.start()
+        child_conn.close()
+
+        worker = Worker(slot, process, parent_conn)
+        loop = asyncio.get_running_loop()
+        loop.add_reader(parent_conn.fileno(), self._on_message, worker)
+        loop.add_reader(process.sentinel, self._on_exit, worker)
+        return worker
+
+    def _on_message(self, worker: Worker) -> None:
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+            return
+
+        if message["type"] == "ready" and not worker.ready.done():
+            worker.ready.set_result(True)
+            self.restart_delays[worker.slot] = self.RESTART_DELAY  # Started fine: reset backoff
+        elif message["type"] == "stats":
+            worker.stats = message
+
+    def _on_exit(self, worker: Worker) -> None:
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(worker.process.sentinel)
+        loop.remove_reader(worker.conn.fileno())
+        worker.process.join(1)  # The sentinel closed: the process is exiting
+        worker.conn.close()
+
+        if not worker.ready.done():
+            worker.ready.set_result(False)
+        worker.exited.set_result(worker.process.exitcode)
+
+        if worker.retired or self.stopping.is_set():
+            return
+
+        # Crashed: restart the slot after a backoff delay
+        delay = self.restart_delays[worker.slot]
+        self.restart_delays[worker.slot] = min(delay * 2, self.MAX_RESTART_DELAY)
+        asyncio.create_task(self._restart(worker, delay))
+
+    async def _restart(self, worker: Worker, delay: float) -> None:
+        await Logger.error(
+            f"Worker {worker.slot} (pid {worker.pid}) exited with code "
+            f"{worker.process.exitcode}; restarting in {delay:.0f}s."
+        )
+        await asyncio.sleep(delay)
+
+        if not self.stopping.is_set() and self.workers.get(worker.slot) is worker:
+            self.workers[worker.slot] = self.spawn(worker.slot)
+
+    async def retire(self, worker: Worker) -> None:
+        """Stop a worker gracefully (SIGTERM), killing it after STOP_TIMEOUT."""
+        worker.retired = True
+        if worker.exited.done():
+            return
+
+        worker.process.terminate()
+        try:
+            await asyncio.wait_for(asyncio.shield(worker.exited), self.STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            await Logger.warning(f"Worker {worker.slot} (pid {worker.pid}) did not stop; killing it.")
+            worker.process.kill()
+            await worker.exited
+
+    async def reload(self) -> None:
+        """Rolling reload: replace workers one at a time without closing the port."""
+        if self.reloading or self.stopping.is_set():
+            return
+
+        self.reloading = True
+        try:
+            for slot in range(self.count):
+                old = self.workers.get(slot)
+                new = self.spawn(slot)
+
+                if not await self._wait_ready(new):
+                    await Logger.error(f"Reload aborted: new worker {slot} failed to start.")
+                    await self.retire(new)
+                    return
+
+                self.workers[slot] = new
+                if old is not None:
+                    await self.retire(old)
+
+            await Logger.info(f"Reloaded {self.count} workers.")
+        finally:
+            self.reloading = False
+
+    async def _wait_ready(self, worker: Worker) -> bool:
+        try:
+            return await asyncio.wait_for(asyncio.shield(worker.ready), self.READY_TIMEOUT)
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> Dict:
+        """Aggregate the latest stats reported by every worker."""
+        workers = [
+            {"slot": slot, "pid": worker.pid, "alive": worker.process.is_alive(), **worker.stats}
+            for slot, worker in sorted(self.workers.items())
+        ]
+        return {
+            "workers": workers,
+            "alive": sum(1 for worker in workers if worker["alive"]),
+            "connections": sum(worker.get("connections", 0) for worker in workers)
+        }
+
+    async def run(self) -> None:
+        """Start all workers and supervise them until SIGINT/SIGTERM."""
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGINT, self.stopping.set)
+        loop.add_signal_handler(signal.SIGTERM, self.stopping.set)
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.create_task(self.reload()))
+
+        for slot in range(self.count):
+            self.workers[slot] = self.spawn(slot)
+
+        await Logger.info(f"Supervisor {os.getpid()}: {self.count} workers on {self.host}:{self.port}")
+
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.STATS_INTERVAL)
+            except asyncio.TimeoutError:
+                stats = self.stats()
+                await Logger.info(
+                    f"Workers: {stats['alive']}/{self.count} alive, "
+                    f"{stats['connections']} connections", False
+                )
+
+        await Logger.info("Stopping workers...")
+        await asyncio.gather(*(self.retire(worker) for worker in self.workers.values()))
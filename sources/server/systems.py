@@ -0,0 +1,33 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import uuid
+from typing import Dict, Tuple
+
+from sources.server.aoi import AOIGrid, parse_position
+from sources.server.world import System, World
+
+
+def movement(aoi: AOIGrid, radius: float) -> System:
+    """
+    World system applying the `position` of UPDATE inputs (dicts decoded by
+    the UPDATE schema; 'map,x,y', the format of the `player.position` column)
+    to the AOI grid.
+
+    Only the last position a session sent during the tick is applied, and
+    the resulting `move` event goes to the sessions within `radius` of the
+    new position, not to the whole map.
+    """
+    def move(world: World, dt: float) -> None:
+        moved: Dict[uuid.UUID, Tuple[int, float, float]] = {}
+        for session_id, data in world.inputs:
+            if (position := parse_position(data.get("position"))) is not None:
+                moved[session_id] = position
+
+        for session_id, (map_id, x, y) in moved.items():
+            aoi.move(session_id, map_id, x, y)
+            event = {"type": "move", "id": str(session_id), "map": map_id, "x": x, "y": y}
+            for other in aoi.nearby(session_id, radius):
+                world.push(other, event)
+
+    return move
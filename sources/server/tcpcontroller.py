@@ -1,71 +1,185 @@
 # Copyright (C) PhcNguyen Developers
 # Distributed under the terms of the Modified BSD License.
 
-from typing import Dict, Callable, Union
+import asyncio
+
+from typing import Optional, Set, Union
 
 from sources.utils import types
-from sources.constants.cmd import Cmd, Codes
+from sources.utils.logger import Logger
+from sources.utils.tracing import tracer
+from sources.constants.cmd import Codes
 from sources.constants.result import ResultBuilder
-from sources.handlers import PlayerHandler, AccountHandler
+from sources.server.commands import Command, CommandRegistry, Context
+from sources.server.IO.stream import ChunkReader
 from sources.server.IO.transport import Transport
+from sources.server.tcpsession import TCPSession
+from sources.server.registry import SessionRegistry
+from sources.server.world import World
+from sources.server.loginqueue import LoginQueue
+from sources.server.heartbeat import Heartbeat
+from sources.server.metrics import metrics
+
+import sources.handlers  # Registers the commands in CommandRegistry
+
 
+# Result codes from Transport.receive that are answered with an error, or that close the session
+REPLY_CODES = frozenset((2001, 4001, 4002, 4004, 5001, 6001, 6002, 6013))
+CLOSE_CODES = frozenset((1001, 4003, 5002, 5003, 5004, 5005))
 
 
 class TCPController:
-    def __init__(self, database: Union[types.SQLite, types.MySQL], transport: Transport):
+    MAX_INFLIGHT: int = 8  # Concurrent tagged (request id) commands per session
+
+    def __init__(
+        self, database: Union[types.SQLite, types.MySQL], transport: Transport,
+        session: Optional[TCPSession] = None, registry: Optional[SessionRegistry] = None,
+        world: Optional[World] = None, logins: Optional[LoginQueue] = None, limiter=None,
+        heartbeat: Optional[Heartbeat] = None
+    ):
         self.database = database
         self.transport = transport
+        self.session = session
+        self.registry = registry  # Indexes the session by account on LOGIN/LOGOUT
+        self.world = world  # Receives UPDATE inputs, applied on the next tick
+        self.logins = logins  # Bounds concurrent LOGINs across all sessions
+        self.limiter = limiter  # Per-IP command rate limit, charged by Transport before decoding
+        self.heartbeat = heartbeat  # Pings the session once it opts in (HANDSHAKE)
+        self.peer_ip = SessionRegistry.ip_of(session) if session is not None else ""
+        if limiter is not None:
+            transport.admit = self.admit
+        transport.streamable = self.streamable
+
+        # Tagged commands and stream handlers run alongside the read loop
+        self.tasks: Set[asyncio.Task] = set()
+        self.inflight = asyncio.Semaphore(self.MAX_INFLIGHT)
+
+        # Commands currently running (inline or tagged); `idle` is set when there are none
+        self.running = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
 
-        # Initialize handlers for player and account operations
-        self.player_handler = PlayerHandler(database)
-        self.account_handler = AccountHandler(database)
+    def admit(self, command: int) -> bool:
+        """
+        Charge a received frame to the peer's rate limit, before it is looked up
+        or decoded: unknown commands and undecodable data cost 1, known ones
+        their `cost` (0: not limited).
+        """
+        spec = CommandRegistry.get(command)
+        cost = spec.cost if spec is not None else 1.0
+        if not cost or self.limiter.allow(self.peer_ip, cost):
+            return True
+
+        metrics.reject("command")
+        return False
 
-        # Map command codes to their corresponding handler methods
-        self.command_map: Dict[int, Callable] = {
-            Cmd.LOGIN: self.account_handler.login,
-            Cmd.LOGOUT: self.account_handler.logout,
-            Cmd.REGISTER: self.account_handler.register,
-            Cmd.PLAYER_INFO: self.player_handler.player_info,
-            Cmd.PING: self.handle_ping,  # Add ping handling directly
-        }
+    @staticmethod
+    def streamable(command: int) -> bool:
+        """Only commands registered with stream=True get a ChunkReader for chunked frames."""
+        spec = CommandRegistry.get(command)
+        return spec is not None and spec.stream
 
-    async def send_error_response(self, code: int):
+    async def send_error_response(self, code: int, request_id: Optional[int] = None):
         """Send an error response to the client."""
         response = ResultBuilder.error(code)
-        await self.transport.send(response)
+        await self.transport.send(response, request_id)
+
+    async def run_handler(self, spec: Command, data, request_id: Optional[int] = None, decode: float = 0.0):
+        """
+        Run a command's compiled call path and send its return value, tagged
+        with the request id it answers. The call is traced (decode, handler,
+        db, encode, write spans) and logged if it exceeds the tracer threshold.
+        """
+        self.running += 1
+        self.idle.clear()
+        trace = tracer.start(spec.code, request_id)
+        tracer.add("decode", decode)
+        try:
+            with tracer.span("handler"):
+                response = await spec.call(Context(self, spec.code, request_id), data)
+            if response is not None and await self.transport.send(response, request_id) == 4002:
+                # The response could not be encoded: the client still gets an answer
+                await Logger.error(f"Command {spec.code}: response could not be encoded.", False)
+                await self.send_error_response(4002, request_id)
+        except Exception as error:
+            await Logger.error(f"Handler error: {error}", False)
+            await self.send_error_response(6003, request_id)
+        finally:
+            self.running -= 1
+            if not self.running:
+                self.idle.set()
+            slow = trace is not None and tracer.finish(trace)
 
-    async def handle_ping(self):
-        """Handle the PING command."""
-        await self.transport.send(Cmd.PING)
+        if slow:
+            await Logger.warning(f"Slow {trace}", False)
 
-    async def handle_command(self, code: int, command: Union[int, bytes], data) -> int:
+    def spawn(self, coroutine) -> asyncio.Task:
+        """Run a coroutine as a task tracked by this session."""
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def run_tagged(self, spec: Command, data, request_id: int, decode: float):
+        try:
+            await self.run_handler(spec, data, request_id, decode)
+        finally:
+            self.inflight.release()
+
+    def cancel_tasks(self) -> None:
+        """Cancel the commands still running when the session closes."""
+        for task in self.tasks:
+            task.cancel()
+        self.tasks.clear()
+
+    async def handle_command(
+        self, code: int, command: Union[int, bytes], data, request_id: Optional[int] = None
+    ) -> int:
         """
         Process incoming commands and return response codes.
 
+        Commands carrying a request id run concurrently (up to MAX_INFLIGHT per
+        session); untagged commands keep running one at a time, in order. A
+        LOGIN waits for its login queue turn where it runs: off the read loop
+        when tagged, inline (holding back later untagged commands) otherwise.
+
         [0]: Disconnect
         [1]: Continue
         """
-        print(code)
-        # Handle special case codes for connection management
-        if code == 3001:
-            await self.send_error_response(code)
-            return 0  # Disconnect after sending error response
-
-        # Handle error codes and send responses accordingly
-        if code in {2001, 5001, 4001, 4002, 6001, 6002}:
-            await self.send_error_response(code)
-            return 1  # Continue after sending error response
-
-        # Handle disconnection codes
-        if code in {1001, 5002, 5003, 5004}:
-            return 0  # Disconnect immediately
-
-        # Process regular commands
-        handler = self.command_map.get(command)
-        if callable(handler):
-            await handler(data)
+        if code != 9502:
+            if code == 3001:
+                await self.send_error_response(code)
+                return 0  # Disconnect after sending error response
+
+            if code in REPLY_CODES:
+                if command is not None:
+                    metrics.refuse(command, code)  # Rate limited or undecodable: no handler ran
+                await self.send_error_response(code, request_id)
+                return 1  # Continue after sending error response
+
+            if code in CLOSE_CODES:
+                return 0  # Disconnect immediately
+
+        spec = CommandRegistry.get(command)
+        if spec is None:
+            if isinstance(data, ChunkReader):
+                data.abort()
+            metrics.refuse(command, Codes.COMMAND_CODE_INVALID)
+            await self.send_error_response(Codes.COMMAND_CODE_INVALID, request_id)
+            return 1
+
+        decode = self.transport.decode_time  # Read now: the next frame overwrites it
+
+        if isinstance(data, ChunkReader):
+            # The handler consumes the stream while Transport keeps feeding it
+            task = self.spawn(self.run_handler(spec, data))
+            task.add_done_callback(lambda _: data.abort())  # Drop unread chunks
+            return 1
+
+        if request_id is not None:
+            await self.inflight.acquire()  # Stop reading when the session is at its limit
+            self.spawn(self.run_tagged(spec, data, request_id, decode))
             return 1
 
-        # If no handler found for the command, return error code
-        await self.send_error_response(Codes.COMMAND_CODE_INVALID)
-        return 1
\ No newline at end of file
+        await self.run_handler(spec, data, decode=decode)
+        return 1
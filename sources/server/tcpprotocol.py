@@ -0,0 +1,57 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from sources.server.IO.protocol import ProtocolReader, ProtocolWriter
+
+
+class TCPProtocol(asyncio.BufferedProtocol):
+    """
+    BufferedProtocol backend for TCPServer.
+
+    The event loop reads straight into the connection's reusable buffer
+    (ProtocolReader) and the bytes go to the session's FrameParser without
+    the StreamReader copy. The session itself is handled by the same
+    `ClientHandler.serve` as the streams backend, after the same admission stage.
+    """
+
+    def __init__(
+        self, handle_client: Callable[[ProtocolReader, ProtocolWriter], Awaitable],
+        admit: Optional[Callable[[asyncio.BaseTransport], bool]] = None
+    ) -> None:
+        self.handle_client = handle_client
+        self.admit = admit  # Admission stage; rejected connections never get a reader/writer
+        self.reader: Optional[ProtocolReader] = None
+        self.writer: Optional[ProtocolWriter] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        if self.admit is not None and not self.admit(transport):
+            return  # Aborted by the admission stage
+
+        self.reader = ProtocolReader()
+        self.reader.transport = transport
+        self.writer = ProtocolWriter(transport)
+        self.task = asyncio.get_running_loop().create_task(self.handle_client(self.reader, self.writer))
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.reader.view
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.reader.feed(nbytes)
+
+    def eof_received(self) -> bool:
+        return False  # Close the transport; the session sees 5005
+
+    def pause_writing(self) -> None:
+        self.writer.pause_writing()
+
+    def resume_writing(self) -> None:
+        self.writer.resume_writing()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if self.reader is not None:
+            self.reader.connection_lost(exc)
+            self.writer.connection_lost(exc)
@@ -2,34 +2,107 @@
 # Distributed under the terms of the Modified BSD License.
 
 import asyncio
-from typing import List, Tuple
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 
 from sources.utils import types
+from sources.utils.cpu import cpu
+from sources.utils.profiler import profiler
 from sources.utils.logger import Logger
+from sources.constants.result import ResultBuilder
 from sources.server.tcpsession import TCPSession
+from sources.server.registry import SessionRegistry
+from sources.server.timerwheel import IdleReaper
+from sources.server.heartbeat import Heartbeat
+from sources.server.fanout import Fanout
+from sources.server.aoi import AOIGrid
+from sources.server.world import World
+from sources.server.systems import movement
+from sources.server.loginqueue import LoginQueue
+from sources.server.admission import Admission
+from sources.server.metrics import MetricsServer, metrics
+from sources.server.tcpprotocol import TCPProtocol
 from sources.manager.security import RateLimiter
 from sources.utils.system import InternetProtocol
 from sources.server.tcpcontroller import TCPController
+from sources.server.commands import CommandRegistry
+
+
+class _Lookup:
+    """
+    Class attribute resolved on first access and then cached: importing
+    tcpserver (e.g. in spawned worker or CPU pool processes) makes no network call.
+    """
+
+    def __init__(self, resolve: Callable[[], str]) -> None:
+        self.resolve = resolve
+        self.value: Optional[str] = None
+
+    def __get__(self, instance: Any, owner: type) -> str:
+        if self.value is None:
+            self.value = self.resolve()
+        return self.value
 
 
 class TCPServer:
     DEBUG: bool = False
     PORT: int = 7272  # Default port number
-    LOCAL: str = InternetProtocol.local()  # Retrieve local IP address
-    PUBLIC: str = InternetProtocol.public()  # Retrieve public IP address
+    LOCAL: str = _Lookup(InternetProtocol.local)  # Local IP address, looked up on first use
+    PUBLIC: str = _Lookup(InternetProtocol.public)  # Public IP address, looked up on first use
     MAX_CONNECTIONS = 1000000  # Giới hạn số lượng kết nối tối đa
+    MAX_CONNECTIONS_PER_IP: int = 64  # Concurrent connections allowed from one IP
+    BLOCKED_IPS: Tuple[str, ...] = ()  # Always rejected at accept time
+    BACKLOG: int = 1024  # Pending accepts; asyncio's default of 100 drops bursts of connects
+    BACKEND: str = "streams"  # "streams" (StreamReader/StreamWriter) or "protocol" (BufferedProtocol)
+    DRAIN_TIMEOUT: float = 5.0  # Time given to in-flight commands when stopping
+    SHUTDOWN_TIMEOUT: float = 10.0  # Overall stop() deadline before remaining sockets are aborted
+    HEARTBEAT_INTERVAL: float = 5.0  # Server pings every session this often (seconds)
+    HEARTBEAT_MISSED: int = 3  # Consecutive unanswered pings before a session is considered dead
+    LOGIN_CONCURRENCY: int = 8  # LOGINs processed at once (DB lock, bcrypt)
+    LOGIN_QUEUE: int = 1024  # LOGINs allowed to wait; further ones are refused with 6012
+    LOGIN_FAIR: bool = True  # Serve waiting LOGINs round-robin per IP instead of FIFO
+    TICK_RATE: float = 20.0  # World simulation ticks per second
+    AOI_CELL_SIZE: float = 64.0  # Grid cell size of the area-of-interest index (world units)
+    AOI_RADIUS: float = 128.0  # Players within this distance get each other's moves (world units)
+    IDLE_TIMEOUT: float = 120.0  # Close sessions that sent nothing for this long (seconds)
+    REUSE_PORT: bool = False  # SO_REUSEPORT: several worker processes share the port (see supervisor.py)
+    CONNECT_RATE: float = 3.0  # New connections per second and IP
+    CONNECT_BURST: float = 3.0  # Connections an IP may open at once
+    CONNECT_LOCKOUT: float = 300.0  # An IP over the connection rate is refused for this long (seconds)
+    COMMAND_RATE: float = 50.0  # Command cost refilled per second and IP
+    COMMAND_BURST: float = 100.0  # Command cost an IP may spend at once
+    COMMAND_COSTS: Dict[int, float] = {}  # Cmd -> rate limit cost, overriding the handlers' defaults
+    METRICS_HOST: str = "127.0.0.1"  # Prometheus endpoint, local only
+    METRICS_PORT: Optional[int] = 9100  # GET /metrics; None disables the endpoint
+
+    def __init__(
+        self, host: str, port: int, database: types.SQLite | types.MySQL,
+        config: Optional[Dict[str, Any]] = None
+    ) -> None:
+        # Per-instance overrides of the settings above, e.g. {"BACKEND": "protocol", "METRICS_PORT": None}
+        for name, value in (config or {}).items():
+            if not name.isupper() or name not in vars(TCPServer):  # vars(): no lookup of LOCAL/PUBLIC
+                raise ValueError(f"Unknown server setting: {name}")
+            setattr(self, name, value)
 
-    def __init__(self, host: str, port: int, database: types.SQLite | types.MySQL) -> None:
         self.host = host
         self.port = port
         self.running = False
         self.database = database
-        self.current_connections = 0
 
         self.stop_event = asyncio.Event()
-        self.rate_limiter = RateLimiter(limit=3, period=1)  # Limit 3 requests per 1 second
+        self.ready = asyncio.Event()  # Set once the listening socket is bound
+        self.listener: Optional[asyncio.AbstractServer] = None
+        self.tasks: Set[asyncio.Task] = set()  # Reaper, heartbeat and world loops, cancelled by stop()
+        self.rate_limiter = RateLimiter(self.CONNECT_RATE, self.CONNECT_BURST, self.CONNECT_LOCKOUT)
+        self.command_limiter = RateLimiter(self.COMMAND_RATE, self.COMMAND_BURST, 0)  # Every frame, by cost; no lockout
         self.server_address: Tuple[str, int] = (host, port)
-        self.client_handler = ClientHandler(self, self.database, self.rate_limiter)
+        self.client_handler = ClientHandler(self, self.database, self.rate_limiter, self.command_limiter)
+
+        for code, cost in self.COMMAND_COSTS.items():
+            CommandRegistry.configure(code, cost=cost)
+        self.metrics_server = (
+            MetricsServer(self.METRICS_HOST, self.METRICS_PORT) if self.METRICS_PORT is not None else None
+        )
 
     async def start(self):
         """Start the server and listen for incoming connections asynchronously."""
@@ -46,18 +119,23 @@ class TCPServer:
 
         try:
             self.running = True
-            self.rate_limiter.running = True
             await Logger.info(f'Server processing Commands run at {self.server_address}')
 
-            server = await asyncio.start_server(
-                self.client_handler.handle_client,
-                *self.server_address, reuse_address=True
-            )
+            self.listener = await self.create_server()
+            cpu.start()  # bcrypt/JWT/large compression run off the event loop
+            await self.start_metrics()
+            self.ready.set()
+
+            for service in (self.client_handler.reaper, self.client_handler.heartbeat, self.client_handler.world):
+                task = asyncio.create_task(service.run())
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
 
-            asyncio.create_task(self.rate_limiter.clean_inactive_ips())
+            async with self.listener:
+                await self.listener.serve_forever()
 
-            async with server:
-                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass  # The listener was closed by stop()
 
         except OSError as error:
             self.running = False
@@ -68,49 +146,144 @@ class TCPServer:
             self.running = False
             await Logger.error(f"Server: {error}")
 
+    async def start_metrics(self):
+        """Serve the Prometheus endpoint; the game server runs without it if the port is taken."""
+        if self.metrics_server is None:
+            return
+        try:
+            await self.metrics_server.start()
+        except OSError as error:
+            await Logger.warning(f"Metrics endpoint disabled: {error}")
+
+    @property
+    def current_connections(self) -> int:
+        return len(self.client_handler.sessions)
+
+    async def create_server(self) -> asyncio.AbstractServer:
+        """Create the listening server with the configured backend."""
+        if self.BACKEND == "protocol":
+            loop = asyncio.get_running_loop()
+            return await loop.create_server(
+                lambda: TCPProtocol(self.client_handler.serve, self.client_handler.admit),
+                *self.server_address, reuse_address=True,
+                reuse_port=self.REUSE_PORT, backlog=self.BACKLOG
+            )
+
+        return await asyncio.start_server(
+            self.client_handler.handle_client,
+            *self.server_address, reuse_address=True,
+            reuse_port=self.REUSE_PORT, backlog=self.BACKLOG
+        )
+
     async def stop(self):
-        """Stop the server asynchronously."""
+        """Stop the server gracefully within SHUTDOWN_TIMEOUT, then flush the database."""
         if not self.running:
             await Logger.info("The server has stopped")
             return
 
         self.running = False
-        self.rate_limiter.running = False
+        self.client_handler.reaper.running = False
+        self.client_handler.heartbeat.running = False
+        self.client_handler.world.running = False
+        for task in self.tasks:
+            task.cancel()  # Do not wait for their next tick
 
-        await self.client_handler.close_all_connections()
+        if self.listener is not None:
+            self.listener.close()  # Stop accepting; serve_forever() returns
+            self.ready.clear()
+
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+
+        # Drain: notify clients, let in-flight commands finish, close everything concurrently
+        await self.client_handler.shutdown(self.SHUTDOWN_TIMEOUT, self.DRAIN_TIMEOUT)
+
+        await self.database.flush()
         await self.database.close()
+        cpu.shutdown()
+        profiler.stop()  # No-op unless it was started through the metrics endpoint
 
         await Logger.info('The server has stopped')
 
 
 class ClientHandler:
-    def __init__(self, server: TCPServer, database: types.SQLite | types.MySQL, rate_limiter: RateLimiter):
+    def __init__(
+        self, server: TCPServer, database: types.SQLite | types.MySQL,
+        rate_limiter: RateLimiter, command_limiter: Optional[RateLimiter] = None
+    ):
         self.server = server
         self.database = database
-        self.rate_limiter = rate_limiter
-        self.client_connections: List[TCPSession] = []  # Store TCPSession objects
-
-    async def check_rate_limit(self, session: TCPSession) -> bool:
-        """Check if the client's request rate is within allowed limits."""
-        if not await self.rate_limiter.is_allowed(session.client_address[0]):
-            await Logger.warning("Rate limit exceeded. Disconnecting client.")
-            await session.disconnect()  # Disconnect the session if rate limit is exceeded
-            return False  # Indicate that the rate limit check failed
-        return True  # Indicate that the rate limit check passed
+        self.rate_limiter = rate_limiter  # Connections per IP, checked at accept
+        self.command_limiter = command_limiter  # Command cost per IP (TCPController.admit)
+        self.sessions = SessionRegistry(server.MAX_CONNECTIONS)  # Live sessions by id, IP, account and group
+        self.fanout = Fanout(self.sessions)  # Encode-once broadcast/multicast
+        self.aoi = AOIGrid(server.AOI_CELL_SIZE)  # Player positions by map and grid cell
+        self.world = World(self.fanout, server.TICK_RATE)  # Fixed-timestep simulation, batched deltas
+        self.world.system(movement(self.aoi, server.AOI_RADIUS))  # UPDATE positions -> AOI, nearby moves
+        self.logins = LoginQueue(server.LOGIN_CONCURRENCY, server.LOGIN_QUEUE, server.LOGIN_FAIR)
+        self.reaper = IdleReaper(server.IDLE_TIMEOUT, self.expire_session)  # One timer wheel for all sessions
+        self.heartbeat = Heartbeat(
+            server.HEARTBEAT_INTERVAL, server.HEARTBEAT_MISSED, self.close_connection, self.fanout
+        )
+        self.draining = False  # Set by shutdown(): new commands are refused with 5008
+        self.admission = Admission(server.MAX_CONNECTIONS, server.MAX_CONNECTIONS_PER_IP, server.BLOCKED_IPS)
+        metrics.gauge("active_sessions", lambda: len(self.sessions))
+
+    def admit(self, transport: asyncio.BaseTransport) -> bool:
+        """
+        Admission stage, run first in the accept callback: global cap, per-IP
+        limit and block list. Rejected sockets are aborted before any session
+        object is allocated; admitted ones must go through `serve`.
+        """
+        peer = transport.get_extra_info('peername')
+        ip = peer[0] if peer else ""
+
+        if (reason := self.admission.admit(ip)) is not None:
+            metrics.reject(reason)
+            transport.abort()  # RST, nothing buffered or logged per rejected socket
+            return False
+        return True
 
     async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-        """Handle data from a client asynchronously with timeout."""
-        session = TCPSession()
-        await session.connect(reader, writer)
+        """Accept callback of the streams backend."""
+        if self.admit(writer.transport):
+            await self.serve(reader, writer)
 
-        if not await self.check_rate_limit(session):
-            return  # Terminate if rate limit is exceeded
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handle data from an admitted client until it disconnects."""
+        peer = writer.get_extra_info('peername')
+        ip = peer[0] if peer else ""
 
-        # Initialize the TCP controller with the database and transport
-        controller = TCPController(self.database, session.transport)
+        try:
+            # Connection rate per IP, still before any session object exists
+            if not self.rate_limiter.allow(ip):
+                metrics.reject("connection_rate")
+                writer.transport.abort()
+                return
+
+            session = TCPSession()
+            await session.connect(reader, writer)
+
+            if not session.is_connected:
+                return  # connect() failed and already disconnected
 
-        self.client_connections.append(session)
-        self.server.current_connections += 1  # Increase the number of connections
+            if not self.sessions.add(session):
+                await Logger.warning(f"MAX_CONNECTIONS ({self.server.MAX_CONNECTIONS}) reached. Rejecting client.")
+                await session.disconnect()
+                return
+
+            await self.run_session(session)
+        finally:
+            self.admission.release(ip)
+
+    async def run_session(self, session: TCPSession):
+        # Initialize the TCP controller with the database and transport
+        controller = TCPController(
+            self.database, session.transport, session, self.sessions, self.world, self.logins,
+            self.command_limiter, self.heartbeat
+        )
+        session.controller = controller
+        self.reaper.add(session)
 
         try:
             while session.is_connected:
@@ -120,7 +293,13 @@ class ClientHandler:
                     await Logger.error(f"Error receiving data: {e}")
                     break  # Break out of the loop on error
 
-                code = await controller.handle_command(code, command, data)  # Use the controller to handle the command
+                if self.draining and code == 9502:
+                    # Shutting down: only commands already in flight get to finish
+                    await controller.send_error_response(5008, session.transport.request_id)
+                    continue
+
+                # Use the controller to handle the command (tagged commands run concurrently)
+                code = await controller.handle_command(code, command, data, session.transport.request_id)
 
                 if code == 1:
                     continue  # Continue if code is 1
@@ -128,32 +307,83 @@ class ClientHandler:
                     await session.disconnect()
                     break  # Disconnect if code is 0
         finally:
+            controller.cancel_tasks()  # Abandon commands still in flight
             await self.close_connection(session)  # Ensure connection is closed
 
-    async def close_connection(self, session: TCPSession):
+    async def close_connection(self, session: TCPSession, quiet: bool = False):
         """Close a client connection."""
         try:
-            if session.is_connected:
-                await session.disconnect()  # Close the session properly
-                session.is_connected = False  # Mark the session as disconnected
+            self.sessions.remove(session)  # O(1), also when the session already disconnected
+            self.reaper.remove(session)
+            self.heartbeat.remove(session)
+            self.aoi.remove(session.id)
+            self.world.forget(session.id)
 
-                if session in self.client_connections:
-                    self.client_connections.remove(session)
-
-                self.server.current_connections -= 1  # Decrease the current connection count
+            if session.is_connected:
+                await session.disconnect(quiet)  # Close the session properly
         except Exception as e:
             await Logger.error(f"Error while closing connection: {e}")
 
-    async def close_all_connections(self):
-        """Close all client connections."""
-        if not self.client_connections:
+    async def expire_session(self, session: TCPSession):
+        """Called by the IdleReaper: tell the client it timed out, then close it."""
+        try:
+            await session.transport.send(ResultBuilder.error(3001))
+        except Exception as e:
+            await Logger.error(f"Error while expiring session: {e}")
+        await self.close_connection(session)
+
+    async def kick_account(self, account_id) -> int:
+        """Disconnect every session logged in to an account; return how many were closed."""
+        sessions = self.sessions.for_account(account_id)
+        await asyncio.gather(*(self.close_connection(session) for session in sessions))
+        return len(sessions)
+
+    async def close_all_connections(self, timeout: Optional[float] = None):
+        """Close all client connections concurrently; abort whatever is left after `timeout`."""
+        if not self.sessions:
             await Logger.info("No connections to close.")
             return
 
-        close_tasks = [asyncio.create_task(self.close_connection(session)) for session in self.client_connections]
+        sessions = list(self.sessions)
+        closing = asyncio.gather(*(self.close_connection(session, quiet=True) for session in sessions))
 
-        for task in close_tasks:
-            await task
-
-        self.client_connections.clear()  # Clear the list of connections
-        await Logger.info("All connections closed successfully.")
\ No newline at end of file
+        try:
+            await asyncio.wait_for(closing, timeout)
+        except asyncio.TimeoutError:
+            await Logger.warning("Close timed out; aborting remaining connections.")
+
+        # Whatever did not close in time is dropped (abort is a no-op on closed transports)
+        for session in sessions:
+            self.sessions.remove(session)
+            if session.writer is not None:
+                session.writer.transport.abort()
+
+        await Logger.info(f"All {len(sessions)} connections closed.")
+
+    async def shutdown(self, timeout: float, drain_timeout: float):
+        """
+        Graceful drain within `timeout` seconds: refuse new commands, notify
+        every client (5008, encoded once and queued without waiting, so a
+        client that stopped reading cannot hold up the others), wait up to
+        `drain_timeout` for in-flight commands, then close all sessions concurrently.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self.draining = True
+
+        sessions = list(self.sessions)
+        if sessions:
+            await Logger.info(f"Draining {len(sessions)} sessions...")
+
+            self.fanout.broadcast(ResultBuilder.error(5008), sessions)
+            waiting = [session.controller.idle.wait() for session in sessions if session.controller]
+
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*waiting, return_exceptions=True),
+                    min(drain_timeout, deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                await Logger.warning("Drain timed out; closing sessions with commands in flight.")
+
+        await self.close_all_connections(max(deadline - loop.time(), 0.1))
@@ -6,6 +6,7 @@ import typing
 import asyncio
 
 from sources.utils.logger import Logger
+from sources.server.rtt import RttStats
 from sources.server.IO.transport import Transport
 
 
@@ -21,6 +22,9 @@ class TCPSession:
         self.writer: typing.Optional[asyncio.StreamWriter] = None
         self.client_address: typing.Optional[typing.Tuple[str, int]] = None
         self.id = uuid.uuid4()  # Unique identifier for the session
+        self.account_id = None  # Set by SessionRegistry.bind_account after a successful login
+        self.groups = set()  # Multicast groups, kept by SessionRegistry.join/leave
+        self.rtt = RttStats()  # Round-trip time, measured by the server heartbeat
 
     async def connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         """Establish a connection with the client and set session details."""
@@ -52,8 +56,8 @@ class TCPSession:
             await Logger.error(f"Unexpected error during connection: {error}")
             await self.disconnect()
 
-    async def disconnect(self):
-        """Safely disconnect the client."""
+    async def disconnect(self, quiet: bool = False):
+        """Safely disconnect the client (`quiet`: skip the per-session log line, e.g. on shutdown)."""
         if not self.is_connected:
             return
 
@@ -62,15 +66,20 @@ class TCPSession:
         try:
             # Check if writer exists and has been initialized
             if self.writer:
-                await self.writer.drain()  # Ensure all remaining data is sent
+                if self.transport:
+                    self.transport.writer.flush()  # Send frames still held by write coalescing
+                # close() still sends what is buffered; waiting in drain() first could block
+                # forever on a client that stopped reading, so only wait_closed() is bounded
+                self.writer.close()
 
                 try:
                     await asyncio.wait_for(self.writer.wait_closed(), timeout=2.0)
                 except asyncio.TimeoutError:
                     await Logger.warning(f"Timeout while waiting for writer to close: {self.id}")
-                    self.writer.close()  # Close writer if timeout occurs
+                    self.writer.transport.abort()  # Drop the connection if it does not close in time
 
-            await Logger.info(f"Session: {self.id} disconnected...")
+            if not quiet:
+                await Logger.info(f"Session: {self.id} disconnected...")
 
         except OSError as error:
             await Logger.error(f"OSError during disconnection: {error}")
@@ -0,0 +1,127 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import math
+import time
+import asyncio
+
+from typing import Awaitable, Callable, Dict, Hashable, List, Set
+
+from sources.utils.logger import Logger
+from sources.server.tcpsession import TCPSession
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: `slots` buckets, one per `tick` seconds.
+
+    schedule/cancel are O(1); `advance()` only touches the bucket of the
+    current tick. Delays longer than one turn of the wheel are kept in their
+    bucket with a number of remaining rounds.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 256) -> None:
+        if tick <= 0 or slots <= 0:
+            raise ValueError("tick and slots must be greater than 0.")
+
+        self.tick = tick
+        self.cursor = 0
+        self.buckets: List[Dict[Hashable, int]] = [{} for _ in range(slots)]  # key -> rounds
+        self.positions: Dict[Hashable, int] = {}  # key -> bucket index
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.positions
+
+    def schedule(self, key: Hashable, delay: float) -> None:
+        """(Re)schedule `key` to expire after `delay` seconds (rounded up to a tick)."""
+        self.cancel(key)
+
+        ticks = max(1, math.ceil(delay / self.tick))
+        rounds, offset = divmod(ticks - 1, len(self.buckets))
+        index = (self.cursor + 1 + offset) % len(self.buckets)
+
+        self.buckets[index][key] = rounds
+        self.positions[key] = index
+
+    def cancel(self, key: Hashable) -> None:
+        if (index := self.positions.pop(key, None)) is not None:
+            del self.buckets[index][key]
+
+    def advance(self) -> List[Hashable]:
+        """Move one tick forward and return the keys that expired."""
+        self.cursor = (self.cursor + 1) % len(self.buckets)
+        bucket = self.buckets[self.cursor]
+
+        expired = [key for key, rounds in bucket.items() if not rounds]
+        for key in expired:
+            del bucket[key]
+            del self.positions[key]
+
+        for key in bucket:
+            bucket[key] -= 1
+        return expired
+
+
+class IdleReaper:
+    """
+    Closes sessions that received nothing for `timeout` seconds.
+
+    The read path only stores a timestamp (`Transport.last_activity`); the
+    reaper checks each session once per timeout period via a TimerWheel and
+    re-files the ones that were active in the meantime, so there are no
+    per-read timer handles on the event loop.
+    """
+
+    def __init__(
+        self, timeout: float, on_idle: Callable[[TCPSession], Awaitable],
+        tick: float = 1.0, slots: int = 256
+    ) -> None:
+        if timeout <= 0:
+            raise ValueError("timeout must be greater than 0.")
+
+        self.timeout = timeout
+        self.on_idle = on_idle
+        self.wheel = TimerWheel(tick, slots)
+        self.running = False
+        self.reaped = 0  # Sessions closed for inactivity
+        self.tasks: Set[asyncio.Task] = set()  # Batches being closed
+
+    def add(self, session: TCPSession) -> None:
+        self.wheel.schedule(session, self.timeout)
+
+    def remove(self, session: TCPSession) -> None:
+        self.wheel.cancel(session)
+
+    def collect(self) -> List[TCPSession]:
+        """Advance one tick; return idle sessions and re-file the active ones."""
+        now = time.monotonic()
+        idle = []
+
+        for session in self.wheel.advance():
+            quiet = now - session.transport.last_activity
+            if quiet >= self.timeout:
+                idle.append(session)
+            else:
+                self.wheel.schedule(session, self.timeout - quiet)
+
+        return idle
+
+    async def run(self) -> None:
+        """Tick every `tick` seconds until `running` is cleared."""
+        self.running = True
+        while self.running:
+            await asyncio.sleep(self.wheel.tick)
+
+            if idle := self.collect():
+                self.reaped += len(idle)
+                await Logger.info(f"Closing {len(idle)} idle sessions.", False)
+                # Closed in one batch, off the ticking loop
+                task = asyncio.create_task(self._close(idle))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    async def _close(self, sessions: List[TCPSession]) -> None:
+        await asyncio.gather(*(self.on_idle(session) for session in sessions), return_exceptions=True)
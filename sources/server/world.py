@@ -0,0 +1,148 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import time
+import uuid
+import asyncio
+
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Set, Tuple
+
+from sources.utils.logger import Logger
+from sources.server.fanout import Fanout
+
+
+System = Callable[["World", float], None]
+
+
+class World:
+    """
+    Fixed-timestep simulation loop.
+
+    Every 1 / `rate` seconds on the monotonic clock the world:
+
+    1. moves the player inputs queued since the last tick to `inputs`;
+    2. runs the registered systems in order with the fixed step `dt`;
+    3. sends each session that got events one batched delta frame,
+       `{"tick": n, "events": [...]}`, through the Fanout (never waits).
+
+    Tick deadlines are computed from the start time (start + n * dt), so
+    sleep jitter does not accumulate. When the loop falls more than
+    `max_catchup` ticks behind, the missed ticks are dropped and counted
+    instead of being run back to back.
+
+    Systems are plain functions: per-tick work must not await. The server
+    registers movement (see systems.py); there are no mob or buff systems
+    yet, as the tree has no mob or buff data to simulate.
+    """
+
+    def __init__(self, fanout: Fanout, rate: float = 20.0, max_inputs: int = 65536, max_catchup: int = 5) -> None:
+        if rate <= 0 or max_inputs <= 0 or max_catchup <= 0:
+            raise ValueError("rate, max_inputs and max_catchup must be greater than 0.")
+
+        self.fanout = fanout
+        self.dt = 1.0 / rate
+        self.max_inputs = max_inputs
+        self.max_catchup = max_catchup
+        self.running = False
+
+        self.systems: List[System] = []
+        self.queue: Deque[Tuple[uuid.UUID, Any]] = deque()
+        self.inputs: List[Tuple[uuid.UUID, Any]] = []  # Inputs of the tick being run
+        self.deltas: Dict[uuid.UUID, List[Any]] = {}    # Events to send at the end of the tick
+        self.tasks: Set[asyncio.Task] = set()  # Error logs written from (synchronous) ticks
+
+        self.tick = 0
+        self.overruns = 0        # Ticks whose work took longer than dt
+        self.skipped = 0         # Ticks dropped to catch up
+        self.dropped_inputs = 0  # Inputs refused because the queue was full
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def system(self, function: System) -> System:
+        """Register a system (usable as a decorator); systems run in registration order."""
+        self.systems.append(function)
+        return function
+
+    def submit(self, session_id: uuid.UUID, data: Any) -> bool:
+        """Queue a player input for the next tick; False if the queue is full."""
+        if len(self.queue) >= self.max_inputs:
+            self.dropped_inputs += 1
+            return False
+        self.queue.append((session_id, data))
+        return True
+
+    def push(self, session_id: uuid.UUID, event: Any) -> None:
+        """Add an event to the session's delta frame of the current tick."""
+        self.deltas.setdefault(session_id, []).append(event)
+
+    def forget(self, session_id: uuid.UUID) -> None:
+        """Drop what is pending for a closed session."""
+        self.deltas.pop(session_id, None)
+
+    def step(self) -> None:
+        """Run one tick."""
+        started = time.perf_counter()
+        self.tick += 1
+
+        self.inputs = list(self.queue)
+        self.queue.clear()
+
+        for system in self.systems:
+            try:
+                system(self, self.dt)
+            except Exception as error:
+                self.log_error(f"World system {system.__name__}: {error}")
+
+        self.flush()
+
+        self.last_duration = time.perf_counter() - started
+        self.total_duration += self.last_duration
+        self.max_duration = max(self.max_duration, self.last_duration)
+        if self.last_duration > self.dt:
+            self.overruns += 1
+
+    def log_error(self, message: str) -> None:
+        """Log from a tick without waiting; the task is kept referenced until it is done."""
+        task = asyncio.create_task(Logger.error(message, False))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def flush(self) -> None:
+        """Send one delta frame per session that has events."""
+        deltas, self.deltas = self.deltas, {}
+        for session_id, events in deltas.items():
+            if (session := self.fanout.registry.get(session_id)) is not None:
+                self.fanout.broadcast({"tick": self.tick, "events": events}, (session,))
+
+    async def run(self) -> None:
+        """Tick every `dt` seconds until `running` is cleared."""
+        self.running = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+
+        while self.running:
+            deadline += self.dt
+            if (delay := deadline - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            elif -delay > self.max_catchup * self.dt:
+                # Too far behind (long GC pause, blocked loop): drop the backlog
+                missed = int(-delay / self.dt)
+                self.skipped += missed
+                deadline += missed * self.dt
+            else:
+                await asyncio.sleep(0)  # Catching up, but let I/O run between ticks
+
+            self.step()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "tick": self.tick,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "dropped_inputs": self.dropped_inputs,
+            "last_ms": self.last_duration * 1000,
+            "max_ms": self.max_duration * 1000,
+            "avg_ms": self.total_duration / self.tick * 1000 if self.tick else 0.0,
+        }
@@ -2,6 +2,7 @@
 # Copyright (C) PhcNguyen Developers
 # Distributed under the terms of the Modified BSD License.
 
+import time
 import typing
 import asyncio
 import threading
@@ -10,6 +11,7 @@ import customtkinter as ctk
 from sources.utils import types
 from sources.configs import UIConfigs
 from sources.utils.realtime import TimeUtil
+from sources.server.metrics import metrics
 from sources.manager.files.filecache import FileCache
 from sources.utils.system import InternetProtocol, System
 
@@ -57,13 +59,23 @@ class Graphics(UIConfigs):
         self.update_label(1, ip1_info)
 
     async def auto_updater_info(self):
-        """Cập nhật trạng thái CPU, RAM, Ping và số lượng kết nối định kỳ."""
+        """Cập nhật trạng thái CPU, RAM, Ping, số lượng kết nối và số liệu lệnh định kỳ."""
+        requests, last = metrics.snapshot()["requests"], time.monotonic()
         while self.running:
             try:
                 self.update_label(2, f"{InternetProtocol.ping()} ms")
                 self.update_label(3, f"{System.cpu()} %")
                 self.update_label(4, f"{System.ram()} MB")
                 self.update_label(5, f"{self.server.current_connections}")
+
+                snapshot, now = metrics.snapshot(), time.monotonic()
+                p99 = max((p99 for _, p99 in snapshot["latency_ms"].values()), default=None)
+                self.update_label(6, f"{(snapshot['requests'] - requests) / (now - last):.0f}")
+                self.update_label(7, f"{p99:.1f} ms" if p99 is not None else "N/A")
+                self.update_label(8, f"{snapshot['bytes_in'] // 1024}/{snapshot['bytes_out'] // 1024} KB")
+                self.update_label(9, f"{snapshot['rejected']}")
+                requests, last = snapshot["requests"], now
+
                 await asyncio.sleep(0.8)
             except Exception as e:
                 print(f"Lỗi xảy ra trong quá trình cập nhật thông tin: {e}")
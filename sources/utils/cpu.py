@@ -0,0 +1,133 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import os
+import jwt
+import bcrypt
+import asyncio
+import multiprocessing
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+
+# Work run in the pool: top-level functions, so they can be pickled for worker processes
+def _hash_password(password: str) -> bytes:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+
+
+def _check_password(password: str, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed)
+
+
+def _jwt_encode(payload: dict, key: str, algorithm: str) -> str:
+    return jwt.encode(payload, key, algorithm=algorithm)
+
+
+def _jwt_decode(token: str, key: str, algorithm: str) -> dict:
+    return jwt.decode(token, key, algorithms=[algorithm])
+
+
+class CpuExecutor:
+    """
+    Shared executor for CPU-bound work (bcrypt, JWT, large compression).
+
+    Work runs in a process pool so it neither blocks the event loop nor
+    holds the GIL the loop needs. If worker processes cannot be started,
+    or the pool breaks, it falls back to a thread pool (bcrypt and zlib
+    release the GIL, so the loop keeps running either way).
+
+    `pending` is the queue depth: calls submitted and not finished yet.
+    """
+
+    PROCESSES: Optional[int] = None  # Worker processes (None: CPU count, at most 4)
+    THREADS: int = 4                 # Threads of the fallback pool
+
+    def __init__(self, processes: Optional[int] = None, threads: Optional[int] = None) -> None:
+        self.processes = processes  # Resolved in start(), so PROCESSES/THREADS can be set after import
+        self.threads = threads
+        self.executor: Optional[Executor] = None
+        self.mode = "stopped"  # "process", "thread" or "stopped"
+
+        self.pending = 0
+        self.max_pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Create the pool (idempotent); done lazily on first use otherwise."""
+        if self.executor is not None:
+            return
+
+        self.processes = self.processes or self.PROCESSES or min(4, os.cpu_count() or 1)
+        try:
+            # spawn: never fork a process that already runs an event loop and threads
+            self.executor = ProcessPoolExecutor(self.processes, multiprocessing.get_context("spawn"))
+            self.mode = "process"
+        except (OSError, NotImplementedError, ValueError):
+            self.use_threads()
+
+    def use_threads(self) -> None:
+        """Switch to the thread-pool fallback."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.threads = self.threads or self.THREADS
+        self.executor = ThreadPoolExecutor(self.threads, thread_name_prefix="cpu")
+        self.mode = "thread"
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.mode = "stopped"
+
+    async def run(self, function: Callable, *args) -> Any:
+        """Run `function(*args)` in the pool; in process mode it must be picklable."""
+        if self.executor is None:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+
+        try:
+            try:
+                result = await loop.run_in_executor(self.executor, function, *args)
+            except BrokenProcessPool:
+                if self.mode == "process":
+                    self.use_threads()  # A worker died (OOM, killed): keep serving from threads
+                result = await loop.run_in_executor(self.executor, function, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        return result
+
+    async def hash_password(self, password: str) -> bytes:
+        return await self.run(_hash_password, password)
+
+    async def check_password(self, password: str, hashed: bytes) -> bool:
+        return await self.run(_check_password, password, hashed)
+
+    async def jwt_encode(self, payload: dict, key: str, algorithm: str = "HS256") -> str:
+        return await self.run(_jwt_encode, payload, key, algorithm)
+
+    async def jwt_decode(self, token: str, key: str, algorithm: str = "HS256") -> dict:
+        return await self.run(_jwt_decode, token, key, algorithm)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.processes if self.mode == "process" else self.threads,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+cpu = CpuExecutor()  # Shared by the whole process
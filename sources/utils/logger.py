@@ -7,6 +7,7 @@ import asyncio
 
 from sources.configs import DIR_LOG
 from sources.manager.files.filecache import FileCache
+from sources.utils.tracing import tracer
 
 
 def setup_logger() -> logging.Logger:
@@ -60,9 +61,10 @@ class Logger:
         """Ghi log thông điệp ở mức đã chỉ định một cách bất đồng bộ."""
         level = level.lower()
         message = str(message) if isinstance(message, Exception) else message
-        if write_cache:
-            await Logger.cache.write(message, f'{level}.cache')
-        await asyncio.to_thread(getattr(Logger.logger, level, Logger.logger.info), message)
+        with tracer.span("log"):
+            if write_cache:
+                await Logger.cache.write(message, f'{level}.cache')
+            await asyncio.to_thread(getattr(Logger.logger, level, Logger.logger.info), message)
 
     @staticmethod
     async def info(message: str | Exception, write_cache: bool = True):
@@ -0,0 +1,86 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import os
+import sys
+import time
+import threading
+
+from collections import Counter
+from typing import Optional
+
+
+class SamplingProfiler:
+    """
+    On-demand sampling profiler: a daemon thread reads every other thread's
+    stack with `sys._current_frames()` each `interval` seconds and counts
+    identical stacks. `collapsed()` gives one "frame;frame;... count" line per
+    stack, the input of flamegraph.pl / speedscope. Start and stop it at
+    runtime; nothing is sampled while it is stopped.
+    """
+
+    INTERVAL: float = 0.005  # Seconds between samples
+    MAX_DEPTH: int = 128     # Deeper stacks are truncated at the root side
+
+    def __init__(self) -> None:
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.samples: Counter = Counter()
+        self.taken = 0
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self, interval: Optional[float] = None) -> bool:
+        """Start sampling (clearing previous samples); False if already running."""
+        if self.running:
+            return False
+
+        self.samples.clear()
+        self.taken = 0
+        self.running = True
+        self.started = time.monotonic()
+        self.thread = threading.Thread(
+            target=self._run, args=(interval or self.INTERVAL,), name="sampling-profiler", daemon=True
+        )
+        self.thread.start()
+        return True
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks."""
+        if self.running:
+            self.running = False
+            self.thread.join()
+            self.thread = None
+            self.duration = time.monotonic() - self.started
+        return self.collapsed()
+
+    def _run(self, interval: float) -> None:
+        own = threading.get_ident()
+        while self.running:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.samples[self._collapse(names.get(ident, str(ident)), frame)] += 1
+            self.taken += 1
+            time.sleep(interval)
+
+    def _collapse(self, thread: str, frame) -> str:
+        stack = []
+        while frame is not None and len(stack) < self.MAX_DEPTH:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.append(thread)
+        return ";".join(reversed(stack))
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def dump(self, path: str) -> str:
+        """Write the collapsed stacks to `path` (e.g. for `flamegraph.pl path > out.svg`)."""
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.collapsed())
+        return path
+
+
+profiler = SamplingProfiler()  # Shared by the whole process
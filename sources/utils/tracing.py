@@ -0,0 +1,119 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import time
+
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Deque, Dict, List, Optional
+
+
+# Order spans are printed in (roughly the order a command goes through them)
+ORDER = {name: index for index, name in enumerate(("decode", "queue", "handler", "db", "log", "encode", "write"))}
+
+
+class Trace:
+    """Span timings of one command call; spans with the same name are summed."""
+
+    __slots__ = ("command", "request_id", "started", "duration", "spans", "token")
+
+    def __init__(self, command: int, request_id: Optional[int] = None) -> None:
+        self.command = command
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.spans: Dict[str, List[float]] = {}  # name -> [seconds, count]
+        self.token: Optional[Token] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        if (entry := self.spans.get(name)) is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def __str__(self) -> str:
+        request = f" (request {self.request_id})" if self.request_id is not None else ""
+        spans = " | ".join(
+            f"{name} {seconds * 1000:.2f} ms" + (f" x{count}" if count > 1 else "")
+            for name, (seconds, count) in sorted(self.spans.items(), key=lambda span: ORDER.get(span[0], len(ORDER)))
+        )
+        return f"command {self.command}{request}: {self.duration * 1000:.2f} ms | {spans}"
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+class Span:
+    """Times a `with` block into the current task's trace; a no-op outside a traced command."""
+
+    __slots__ = ("name", "trace", "started")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.trace: Optional[Trace] = None
+        self.started = 0.0
+
+    def __enter__(self) -> "Span":
+        if (trace := _current.get()) is not None:
+            self.trace = trace
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter() - self.started)
+
+
+class Tracer:
+    """
+    Per-command tracing. A trace is started for every command and carried in
+    a context variable, so code anywhere below the handler (SQL layer,
+    Logger, Transport) adds spans without passing it around; tasks spawned
+    by the command inherit it. Only traces over `threshold` are kept.
+    """
+
+    THRESHOLD: float = 0.1  # Commands slower than this (seconds) are recorded
+    KEEP: int = 100         # Slow traces kept for inspection
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self.threshold = self.THRESHOLD
+        self.slow: Deque[Trace] = deque(maxlen=self.KEEP)
+        self.traced = 0
+
+    @staticmethod
+    def span(name: str) -> Span:
+        return Span(name)
+
+    @staticmethod
+    def add(name: str, seconds: float) -> None:
+        """Add a span measured elsewhere (e.g. decoding, done before the trace starts)."""
+        if (trace := _current.get()) is not None:
+            trace.add(name, seconds)
+
+    def start(self, command: int, request_id: Optional[int] = None) -> Optional[Trace]:
+        if not self.enabled:
+            return None
+
+        trace = Trace(command, request_id)
+        trace.token = _current.set(trace)
+        return trace
+
+    def finish(self, trace: Trace) -> bool:
+        """Close the trace; True (and kept in `slow`) if it went over the threshold."""
+        trace.duration = time.perf_counter() - trace.started
+        _current.reset(trace.token)
+        self.traced += 1
+
+        if trace.duration < self.threshold:
+            return False
+
+        self.slow.append(trace)
+        return True
+
+    def report(self) -> str:
+        return "\n".join(str(trace) for trace in self.slow) + "\n"
+
+
+tracer = Tracer()  # Shared by the whole process
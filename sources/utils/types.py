@@ -55,6 +55,7 @@ class SQLite:
         self.account: AccountManager = AccountManager(None)
 
     async def start(self) -> bool: ...
+    async def flush(self) -> None: ...
     async def close(self) -> bool: ...
 
 class MySQL:
@@ -80,6 +81,7 @@ class MySQL:
         self.account: AccountManager = AccountManager(None)
 
     async def start(self) -> bool: ...
+    async def flush(self) -> None: ...
     async def close(self) -> bool: ...
 
 
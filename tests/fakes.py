@@ -0,0 +1,72 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from sources.server.IO.frame import HEADER, LENGTH
+
+
+def wire_frame(command: int, payload: bytes, flags: int = 0) -> bytes:
+    """Client frame carrying a DataPackager payload (whose length prefix becomes the header's)."""
+    body = payload[LENGTH.size:]
+    return HEADER.pack(command, len(body) | flags) + body
+
+
+class FakeTransport:
+    """asyncio transport side of FakeWriter: buffered bytes and write limits."""
+
+    def __init__(self) -> None:
+        self.buffered = 0
+        self.limits = None
+        self.aborted = False
+
+    def get_write_buffer_size(self) -> int:
+        return self.buffered
+
+    def set_write_buffer_limits(self, high: int, low: int) -> None:
+        self.limits = (high, low)
+
+    def abort(self) -> None:
+        self.aborted = True
+
+
+class FakeWriter:
+    """StreamWriter collecting what is written; drain() waits until `drained` is set."""
+
+    def __init__(self) -> None:
+        self.wire = bytearray()
+        self.writes = 0
+        self.lines = []  # Objects passed to writelines, as given
+        self.transport = FakeTransport()
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.closed = False
+
+    def write(self, data: bytes) -> None:
+        self.wire += data
+        self.writes += 1
+
+    def writelines(self, data) -> None:
+        for item in data:
+            self.lines.append(item)
+            self.wire += item
+        self.writes += 1
+
+    async def drain(self) -> None:
+        await asyncio.sleep(0)
+        await self.drained.wait()
+
+    def can_write_eof(self) -> bool:
+        return True
+
+    def is_closing(self) -> bool:
+        return self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+    async def wait_closed(self) -> None:
+        pass
+
+    def get_extra_info(self, name, default=None):
+        return ("10.0.0.1", 50000) if name == "peername" else default
@@ -0,0 +1,57 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import pytest
+
+from sources.server.admission import Admission
+
+
+def test_per_ip_limit():
+    admission = Admission(max_connections=10, max_per_ip=2)
+
+    assert admission.admit("a") is None
+    assert admission.admit("a") is None
+    assert admission.admit("a") == Admission.PER_IP
+    assert admission.admit("b") is None
+
+    admission.release("a")
+    assert admission.admit("a") is None
+    assert admission.rejected == {Admission.PER_IP: 1}
+
+
+def test_global_cap():
+    admission = Admission(max_connections=2, max_per_ip=2)
+    admission.admit("a")
+    admission.admit("b")
+
+    assert admission.admit("c") == Admission.FULL
+    admission.release("b")
+    assert admission.admit("c") is None
+
+
+def test_block_list_comes_first():
+    admission = Admission(max_connections=1, max_per_ip=1, blocked=("a",))
+
+    assert admission.admit("a") == Admission.BLOCKED
+    admission.unblock("a")
+    assert admission.admit("a") is None
+
+    admission.block("b")
+    assert admission.check("b") == Admission.BLOCKED  # Even with the server full
+
+
+def test_release_forgets_the_ip():
+    admission = Admission(max_connections=10, max_per_ip=2)
+    admission.admit("a")
+    admission.admit("a")
+
+    admission.release("a")
+    admission.release("a")
+    assert (admission.active, admission.per_ip) == (0, {})
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        Admission(max_connections=0, max_per_ip=1)
+    with pytest.raises(ValueError):
+        Admission(max_connections=1, max_per_ip=0)
@@ -0,0 +1,241 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from types import SimpleNamespace
+
+from sources.constants.cmd import Cmd, Codes
+from sources.server.commands import Command, CommandRegistry, Context, login_queue
+from sources.server.loginqueue import LoginQueue
+
+
+class SlowTransport:
+    """Transport whose send() blocks until the test lets it through."""
+
+    def __init__(self) -> None:
+        self.sent = []
+        self.unblock = asyncio.Event()
+
+    async def send(self, data, request_id=None) -> None:
+        self.sent.append(data)
+        await self.unblock.wait()
+
+
+def queued_call(logins: LoginQueue, transport: SlowTransport):
+    async def handler(ctx, data):
+        return "done"
+
+    controller = SimpleNamespace(logins=logins, peer_ip="10.0.0.1", transport=transport)
+    call = login_queue(Command(Cmd.LOGIN, handler, queued=True), handler)
+    return lambda request_id=1: call(Context(controller, Cmd.LOGIN, request_id), {})
+
+
+def test_queued_login_cancelled_during_interim_send_gives_place_back():
+    async def main():
+        logins = LoginQueue(max_active=1, max_queued=1)
+        transport = SlowTransport()
+        busy = logins.enqueue("other")
+
+        task = asyncio.create_task(queued_call(logins, transport)())
+        await asyncio.sleep(0)
+        assert transport.sent and logins.queued == 1  # Blocked sending LOGIN_QUEUED
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert (logins.active, logins.queued) == (1, 0)
+
+        logins.withdraw(busy)
+        assert (logins.active, logins.queued) == (0, 0)
+        assert logins.enqueue("next").done()
+
+    asyncio.run(main())
+
+
+def test_queued_login_runs_once_its_turn_comes():
+    async def main():
+        logins = LoginQueue(max_active=1, max_queued=1)
+        transport = SlowTransport()
+        transport.unblock.set()
+        logins.enqueue("other")
+
+        task = asyncio.create_task(queued_call(logins, transport)())
+        await asyncio.sleep(0)
+        logins.release()
+
+        assert await task == "done"
+        assert (logins.active, logins.queued) == (0, 0)
+
+    asyncio.run(main())
+
+
+def test_untagged_queued_login_gets_no_interim_answer():
+    async def main():
+        logins = LoginQueue(max_active=1, max_queued=1)
+        transport = SlowTransport()
+        transport.unblock.set()
+        logins.enqueue("other")
+
+        task = asyncio.create_task(queued_call(logins, transport)(None))
+        await asyncio.sleep(0)
+        logins.release()
+
+        assert await task == "done"
+        assert transport.sent == []  # Exactly one reply: the LOGIN result
+
+    asyncio.run(main())
+
+
+def test_untagged_login_waits_inline_and_keeps_order():
+    import sources.handlers  # noqa: F401 (registers the commands)
+    from sources.server.tcpcontroller import TCPController
+
+    async def main():
+        replies = []
+
+        class RecordingTransport:
+            decode_time = 0.0
+
+            async def send(self, data, request_id=None):
+                replies.append((data.get("message"), data.get("code")))
+
+        async def info(email):
+            return False, None
+
+        logins = LoginQueue(max_active=1, max_queued=1)
+        busy = logins.enqueue("other")
+        database = SimpleNamespace(account=SimpleNamespace(info=info))
+        session = SimpleNamespace(id=1, account_id=None, client_address=("10.0.0.1", 1))
+        controller = TCPController(database, RecordingTransport(), session, logins=logins)
+
+        login = asyncio.create_task(controller.handle_command(9502, Cmd.LOGIN, {"email": "a@b.c", "password": "x"}))
+        await asyncio.sleep(0.01)
+        assert not login.done()  # Waiting for its turn, on the read loop
+
+        logins.withdraw(busy)
+        await login
+        await controller.handle_command(9502, Cmd.LOGOUT, {"id": 1})
+        assert len(replies) == 2 and replies[0][1] != Codes.ACCESS_DENIED  # The LOGIN result comes first
+        assert replies[1][1] == Codes.ACCESS_DENIED
+
+    asyncio.run(main())
+
+
+def test_middleware_order():
+    names = [name for name, _ in CommandRegistry.middleware]
+    assert names == ["metrics", "auth", "validation", "login_queue"]
+
+
+def test_refused_commands_are_counted_by_command():
+    from sources.server.IO.packager import DataPackager
+    from sources.server.IO.transport import Transport
+    from sources.server.metrics import metrics
+    from sources.server.tcpcontroller import TCPController
+    from tests.fakes import FakeWriter, wire_frame
+
+    async def main():
+        reader = asyncio.StreamReader()
+        transport = Transport(reader, FakeWriter())
+        session = SimpleNamespace(id=1, account_id=None, transport=transport, client_address=("10.0.0.1", 1))
+        allowed = iter((False, True, True, True))
+        limiter = SimpleNamespace(allow=lambda ip, cost: next(allowed))
+        controller = TCPController(None, transport, session, limiter=limiter)
+
+        update = wire_frame(Cmd.UPDATE, DataPackager().encode(["1,2,3"]))
+        reader.feed_data(update)  # Rate limited
+        reader.feed_data(wire_frame(Cmd.UPDATE, b"\0\0\0\1\xff"))  # Not the UPDATE schema
+        reader.feed_data(update)  # Not logged in
+        reader.feed_data(wire_frame(99, DataPackager().encode([1])))  # Unknown command
+        for _ in range(4):
+            await controller.handle_command(*await transport.receive())
+
+    errors = dict(metrics.errors)
+    asyncio.run(main())
+    counted = {key: count - errors.get(key, 0) for key, count in metrics.errors.items()}
+    assert {key: count for key, count in counted.items() if count} == {
+        (Cmd.UPDATE, 6013): 1, (Cmd.UPDATE, Codes.DATA_INVALID): 1,
+        (Cmd.UPDATE, Codes.ACCESS_DENIED): 1, (99, Codes.COMMAND_CODE_INVALID): 1,
+    }
+
+
+def test_invalid_update_is_refused_before_the_handler():
+    import sources.handlers  # noqa: F401 (registers the commands)
+
+    submitted = []
+    session = SimpleNamespace(id=1, account_id=7)
+    world = SimpleNamespace(submit=lambda session_id, data: submitted.append(data))
+    controller = SimpleNamespace(session=session, world=world, limiter=None, peer_ip="10.0.0.1")
+    call = CommandRegistry.get(Cmd.UPDATE).call
+
+    async def main():
+        assert (await call(Context(controller, Cmd.UPDATE), {"position": "1,x"}))["code"] == Codes.DATA_INVALID
+        assert await call(Context(controller, Cmd.UPDATE), {"position": "1,2,3"}) is None
+
+    asyncio.run(main())
+    assert submitted == [{"position": "1,2,3"}]
+
+
+def test_update_frame_is_decoded_by_its_schema_and_queued():
+    import sources.handlers  # noqa: F401 (registers the commands)
+    from sources.server.IO.packager import DataPackager
+    from sources.server.IO.transport import Transport
+    from sources.server.tcpcontroller import TCPController
+    from tests.fakes import FakeWriter, wire_frame
+
+    async def main():
+        reader = asyncio.StreamReader()
+        transport = Transport(reader, FakeWriter())
+        submitted = []
+        world = SimpleNamespace(submit=lambda session_id, data: submitted.append((session_id, data)))
+        session = SimpleNamespace(id=1, account_id=7, transport=transport, client_address=("10.0.0.1", 1))
+        controller = TCPController(None, transport, session, world=world)
+
+        packager = DataPackager()
+        reader.feed_data(wire_frame(Cmd.UPDATE, packager.encode(["1,2,3"])))
+        reader.feed_data(wire_frame(Cmd.UPDATE, packager.encode(["1,x"])))
+        for _ in range(2):
+            code, command, data = await transport.receive()
+            assert code == 9502
+            await controller.handle_command(code, command, data)
+
+        assert submitted == [(1, {"position": "1,2,3"})]  # The malformed position got DATA_INVALID
+
+    asyncio.run(main())
+
+
+def test_unencodable_response_gets_a_fallback_error_reply():
+    from sources.server.IO.packager import DataPackager
+    from sources.server.IO.transport import Transport
+    from sources.server.tcpcontroller import TCPController
+    from tests.fakes import FakeWriter
+
+    async def handler(ctx, data):
+        return {"error": object()}  # Not serializable
+
+    async def main():
+        writer = FakeWriter()
+        transport = Transport(asyncio.StreamReader(), writer)
+        controller = TCPController(None, transport)
+
+        await controller.run_handler(Command(120, handler), {})
+        await asyncio.sleep(0)  # Coalesced writes are flushed at the end of the loop iteration
+
+        (reply,) = DataPackager().decode(bytes(writer.wire))
+        assert reply["code"] == 4002
+
+    asyncio.run(main())
+
+
+def test_invalid_token_reply_is_encodable(monkeypatch):
+    from sources.handlers import player
+    from sources.server.IO.packager import DataPackager
+
+    async def verify_token(token):
+        raise ValueError("Signature has expired")
+
+    monkeypatch.setattr(player.JwtManager, "verify_token", verify_token)
+    response = asyncio.run(player.player_info(None, {"id": 1, "token": "expired"}))
+
+    assert response["code"] == Codes.TOKEN_INVALID
+    assert response["error"] == "Signature has expired"
+    assert DataPackager().encode([response]) != b'\x80'
@@ -0,0 +1,66 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import zlib
+import asyncio
+
+from types import SimpleNamespace
+
+from sources.server import fanout as fanout_module
+from sources.server.fanout import Fanout
+from sources.server.IO.frame import LENGTH
+from sources.server.IO.transport import Transport
+from sources.server.tcpsession import TCPSession
+from tests.fakes import FakeWriter
+
+
+def new_session() -> TCPSession:
+    session = TCPSession()
+    session.transport = Transport(asyncio.StreamReader(), FakeWriter())
+    session.is_connected = True
+    return session
+
+
+def test_broadcast_encodes_once_and_queues_the_same_bytes():
+    async def main():
+        sessions = [new_session() for _ in range(3)]
+        fanout = Fanout(registry=sessions)
+
+        assert fanout.broadcast({"event": "start"}) == (3, 0, 0, 0)
+        await asyncio.sleep(0)  # Coalesced writes are flushed at the end of the loop iteration
+
+        frames = [session.transport.writer.writer.lines for session in sessions]
+        assert all(len(lines) == 1 for lines in frames)
+        assert frames[0][0] is frames[1][0] is frames[2][0]  # Shared, not copied per session
+
+    asyncio.run(main())
+
+
+def test_large_compressed_broadcast_is_compressed_off_the_loop(monkeypatch):
+    offloaded = []
+
+    async def run(function, *args):
+        offloaded.append(function)
+        return function(*args)
+
+    monkeypatch.setattr(fanout_module, "cpu", SimpleNamespace(run=run))
+
+    async def main():
+        plain, compressed = new_session(), new_session()
+        compressed.transport.enable_compression()
+        compressed.transport.COMPRESSION_OFFLOAD = 1024
+        fanout = Fanout(registry=[plain, compressed])
+
+        delivery = fanout.broadcast("x" * 4096)
+        assert (delivery.sent, delivery.deferred) == (1, 1)
+
+        await asyncio.gather(*fanout.tasks)
+        await asyncio.sleep(0)
+        assert offloaded == [fanout_module.compress_frame]
+
+        data = bytes(compressed.transport.writer.writer.wire)
+        assert LENGTH.unpack_from(data)[0] & 0x80000000  # Compressed flag
+        assert zlib.decompress(data[LENGTH.size:]) == bytes(plain.transport.writer.writer.wire)[LENGTH.size:]
+        assert fanout.delivered == 2
+
+    asyncio.run(main())
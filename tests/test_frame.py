@@ -0,0 +1,67 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import pytest
+
+from sources.server.IO.frame import (
+    FrameParser, FrameError, HEADER, LENGTH, FLAG_COMPRESSED, FLAG_REQUEST_ID
+)
+
+
+def frame(command: int, body: bytes, flags: int = 0) -> bytes:
+    return HEADER.pack(command, len(body) | flags) + body
+
+
+def test_single_frame():
+    parser = FrameParser()
+    assert parser.feed(frame(3, b"abc")) == [(3, 0, LENGTH.pack(3) + b"abc")]
+    assert len(parser) == 0
+
+
+def test_split_frame_is_kept_until_complete():
+    parser = FrameParser()
+    data = frame(-5, b"hello world")
+
+    for index in range(len(data) - 1):
+        assert parser.feed(data[index:index + 1]) == []
+    assert len(parser) == len(data) - 1
+
+    assert parser.feed(data[-1:]) == [(-5, 0, LENGTH.pack(11) + b"hello world")]
+    assert len(parser) == 0
+
+
+def test_pipelined_frames_and_remainder():
+    parser = FrameParser()
+    data = frame(1, b"a") + frame(2, b"") + frame(3, b"ccc")
+
+    frames = parser.feed(data + data[:4])
+    assert [command for command, _, _ in frames] == [1, 2, 3]
+    assert frames[1] == (2, 0, LENGTH.pack(0))
+    assert len(parser) == 4
+
+    assert parser.feed(data[4:6]) == [(1, 0, LENGTH.pack(1) + b"a")]
+
+
+def test_oversized_frame_raises_and_clears():
+    parser = FrameParser(max_frame_size=8)
+    with pytest.raises(FrameError):
+        parser.feed(frame(1, b"x" * 9))
+    assert len(parser) == 0
+
+    # The length alone is enough to reject, before the body arrives
+    with pytest.raises(FrameError):
+        parser.feed(HEADER.pack(1, 1 << 20))
+
+
+def test_flags_must_be_negotiated():
+    parser = FrameParser()
+    with pytest.raises(FrameError):
+        parser.feed(frame(1, b"zz", FLAG_COMPRESSED))
+
+    parser.flags = FLAG_COMPRESSED | FLAG_REQUEST_ID
+    assert parser.feed(frame(1, b"zz", FLAG_COMPRESSED)) == [(1, FLAG_COMPRESSED, LENGTH.pack(2) + b"zz")]
+
+
+def test_invalid_max_frame_size():
+    with pytest.raises(ValueError):
+        FrameParser(0)
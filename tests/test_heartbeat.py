@@ -0,0 +1,85 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from types import SimpleNamespace
+
+import sources.handlers  # noqa: F401 (registers the commands)
+from sources.constants.cmd import Cmd
+from sources.server.commands import CommandRegistry, Context
+from sources.server.heartbeat import Heartbeat
+from sources.server.IO.schema import SchemaRegistry
+from sources.server.IO.packager import DataPackager
+from sources.server.IO.transport import Transport
+from sources.server.tcpsession import TCPSession
+from tests.fakes import FakeWriter
+
+
+def handshake(pinger: Heartbeat, session, **flags) -> dict:
+    """Run HANDSHAKE with the given opt-ins; return the decoded response."""
+    async def main():
+        request = dict(compression=False, streaming=False, multiplex=False, native=False, heartbeat=False)
+        request.update(flags)
+        controller = SimpleNamespace(
+            transport=session.transport, session=session, heartbeat=pinger, MAX_INFLIGHT=8
+        )
+        return await CommandRegistry.get(Cmd.HANDSHAKE).handler(Context(controller, Cmd.HANDSHAKE), request)
+
+    response = asyncio.run(main())
+    names = [field.name for field in SchemaRegistry.get(Cmd.HANDSHAKE).response]
+    return dict(zip(names, DataPackager(native=True).decode(response)))
+
+
+def new_session() -> TCPSession:
+    async def make():
+        return Transport(asyncio.StreamReader(), FakeWriter())
+
+    session = TCPSession()
+    session.transport = asyncio.run(make())
+    return session
+
+
+def test_sessions_are_not_pinged_without_opt_in():
+    heartbeat = Heartbeat(5, 3, on_dead=None, fanout=None)
+    session = new_session()
+
+    assert handshake(heartbeat, session)["heartbeat"] is False
+    assert session not in heartbeat
+
+
+def test_handshake_opt_in_registers_the_session():
+    heartbeat = Heartbeat(5, 3, on_dead=None, fanout=None)
+    session = new_session()
+
+    assert handshake(heartbeat, session, heartbeat=True)["heartbeat"] is True
+    assert session in heartbeat
+
+
+def test_dead_sessions_are_closed_by_a_referenced_task():
+    async def main():
+        closing = asyncio.Event()
+        closed = []
+
+        async def on_dead(session):
+            await closing.wait()
+            closed.append(session)
+
+        heartbeat = Heartbeat(0.01, 1, on_dead, fanout=None, tick=0.01, slots=8)
+        session = TCPSession()
+        session.rtt.srtt, session.rtt.pending = 0.01, 1  # Answered before, a ping still unanswered
+        heartbeat.wheel.schedule(session, 0)
+        running = asyncio.create_task(heartbeat.run())
+
+        while not heartbeat.dead:
+            await asyncio.sleep(0.01)
+        assert len(heartbeat.tasks) == 1  # Still being closed
+
+        closing.set()
+        await asyncio.gather(*heartbeat.tasks)
+        assert closed == [session] and not heartbeat.tasks
+
+        heartbeat.running = False
+        running.cancel()
+
+    asyncio.run(main())
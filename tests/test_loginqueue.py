@@ -0,0 +1,71 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from sources.server.loginqueue import LoginQueue
+
+
+def test_admits_up_to_max_active_then_queues():
+    async def main():
+        logins = LoginQueue(max_active=1, max_queued=1)
+        first = logins.enqueue("a")
+        second = logins.enqueue("b")
+
+        assert first.done() and not second.done()
+        assert logins.enqueue("c") is None
+        assert (logins.active, logins.queued, logins.shed) == (1, 1, 1)
+
+        logins.release(0.1)
+        assert second.done()
+        assert (logins.active, logins.queued) == (1, 0)
+
+    asyncio.run(main())
+
+
+def test_fair_queue_serves_ips_round_robin():
+    async def main():
+        logins = LoginQueue(max_active=1, max_queued=10)
+        logins.enqueue("busy")
+        waiters = {ip: logins.enqueue(ip[0]) for ip in ("a1", "a2", "a3", "b1")}
+
+        served = []
+        for _ in waiters:
+            logins.release()
+            served += [ip for ip, turn in waiters.items() if turn.done() and ip not in served]
+        assert served == ["a1", "b1", "a2", "a3"]
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_gives_its_place_back():
+    async def main():
+        logins = LoginQueue(max_active=1, max_queued=1)
+        logins.enqueue("a")
+        task = asyncio.create_task(logins.wait(logins.enqueue("b")))
+        await asyncio.sleep(0)
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert (logins.active, logins.queued) == (1, 0)
+
+        # The freed place can be taken again and the cancelled waiter is skipped
+        third = logins.enqueue("c")
+        assert third is not None
+        logins.release()
+        assert third.done() and (logins.active, logins.queued) == (1, 0)
+
+    asyncio.run(main())
+
+
+def test_withdraw_of_granted_turn_releases_it():
+    async def main():
+        logins = LoginQueue(max_active=1, max_queued=1)
+        turn = logins.enqueue("a")
+        waiting = logins.enqueue("b")
+
+        logins.withdraw(turn)
+        assert waiting.done()
+        assert (logins.active, logins.queued) == (1, 0)
+
+    asyncio.run(main())
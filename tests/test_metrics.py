@@ -0,0 +1,30 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import json
+import math
+
+from sources.server.metrics import Histogram, Metrics
+
+
+def test_percentile_is_bucket_upper_bound():
+    histogram = Histogram()
+    for _ in range(99):
+        histogram.observe(0.001)
+    histogram.observe(0.5)
+
+    assert histogram.percentile(50) >= 0.001
+    assert histogram.percentile(50) < 0.002
+    assert histogram.percentile(100) >= 0.5
+    assert Histogram().percentile(99) is None
+
+
+def test_snapshot_latency_stays_finite_above_highest_bound():
+    metrics = Metrics()
+    metrics.observe(0, 1000.0)  # Beyond the last bucket
+
+    assert Histogram().milliseconds(99) is None
+    p50, p99 = metrics.snapshot()["latency_ms"][0]
+    assert p50 == p99 == Histogram.BOUNDS[-1] * 1000
+    assert math.isfinite(p99)
+    json.dumps(metrics.snapshot(), allow_nan=False)
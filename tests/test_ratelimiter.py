@@ -0,0 +1,92 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+from types import SimpleNamespace
+
+import pytest
+
+from sources.manager.security import ratelimiter
+from sources.manager.security.ratelimiter import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the limiter."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(ratelimiter, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_burst_then_refill(clock):
+    limiter = RateLimiter(rate=10, burst=5, lockout_period=0)
+
+    assert all(limiter.allow("a") for _ in range(5))
+    assert not limiter.allow("a")
+
+    clock.now += 0.1  # One unit refilled
+    assert limiter.allow("a")
+    assert not limiter.allow("a")
+    assert limiter.stats() == {"keys": 1, "allowed": 6, "rejected": 2}
+
+
+def test_keys_are_independent(clock):
+    limiter = RateLimiter(rate=1, burst=1, lockout_period=0)
+    assert limiter.allow("a")
+    assert not limiter.allow("a")
+    assert limiter.allow("b")
+
+
+def test_cost_is_charged_and_rejections_are_free(clock):
+    limiter = RateLimiter(rate=10, burst=10, lockout_period=0)
+
+    assert limiter.allow("a", cost=8)
+    assert not limiter.allow("a", cost=5)  # Would exceed the burst: nothing charged
+    assert limiter.allow("a", cost=2)
+    assert not limiter.allow("a")
+
+
+def test_lockout_blocks_for_the_whole_period(clock):
+    limiter = RateLimiter(rate=10, burst=1)
+    assert limiter.lockout_period == 300
+
+    assert limiter.allow("a")
+    assert not limiter.allow("a")
+    assert limiter.tat["a"] >= clock.now + 300  # Not refilled before the lockout ends
+
+    clock.now += 301
+    assert limiter.allow("a")
+
+
+def test_reset_unlocks(clock):
+    limiter = RateLimiter(rate=1, burst=1)
+    limiter.allow("a")
+    limiter.allow("a")
+
+    limiter.reset("a")
+    assert limiter.allow("a")
+
+
+def test_expired_keys_are_dropped(clock):
+    limiter = RateLimiter(rate=10, burst=1, lockout_period=0)
+    limiter.allow("a")
+    limiter.allow("b")
+
+    clock.now += 1  # TATs of a and b are in the past
+    limiter.allow("c")
+    assert list(limiter.tat) == ["c"]
+
+
+def test_max_keys_drops_least_recently_used(clock, monkeypatch):
+    monkeypatch.setattr(RateLimiter, "MAX_KEYS", 2)
+    limiter = RateLimiter(rate=1, burst=10, lockout_period=0)
+
+    for key in ("a", "b", "a", "c"):
+        limiter.allow(key)
+    assert list(limiter.tat) == ["a", "c"]
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0, burst=1)
+    with pytest.raises(ValueError):
+        RateLimiter(rate=1, burst=1, lockout_period=-1)
@@ -0,0 +1,66 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import pytest
+
+from sources.constants.cmd import Cmd
+from sources.server.IO.packager import DataPackager
+from sources.server.IO.schema import Field, MessageSchema, SchemaRegistry
+
+
+packager = DataPackager(native=True)
+
+
+def test_fixed_layout_roundtrip():
+    schema = MessageSchema(1, request=(Field("id", 'i'), Field("alive", 'b')), response=(Field("id", 'i'),))
+
+    assert schema.decode(packager.encode([7, True])) == {"id": 7, "alive": True}
+    assert schema.encode({"id": 7}) == packager.encode([7])
+
+
+def test_fixed_layout_rejects_wrong_tags_and_sizes():
+    schema = MessageSchema(1, request=(Field("id", 'i'), Field("alive", 'b')))
+
+    assert schema.decode(packager.encode([7, 1])) is None         # 'i' instead of 'b'
+    assert schema.decode(packager.encode([7])) is None            # Missing field
+    assert schema.decode(packager.encode([7, True, 1])) is None   # Extra field
+    assert schema.decode(b"\x00\x00") is None
+
+
+def test_variable_layout():
+    schema = MessageSchema(1, request=(
+        Field("email", 's', 16), Field("age", 'i'), Field("tags", 'a'), Field("extra", 'm', 2)
+    ))
+
+    data = packager.encode(["a@b.c", 30, ["x", 1], {"k": None}])
+    assert schema.decode(data) == {"email": "a@b.c", "age": 30, "tags": ["x", 1], "extra": {"k": None}}
+
+    assert schema.decode(packager.encode(["a" * 17, 30, [], {}])) is None        # String over max_length
+    assert schema.decode(packager.encode(["a", 30, [], {1: 1, 2: 2, 3: 3}])) is None  # Map over max_length
+    assert schema.decode(packager.encode(["a", 30, [], {}, 1])) is None          # Trailing data
+    assert schema.decode(packager.encode([1, 30, [], {}])) is None               # Wrong tag
+
+    truncated = bytearray(data[:-1])
+    truncated[3] -= 1  # Consistent length prefix, truncated body
+    assert schema.decode(bytes(truncated)) is None
+
+
+def test_encode_checks_fields_and_types():
+    schema = MessageSchema(1, response=(Field("name", 's'), Field("level", 'i'), Field("items", 'a')))
+
+    assert schema.encode({"name": "x", "level": 2, "items": [1, "y"]}) == packager.encode(["x", 2, [1, "y"]])
+    assert schema.encode({"name": "x", "level": 2}) == b'\x80'                     # Missing field
+    assert schema.encode({"name": "x", "level": "2", "items": []}) == b'\x80'      # Wrong type
+    assert schema.encode({"name": "x", "level": True, "items": []}) == b'\x80'     # bool is not an int field
+    assert schema.encode({"name": "x", "level": 2 ** 40, "items": []}) == b'\x80'  # Out of int32 range
+
+
+def test_registry():
+    assert SchemaRegistry.get(Cmd.PING) is not None
+    assert SchemaRegistry.get(127) is None
+
+    with pytest.raises(ValueError):
+        SchemaRegistry.register(Cmd.PING)
+
+    with pytest.raises(ValueError):
+        Field("x", 'j')
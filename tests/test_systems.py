@@ -0,0 +1,86 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import uuid
+
+from types import SimpleNamespace
+
+from sources.server.aoi import AOIGrid
+from sources.server.systems import movement
+
+
+def world_with(inputs):
+    world = SimpleNamespace(inputs=inputs, deltas={})
+    world.push = lambda session_id, event: world.deltas.setdefault(session_id, []).append(event)
+    return world
+
+
+def test_movement_updates_aoi_and_notifies_nearby_only():
+    aoi = AOIGrid(cell_size=64)
+    mover, near, far, other_map = (uuid.uuid4() for _ in range(4))
+    aoi.move(near, 1, 100, 100)
+    aoi.move(far, 1, 1000, 1000)
+    aoi.move(other_map, 2, 100, 100)
+
+    world = world_with([(mover, {"position": "1,90,90"})])
+    movement(aoi, radius=50)(world, 0.05)
+
+    assert aoi.position(mover) == (1, 90.0, 90.0)
+    assert world.deltas == {near: [{"type": "move", "id": str(mover), "map": 1, "x": 90.0, "y": 90.0}]}
+
+
+def test_movement_applies_last_position_of_the_tick():
+    aoi = AOIGrid(cell_size=64)
+    mover, near = uuid.uuid4(), uuid.uuid4()
+    aoi.move(near, 1, 0, 0)
+
+    world = world_with([
+        (mover, {"position": "1,500,500"}),
+        (mover, {"action": "jump"}),
+        (mover, {"position": "1,10,0"}),
+    ])
+    movement(aoi, radius=50)(world, 0.05)
+
+    assert aoi.position(mover) == (1, 10.0, 0.0)
+    assert len(world.deltas[near]) == 1
+
+
+def test_movement_ignores_inputs_without_valid_position():
+    aoi = AOIGrid(cell_size=64)
+    mover = uuid.uuid4()
+
+    world = world_with([(mover, {"position": "1,x,y"}), (mover, {"position": ""}), (mover, {})])
+    movement(aoi, radius=50)(world, 0.05)
+
+    assert mover not in aoi
+    assert world.deltas == {}
+
+
+def test_update_frame_moves_the_session_in_the_grid():
+    import asyncio
+    import sources.handlers  # noqa: F401 (registers the commands)
+    from sources.constants.cmd import Cmd
+    from sources.server.IO.packager import DataPackager
+    from sources.server.IO.transport import Transport
+    from sources.server.tcpcontroller import TCPController
+    from sources.server.world import World
+    from tests.fakes import FakeWriter, wire_frame
+
+    async def main():
+        aoi = AOIGrid(cell_size=64)
+        world = World(SimpleNamespace(registry={}), rate=20)
+        world.system(movement(aoi, radius=50))
+
+        reader = asyncio.StreamReader()
+        transport = Transport(reader, FakeWriter())
+        session = SimpleNamespace(id=uuid.uuid4(), account_id=7, transport=transport, client_address=("10.0.0.1", 1))
+        controller = TCPController(None, transport, session, world=world)
+
+        reader.feed_data(wire_frame(Cmd.UPDATE, DataPackager().encode(["3,130,-10"])))
+        await controller.handle_command(*await transport.receive())
+        world.step()
+
+        assert aoi.position(session.id) == (3, 130.0, -10.0)
+        assert aoi.cell_of[session.id] == (3, 2, -1)
+
+    asyncio.run(main())
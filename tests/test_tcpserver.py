@@ -0,0 +1,40 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from sources.server.IO.packager import DataPackager
+from sources.server.IO.transport import Transport
+from sources.server.tcpserver import TCPServer
+from sources.server.tcpsession import TCPSession
+from tests.fakes import FakeWriter
+
+
+def connected_session() -> TCPSession:
+    session = TCPSession()
+    session.writer = FakeWriter()
+    session.transport = Transport(asyncio.StreamReader(), session.writer)
+    session.client_address = ("10.0.0.1", 50000)
+    session.is_connected = True
+    return session
+
+
+def test_shutdown_notice_does_not_wait_for_a_stalled_client():
+    async def main():
+        server = TCPServer("127.0.0.1", 0, None, {"METRICS_PORT": None})
+        handler = server.client_handler
+        reading, stalled = connected_session(), connected_session()
+        stalled.writer.drained.clear()  # Client stopped reading: drain() never returns
+        stalled.writer.transport.buffered = stalled.transport.writer.high_water
+        for session in (reading, stalled):
+            handler.sessions.add(session)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await handler.shutdown(timeout=5, drain_timeout=2)
+
+        assert loop.time() - started < 1
+        assert DataPackager().decode(bytes(reading.writer.wire))[0]["code"] == 5008
+        assert not handler.sessions and not reading.is_connected and not stalled.is_connected
+
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import time
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+from sources.server.timerwheel import IdleReaper, TimerWheel
+
+
+def expirations(wheel: TimerWheel, ticks: int):
+    """Tick number -> keys expired on that tick."""
+    return {tick: expired for tick in range(1, ticks + 1) if (expired := wheel.advance())}
+
+
+def test_keys_expire_on_their_tick():
+    wheel = TimerWheel(tick=1, slots=4)
+    wheel.schedule("a", 1)
+    wheel.schedule("b", 2.5)  # Rounded up to 3 ticks
+    wheel.schedule("c", 4)
+
+    assert expirations(wheel, 5) == {1: ["a"], 3: ["b"], 4: ["c"]}
+    assert len(wheel) == 0
+
+
+def test_delays_longer_than_one_turn_wait_extra_rounds():
+    wheel = TimerWheel(tick=1, slots=4)
+    wheel.schedule("a", 9)
+    wheel.schedule("b", 5)
+
+    assert expirations(wheel, 12) == {5: ["b"], 9: ["a"]}
+
+
+def test_cancel_and_reschedule():
+    wheel = TimerWheel(tick=1, slots=4)
+    wheel.schedule("a", 2)
+    wheel.schedule("b", 2)
+    wheel.cancel("b")
+    wheel.cancel("missing")
+    wheel.schedule("a", 3)  # Moved, not duplicated
+
+    assert "b" not in wheel and len(wheel) == 1
+    assert expirations(wheel, 4) == {3: ["a"]}
+
+
+def test_zero_delay_expires_on_next_tick():
+    wheel = TimerWheel(tick=1, slots=4)
+    wheel.schedule("a", 0)
+    assert wheel.advance() == ["a"]
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        TimerWheel(tick=0)
+    with pytest.raises(ValueError):
+        IdleReaper(0, None)
+
+
+class FakeSession:
+    """Hashable stand-in for TCPSession: the reaper only reads transport.last_activity."""
+
+    def __init__(self, last_activity: float) -> None:
+        self.transport = SimpleNamespace(last_activity=last_activity)
+
+
+def test_reaper_returns_idle_sessions_and_refiles_active_ones():
+    reaper = IdleReaper(timeout=3, on_idle=None, tick=1, slots=8)
+    idle, active = FakeSession(time.monotonic() - 10), FakeSession(time.monotonic())
+    reaper.add(idle)
+    reaper.add(active)
+
+    assert [reaper.collect() for _ in range(2)] == [[], []]
+    assert reaper.collect() == [idle]
+    assert active in reaper.wheel and idle not in reaper.wheel
+
+
+def test_reaper_remove():
+    reaper = IdleReaper(timeout=1, on_idle=None, tick=1, slots=8)
+    gone = FakeSession(time.monotonic() - 10)
+    reaper.add(gone)
+    reaper.remove(gone)
+
+    assert reaper.collect() == []
+
+
+def test_reaper_keeps_closing_batches_referenced():
+    async def main():
+        closing = asyncio.Event()
+        closed = []
+
+        async def on_idle(session):
+            await closing.wait()
+            closed.append(session)
+
+        reaper = IdleReaper(timeout=0.01, on_idle=on_idle, tick=0.01, slots=8)
+        idle = FakeSession(time.monotonic() - 10)
+        reaper.add(idle)
+        running = asyncio.create_task(reaper.run())
+
+        while not reaper.reaped:
+            await asyncio.sleep(0.01)
+        assert len(reaper.tasks) == 1  # Still being closed
+
+        closing.set()
+        await asyncio.gather(*reaper.tasks)
+        assert closed == [idle] and not reaper.tasks
+
+        reaper.running = False
+        running.cancel()
+
+    asyncio.run(main())
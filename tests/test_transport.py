@@ -0,0 +1,183 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import zlib
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+import sources.handlers  # noqa: F401 (registers the commands)
+from sources.constants.cmd import Cmd
+from sources.server.commands import CommandRegistry
+from sources.server.IO.frame import FLAG_CHUNKED, FLAG_COMPRESSED, FLAG_REQUEST_ID, HEADER, LENGTH, REQUEST_ID
+from sources.server.IO.packager import DataPackager
+from sources.server.IO.stream import STREAM_ID
+from sources.server.IO.transport import Transport, compress_frame
+from sources.server.tcpcontroller import TCPController
+from sources.server.tcpprotocol import TCPProtocol
+from tests.fakes import FakeWriter, wire_frame
+
+
+def chunk_frame(command: int, stream_id: int, chunk: bytes) -> bytes:
+    body = STREAM_ID.pack(stream_id) + chunk
+    return HEADER.pack(command, len(body) | FLAG_CHUNKED) + body
+
+
+@pytest.fixture
+def upload():
+    """Temporary command registered with stream=True."""
+    received = []
+
+    async def handler(ctx, stream):
+        async for chunk in stream:
+            received.append(bytes(chunk))
+
+    CommandRegistry.register(120, handler, stream=True)
+    yield received
+    del CommandRegistry.commands[120]
+
+
+def session_for(transport: Transport):
+    return SimpleNamespace(id=1, account_id=None, transport=transport, client_address=("10.0.0.1", 1))
+
+
+def test_chunked_frames_are_refused_for_commands_without_stream(upload):
+    async def main():
+        reader = asyncio.StreamReader()
+        transport = Transport(reader, FakeWriter())
+        transport.enable_streaming()
+        controller = TCPController(None, transport, session_for(transport))
+
+        reader.feed_data(chunk_frame(Cmd.PLAYER_INFO, 1, b"abc"))
+        reader.feed_data(chunk_frame(Cmd.PLAYER_INFO, 1, b"def"))  # Rest of the refused stream: dropped
+        reader.feed_data(chunk_frame(Cmd.PLAYER_INFO, 1, b""))
+        reader.feed_data(chunk_frame(120, 2, b"xyz"))
+        reader.feed_data(chunk_frame(120, 2, b""))
+
+        assert (await transport.receive())[0] == 4004
+        code, command, stream = await transport.receive()
+        assert (code, command) == (9502, 120)
+
+        await controller.handle_command(code, command, stream)
+        reading = asyncio.create_task(transport.receive())  # Feeds the end of the stream
+        await asyncio.wait_for(asyncio.gather(*controller.tasks), 1)
+        reading.cancel()
+        assert upload == [b"xyz"]
+
+    asyncio.run(main())
+
+
+def test_streams_are_refused_without_a_controller():
+    async def main():
+        reader = asyncio.StreamReader()
+        transport = Transport(reader, FakeWriter())
+        transport.enable_streaming()
+
+        reader.feed_data(chunk_frame(120, 1, b"abc"))
+        assert (await transport.receive())[0] == 4004
+
+    asyncio.run(main())
+
+
+def test_coalesced_replies_reach_the_socket_with_the_protocol_backend():
+    async def handle_client(reader, writer):
+        transport = Transport(reader, writer)
+        for _ in range(3):
+            assert await transport.send({"n": 1}) == 9501
+        await transport.writer.wait_writable(1)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(lambda: TCPProtocol(handle_client), "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+
+        reply = DataPackager().encode([{"n": 1}])
+        assert await asyncio.wait_for(reader.readexactly(3 * len(reply)), 1) == 3 * reply
+
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_compressed_frames_in_both_directions():
+    async def main():
+        reader, writer = asyncio.StreamReader(), FakeWriter()
+        transport = Transport(reader, writer)
+        transport.enable_compression(level=6, threshold=16)
+        packager = DataPackager()
+        data = {"text": "abc" * 100}
+
+        compressed = compress_frame(packager.encode([data]), 6, 16)
+        reader.feed_data(wire_frame(120, compressed, FLAG_COMPRESSED))
+        assert await transport.receive() == [9502, 120, [data]]
+
+        reader.feed_data(wire_frame(120, LENGTH.pack(4) + b"oops", FLAG_COMPRESSED))
+        assert (await transport.receive())[0] == 4001
+
+        assert await transport.send(data) == 9501
+        assert await transport.send("small") == 9501  # Under the threshold: sent as is
+        await asyncio.sleep(0)
+
+        large, small = writer.lines
+        header = LENGTH.unpack_from(large)[0]
+        assert header & FLAG_COMPRESSED
+        body = zlib.decompress(large[LENGTH.size:])
+        assert packager.decode(LENGTH.pack(len(body)) + body) == [data]
+        assert small == packager.encode(["small"])
+
+    asyncio.run(main())
+
+
+def test_compressed_frames_are_refused_unless_negotiated():
+    async def main():
+        reader = asyncio.StreamReader()
+        transport = Transport(reader, FakeWriter())
+
+        compressed = compress_frame(DataPackager().encode([{"text": "abc" * 100}]), 6, 16)
+        reader.feed_data(wire_frame(120, compressed, FLAG_COMPRESSED))
+        assert (await transport.receive())[0] == 4003
+
+    asyncio.run(main())
+
+
+def test_request_ids_are_split_and_echoed():
+    async def main():
+        reader, writer = asyncio.StreamReader(), FakeWriter()
+        transport = Transport(reader, writer)
+        transport.enable_multiplex()
+        packager = DataPackager()
+
+        payload = packager.encode([{"n": 1}])
+        tagged = LENGTH.pack(0) + REQUEST_ID.pack(7) + payload[LENGTH.size:]
+        reader.feed_data(wire_frame(120, tagged, FLAG_REQUEST_ID))
+        assert await transport.receive() == [9502, 120, [{"n": 1}]]
+        assert transport.request_id == 7
+
+        reader.feed_data(wire_frame(120, payload))  # Untagged frames stay allowed
+        assert await transport.receive() == [9502, 120, [{"n": 1}]]
+        assert transport.request_id is None
+
+        assert await transport.send({"n": 2}, 7) == 9501
+        await asyncio.sleep(0)
+        (reply,) = writer.lines
+        assert LENGTH.unpack_from(reply)[0] & FLAG_REQUEST_ID
+        assert Transport.split_request_id(reply) == (7, packager.encode([{"n": 2}]))
+
+    asyncio.run(main())
+
+
+def test_request_ids_are_refused_unless_negotiated():
+    async def main():
+        reader = asyncio.StreamReader()
+        transport = Transport(reader, FakeWriter())
+
+        payload = DataPackager().encode([{"n": 1}])
+        tagged = LENGTH.pack(0) + REQUEST_ID.pack(7) + payload[LENGTH.size:]
+        reader.feed_data(wire_frame(120, tagged, FLAG_REQUEST_ID))
+        assert (await transport.receive())[0] == 4003
+
+    asyncio.run(main())
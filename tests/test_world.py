@@ -0,0 +1,32 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from types import SimpleNamespace
+
+from sources.server.world import World
+
+
+def test_failing_system_does_not_stop_the_tick():
+    async def main():
+        world = World(SimpleNamespace(registry={}), rate=20)
+        ran = []
+
+        @world.system
+        def broken(world, dt):
+            raise RuntimeError("boom")
+
+        @world.system
+        def after(world, dt):
+            ran.append(world.inputs)
+
+        world.submit("session", {"position": "1,2,3"})
+        world.step()
+
+        assert ran == [[("session", {"position": "1,2,3"})]]
+        assert len(world.tasks) == 1  # Error log referenced until written
+        await asyncio.gather(*world.tasks)
+        assert not world.tasks
+
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+# Copyright (C) PhcNguyen Developers
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from sources.server.IO.write import Writer
+from tests.fakes import FakeWriter
+
+
+def test_offer_pauses_at_high_water_and_resumes_at_low_water():
+    async def main():
+        stream = FakeWriter()
+        writer = Writer(stream, high_water=100, low_water=40)
+        assert stream.transport.limits == (100, 40)
+
+        stream.transport.buffered = 100
+        assert writer.offer(b"a") == 5006
+        stream.transport.buffered = 50  # Below high_water, still above low_water
+        assert writer.offer(b"b") == 5006
+        stream.transport.buffered = 40
+        assert writer.offer(b"c") == 9501
+
+        assert writer.dropped == 2 and bytes(stream.wire) == b"c"
+
+    asyncio.run(main())
+
+
+def test_drop_policy_refuses_frames_over_high_water():
+    async def main():
+        stream = FakeWriter()
+        writer = Writer(stream, high_water=100, low_water=40, policy=Writer.DROP)
+
+        stream.transport.buffered = 100
+        assert await writer.send(b"a") == 5006
+        assert not writer.evicted and not stream.transport.aborted
+
+        stream.transport.buffered = 0
+        assert await writer.send(b"b") == 9501
+        assert bytes(stream.wire) == b"b"
+
+    asyncio.run(main())
+
+
+def test_disconnect_policy_evicts_a_slow_consumer():
+    async def main():
+        stream = FakeWriter()
+        writer = Writer(stream, coalesce=True, high_water=100, low_water=40, slow_timeout=0.01)
+        writer.enqueue(b"held")
+        stream.drained.clear()  # The client stopped reading
+
+        stream.transport.buffered = 100
+        assert await writer.send(b"a") == 5007
+        assert writer.evicted and stream.transport.aborted
+        assert writer.pending() == stream.transport.buffered  # Held frames were dropped
+        assert writer.offer(b"b") == 5007
+
+    asyncio.run(main())
+
+
+def test_concurrent_send_data_sends_each_byte_once():
+    async def main():
+        stream = FakeWriter()
+        writer = Writer(stream, buffer_size=10)
+        stream.drained.clear()
+
+        first = asyncio.create_task(writer.send(b"A" * 10))
+        second = asyncio.create_task(writer.send(b"B" * 10))
+        await asyncio.sleep(0.01)  # The first waits in drain(), the second for the lock
+        stream.drained.set()
+
+        assert await asyncio.gather(first, second) == [9501, 9501]
+        assert bytes(stream.wire) == b"A" * 10 + b"B" * 10
+
+    asyncio.run(main())
+
+
+def test_offer_queues_behind_a_send_in_progress():
+    async def main():
+        stream = FakeWriter()
+        writer = Writer(stream, buffer_size=4)
+        stream.drained.clear()
+
+        sending = asyncio.create_task(writer.send(b"A" * 8))
+        await asyncio.sleep(0.01)  # First chunk written, the rest still buffered
+        assert writer.offer(b"B") == 9501
+        stream.drained.set()
+
+        assert await sending == 9501
+        assert bytes(stream.wire) == b"A" * 8 + b"B"
+
+    asyncio.run(main())
+
+
+def test_coalesced_frames_are_written_once_without_copies():
+    async def main():
+        stream = FakeWriter()
+        writer = Writer(stream, coalesce=True)
+        frames = [b"one", b"two", b"three"]
+
+        for frame in frames:
+            assert await writer.send(frame) == 9501
+        assert stream.writes == 0
+        await asyncio.sleep(0)  # Flushed at the end of the loop iteration
+
+        assert stream.writes == 1
+        assert all(line is frame for line, frame in zip(stream.lines, frames))
+        assert writer.get_bytes_sent() == 11
+
+    asyncio.run(main())